@@ -35,6 +35,33 @@ class Settings(BaseSettings):
     supabase_url: HttpUrl = Field(..., description="Supabase project URL")
     supabase_secret_key: str = Field(..., description="Supabase secret key (sb_secret_...)")
     supabase_publishable_key: Optional[str] = Field(None, description="Supabase publishable key")
+    supabase_jwt_secret: Optional[str] = Field(None, description="Supabase JWT secret for HS256 access tokens")
+
+    # Auth token verification
+    auth_local_verification: bool = Field(True, description="Verify access tokens in-process instead of via Supabase Auth")
+    auth_jwt_audience: str = Field("authenticated", description="Expected access token audience")
+    auth_jwt_leeway_seconds: int = Field(10, description="Clock skew tolerance for exp checks")
+    auth_jwks_refresh_seconds: int = Field(600, description="JWKS cache refresh interval")
+    auth_cache_ttl_seconds: int = Field(60, description="Max lifetime of a remotely validated token in the user cache")
+    auth_cache_max_entries: int = Field(10000, description="Max tokens kept in the user cache")
+
+    # Pooled upstream HTTP clients
+    http_max_connections: int = Field(100, description="Max open connections per upstream")
+    http_max_keepalive_connections: int = Field(20, description="Max idle keep-alive connections per upstream")
+    http_keepalive_expiry_seconds: float = Field(30.0, description="Idle keep-alive connection lifetime")
+    http_connect_timeout_seconds: float = Field(5.0, description="Upstream connect timeout")
+    http2_enabled: bool = Field(False, description="Use HTTP/2 for upstreams (requires 'h2')")
+    auth_timeout_seconds: float = Field(10.0, description="Default Supabase Auth timeout")
+    polar_timeout_seconds: float = Field(15.0, description="Default Polar API timeout")
+
+    # Supabase retries and circuit breaking
+    supabase_attempt_timeout_seconds: float = Field(5.0, description="Timeout of a single Supabase REST attempt")
+    supabase_deadline_seconds: float = Field(10.0, description="Default total time budget of a Supabase call, retries included")
+    supabase_retry_attempts: int = Field(3, description="Max attempts per Supabase call (retries only for idempotent calls)")
+    supabase_retry_backoff_seconds: float = Field(0.1, description="Base of the jittered exponential retry backoff")
+    supabase_retry_backoff_max_seconds: float = Field(2.0, description="Max retry backoff")
+    supabase_circuit_failure_threshold: int = Field(5, description="Consecutive failed calls that open the circuit")
+    supabase_circuit_reset_seconds: float = Field(15.0, description="How long an open circuit fails fast before probing")
 
     # Google Cloud / Vertex AI
     gcp_project_id: Optional[str] = Field(None, description="GCP project ID")
@@ -58,6 +85,11 @@ class Settings(BaseSettings):
     # Frontend serving
     frontend_dist_dir: Optional[str] = Field(None, description="Path to built frontend assets")
 
+    # Response compression
+    compression_min_size: int = Field(1024, description="Min response size (bytes) to compress")
+    compression_offload_size: int = Field(65536, description="Compress bodies at least this large in a worker thread")
+    precompress_static: bool = Field(True, description="Write .br/.gz variants of frontend assets at startup")
+
     # Security headers
     csp_policy: Optional[str] = Field(None, description="Content-Security-Policy header")
 
@@ -71,6 +103,62 @@ class Settings(BaseSettings):
     polar_product_topup_small: Optional[str] = Field(None, description="Polar small token top-up product ID")
     polar_product_topup_large: Optional[str] = Field(None, description="Polar large token top-up product ID")
 
+    # Career path video prefetch
+    video_prefetch_enabled: bool = Field(True, description="Prefetch milestone videos after career path generation")
+    video_prefetch_ttl_seconds: int = Field(600, description="How long unused video prefetches are kept")
+    video_prefetch_concurrency: int = Field(4, description="Max concurrent video prefetch LLM calls")
+
+    # Shared LLM response cache (negotiation, interview questions, videos)
+    llm_cache_enabled: bool = Field(True, description="Cache generic role/location LLM responses")
+    llm_cache_ttl_seconds: int = Field(86400, description="LLM response cache TTL")
+    llm_cache_max_entries: int = Field(5000, description="Max cached LLM response keys")
+    llm_cache_embedding_model: Optional[str] = Field(None, description="Vertex embedding model for similarity matching (e.g. text-embedding-004)")
+    llm_cache_similarity_threshold: float = Field(0.92, description="Min cosine similarity for an embedding cache hit")
+
+    # Server-side token metering
+    token_metering_enabled: bool = Field(
+        False, description="Debit tokens server-side from leased balances (needs docs/TokenMetering.sql applied)"
+    )
+    token_lease_size: int = Field(10, description="Tokens leased from Supabase per lease")
+    token_lease_ttl_seconds: int = Field(900, description="Lease lifetime before unused tokens are refunded")
+    token_flush_interval_seconds: float = Field(5.0, description="How often local usage is reported to Supabase")
+    account_status_cache_ttl_seconds: float = Field(
+        10.0, description="Per-user cache of token/subscription status (0 disables)"
+    )
+
+    # Background token replenishment
+    token_replenish_scheduler_enabled: bool = Field(
+        False,
+        description="Sweep due token replenishments in the background (needs docs/TokenReplenishment.sql); "
+        "otherwise workspace reads replenish",
+    )
+    token_replenish_interval_seconds: float = Field(300.0, description="Time between sweeps (also the leader lease length)")
+    token_replenish_batch_size: int = Field(500, description="Users replenished per bulk RPC")
+    token_replenish_batches_per_second: float = Field(2.0, description="Max bulk RPCs per second within a sweep")
+
+    # LaTeX (Tectonic) compilation
+    latex_compile_workers: Optional[int] = Field(None, description="Concurrent Tectonic processes (default: CPU cores)")
+    latex_compile_queue_size: int = Field(16, description="Compiles allowed to wait for a worker before rejecting")
+    latex_compile_per_user_limit: int = Field(2, description="Max compiles in progress per user")
+    latex_compile_timeout_seconds: float = Field(30.0, description="Tectonic run timeout")
+    latex_tectonic_cache_dir: Optional[str] = Field(None, description="Persistent Tectonic cache (TECTONIC_CACHE_DIR) for bundle files and formats")
+    latex_tectonic_bundle: Optional[str] = Field(None, description="Tectonic bundle path or URL (default: Tectonic's built-in bundle)")
+    latex_tectonic_only_cached: bool = Field(False, description="Compile from the warmed cache only, never fetching bundle files")
+    latex_warmup_on_startup: bool = Field(True, description="Fill the Tectonic cache in the background at startup")
+    pdf_simple_renderer_enabled: bool = Field(True, description="Render plain documents in-process instead of with Tectonic")
+    pdf_cache_enabled: bool = Field(True, description="Reuse PDFs compiled from identical markdown")
+    pdf_cache_dir: Optional[str] = Field(None, description="Directory for cached PDFs (default: <tmp>/rezzy-pdf-cache; on Cloud Run /tmp uses instance memory)")
+    pdf_cache_max_bytes: int = Field(64 * 1024 * 1024, description="Max total size of cached PDFs on disk")
+    pdf_cache_memory_max_bytes: int = Field(8 * 1024 * 1024, description="Max total size of PDFs kept in memory")
+    pdf_cache_memory_item_max_bytes: int = Field(256 * 1024, description="Largest PDF kept in memory")
+
+    # Workspace write-behind
+    workspace_write_behind_enabled: bool = Field(
+        False, description="Coalesce workspace saves before writing (acknowledged before they are durable)"
+    )
+    workspace_write_window_seconds: float = Field(3.0, description="How long saves are buffered per user")
+    workspace_write_max_pending: int = Field(50, description="Flush a user's queue early at this many saves")
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
@@ -1,23 +1,58 @@
 """Authentication dependency for FastAPI routes."""
 
-from typing import Annotated, Optional
+import hashlib
+import logging
+import time
+from typing import Annotated, Any, Dict, Optional
 
 import httpx
 from fastapi import Depends, Header, HTTPException, status
 
 from app.config import get_settings
+from app.services.auth_tokens import (
+    TokenInvalidError,
+    VerificationUnavailableError,
+    get_token_verifier,
+    unverified_expiry,
+)
+from app.services.cache import SingleFlight, TTLCache
+from app.services.http import SUPABASE_AUTH, get_http_client
 
+logger = logging.getLogger(__name__)
 
-async def get_current_user(
-    authorization: Optional[str] = Header(default=None, convert_underscores=False),
-) -> dict:
-    """
-    Validate Supabase access token and return user info.
-    
-    Returns: {"id": str, "email": str | None}
-    """
-    settings = get_settings()
+# token hash -> user for remotely validated tokens
+_remote_users: Optional[TTLCache] = None
+_remote_flight = SingleFlight()
+
+
+def _remote_user_cache() -> TTLCache:
+    global _remote_users
+    if _remote_users is None:
+        settings = get_settings()
+        _remote_users = TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+    return _remote_users
+
+
+def _token_key(token: str) -> str:
+    # Hash so raw tokens aren't kept in memory and keys have a fixed size
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalidate_token(authorization: Optional[str]) -> None:
+    """Drop a cached user for this Authorization header (e.g. after a 401)."""
+    if _remote_users is None or not authorization or " " not in authorization:
+        return
+    _remote_users.pop(_token_key(authorization.split(" ", 1)[1].strip()))
 
+
+def auth_cache_stats() -> Dict[str, Any]:
+    stats = _remote_user_cache().stats()
+    stats["sharedInflight"] = _remote_flight.shared
+    return stats
+
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    """Extract the bearer token from an Authorization header."""
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +65,35 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid bearer token.",
         )
+    return token
+
+
+async def _verify_locally(token: str) -> Optional[dict]:
+    """
+    Verify the token in-process.
+
+    Returns the user, or None when local verification isn't possible and the
+    caller should fall back to Supabase Auth.
+    """
+    verifier = get_token_verifier()
+    if verifier is None:
+        return None
+    try:
+        claims = await verifier.verify(token)
+    except TokenInvalidError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(exc),
+        )
+    except VerificationUnavailableError as exc:
+        logger.debug("Local token verification unavailable: %s", exc)
+        return None
+    return {"id": claims["id"], "email": claims["email"]}
+
+
+async def _validate_remote(token: str) -> dict:
+    """Validate the token against Supabase Auth (`/auth/v1/user`)."""
+    settings = get_settings()
 
     headers = {
         "apikey": settings.supabase_secret_key,
@@ -37,11 +101,8 @@ async def get_current_user(
     }
 
     try:
-        async with httpx.AsyncClient(
-            base_url=str(settings.supabase_url),
-            timeout=10,
-        ) as client:
-            resp = await client.get("/auth/v1/user", headers=headers)
+        client = get_http_client(SUPABASE_AUTH)
+        resp = await client.get("/auth/v1/user", headers=headers)
 
         if resp.status_code != 200:
             detail = "Token validation failed"
@@ -82,4 +143,59 @@ async def get_current_user(
         )
 
 
+async def _validate_remote_cached(token: str) -> dict:
+    """Remote validation through a token -> user cache with single-flight misses."""
+    cache = _remote_user_cache()
+    key = _token_key(token)
+    user = cache.get(key)
+    if user is not None:
+        return user
+
+    async def validate() -> dict:
+        user = await _validate_remote(token)
+        ttl = float(cache.ttl)
+        exp = unverified_expiry(token)
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            cache.set(key, user, ttl)
+        return user
+
+    return await _remote_flight.do(key, validate)
+
+
+async def get_current_user(
+    authorization: Optional[str] = Header(default=None, convert_underscores=False),
+) -> dict:
+    """
+    Validate Supabase access token and return user info.
+
+    Verified locally (signature, exp, aud, sub) when possible; falls back to
+    Supabase Auth otherwise.
+
+    Returns: {"id": str, "email": str | None}
+    """
+    token = _bearer_token(authorization)
+    user = await _verify_locally(token)
+    if user is not None:
+        return user
+    return await _validate_remote_cached(token)
+
+
+async def get_current_user_strict(
+    authorization: Optional[str] = Header(default=None, convert_underscores=False),
+) -> dict:
+    """
+    Like `get_current_user`, but always confirms with Supabase Auth.
+
+    For revocation-sensitive routes: a signed-out or deleted user's token
+    stays cryptographically valid until it expires.
+    """
+    token = _bearer_token(authorization)
+    # Cheap local rejection of bad tokens before the network hop
+    await _verify_locally(token)
+    return await _validate_remote(token)
+
+
 CurrentUser = Annotated[dict, Depends(get_current_user)]
+CurrentUserStrict = Annotated[dict, Depends(get_current_user_strict)]
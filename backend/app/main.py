@@ -1,20 +1,37 @@
 """FastAPI application entry point."""
 
+import asyncio
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response
 
 from app.config import get_settings
+from app.middleware.compression import (
+    CompressionMiddleware,
+    PrecompressedStaticFiles,
+    precompress_directory,
+    precompressed_file_response,
+)
+from app.services.http import close_http_clients
+from app.services.serialization import FastJSONResponse
 
-# Import routers
+# Import routers (and the services whose background work the lifespan runs)
 try:
+    from app.deps.auth import invalidate_token
     from app.routers import analytics, health, latex, llm, parse, payments, workspace
+    from app.services.latex import warm_up_tectonic
+    from app.services.latex_templates import get_latex_templates
+    from app.services.metering import get_token_ledger
+    from app.services.replenishment import get_replenishment_scheduler
+    from app.services.supabase import SupabaseUnavailable
+    from app.services.workspace_writes import get_workspace_write_buffer
     ROUTERS_LOADED = True
 except Exception as e:
     print(f"⚠ Router import failed: {e}", file=sys.stderr)
@@ -56,6 +73,48 @@ def find_frontend_dir() -> Optional[Path]:
     return None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and flush state on shutdown."""
+    if not ROUTERS_LOADED:
+        # Only health is served; there is nothing to start
+        try:
+            yield
+        finally:
+            await close_http_clients()
+        return
+
+    # Fail fast on a malformed LaTeX template rather than on the first export
+    get_latex_templates()
+    ledger = get_token_ledger()
+    if ledger:
+        ledger.start()
+    replenishment = get_replenishment_scheduler()
+    if replenishment:
+        replenishment.start()
+    settings = get_settings()
+    # An only-cached pool compiles from a cache warmed at image build; warming again would hold a compile slot
+    warm_up_latex = settings.latex_warmup_on_startup and not settings.latex_tectonic_only_cached
+    latex_warm_up = asyncio.create_task(warm_up_tectonic()) if warm_up_latex else None
+    try:
+        yield
+    finally:
+        if latex_warm_up and not latex_warm_up.done():
+            latex_warm_up.cancel()
+            try:
+                await latex_warm_up
+            except asyncio.CancelledError:
+                pass
+        if replenishment:
+            await replenishment.close()
+        writes = get_workspace_write_buffer()
+        if writes:
+            await writes.close()
+        if ledger:
+            await ledger.close()
+        await close_http_clients()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application."""
     try:
@@ -64,7 +123,12 @@ def create_app() -> FastAPI:
         print(f"ERROR: Configuration failed: {e}", file=sys.stderr)
         raise
 
-    app = FastAPI(title="Keju API", version="1.0.0")
+    app = FastAPI(
+        title="Keju API",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
 
     # CORS middleware
     if settings.allowed_origins:
@@ -76,6 +140,30 @@ def create_app() -> FastAPI:
             allow_headers=["*"],
         )
 
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        offload_size=settings.compression_offload_size,
+    )
+
+    if ROUTERS_LOADED:
+        # A 401 anywhere downstream means the cached user for this token is stale
+        @app.exception_handler(HTTPException)
+        async def handle_http_exception(request: Request, exc: HTTPException):
+            if exc.status_code == 401:
+                invalidate_token(request.headers.get("authorization"))
+            return await http_exception_handler(request, exc)
+
+        # Degraded database: tell clients to come back instead of a generic 500
+        @app.exception_handler(SupabaseUnavailable)
+        async def handle_supabase_unavailable(request: Request, exc: SupabaseUnavailable):
+            headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after else None
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "The database is temporarily unavailable. Please retry shortly."},
+                headers=headers,
+            )
+
     # CSP middleware
     if settings.csp_policy:
         @app.middleware("http")
@@ -108,21 +196,26 @@ def create_app() -> FastAPI:
     
     if frontend_dir:
         index_file = frontend_dir / "index.html"
+
+        # Compress bundles once instead of on every request (no-op if done at build)
+        if settings.precompress_static:
+            count = precompress_directory(frontend_dir)
+            print(f"✓ Precompressed {count} frontend files", file=sys.stderr)
         
         # Mount static assets
         assets_dir = frontend_dir / "assets"
         if assets_dir.exists():
-            app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
+            app.mount("/assets", PrecompressedStaticFiles(directory=str(assets_dir)), name="assets")
             print(f"✓ Mounted /assets from {assets_dir}", file=sys.stderr)
         
         # Serve index.html for root
         @app.get("/")
-        async def serve_root():
-            return FileResponse(str(index_file))
+        async def serve_root(request: Request):
+            return precompressed_file_response(index_file, request)
         
         # SPA catch-all - serve index.html for any non-API route
         @app.get("/{full_path:path}")
-        async def serve_spa(full_path: str):
+        async def serve_spa(full_path: str, request: Request):
             # Don't catch API routes
             if full_path.startswith(("api/", "healthz", "readyz", "assets/")):
                 raise HTTPException(status_code=404, detail="Not found")
@@ -130,10 +223,10 @@ def create_app() -> FastAPI:
             # Check if it's a static file request
             static_file = frontend_dir / full_path
             if static_file.exists() and static_file.is_file():
-                return FileResponse(str(static_file))
+                return precompressed_file_response(static_file, request)
             
             # Otherwise serve index.html for SPA routing
-            return FileResponse(str(index_file))
+            return precompressed_file_response(index_file, request)
         
         print(f"✓ Frontend serving enabled from {frontend_dir}", file=sys.stderr)
     else:
@@ -0,0 +1,270 @@
+"""
+Response compression.
+
+- `CompressionMiddleware` negotiates brotli/gzip for buffered API responses
+  above a size threshold; large bodies are compressed in a worker thread so
+  the event loop keeps serving other requests.
+- `PrecompressedStaticFiles` / `precompressed_file_response` serve `.br` or
+  `.gz` siblings of static files, produced once by `precompress_directory`
+  at image build or startup instead of on every request.
+
+Run `python -m app.middleware.compression <dist dir>` to precompress a build.
+"""
+
+import gzip
+import logging
+import mimetypes
+import os
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MINIMUM_SIZE = 1024
+DEFAULT_OFFLOAD_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Dynamic responses: favour speed
+STATIC_BROTLI_QUALITY = 11  # Precompressed once: favour size
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+COMPRESSIBLE_EXTENSIONS = frozenset({
+    ".js", ".mjs", ".css", ".html", ".json", ".svg", ".txt", ".map", ".xml", ".webmanifest",
+})
+
+# Preference order when the client accepts several encodings
+_ENCODING_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def _supported_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the best encoding from `available` allowed by an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if static else GZIP_LEVEL, mtime=0)
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """Compress single-body responses with brotli or gzip."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        offload_size: int = DEFAULT_OFFLOAD_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), _supported_encodings()
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)  # Streaming: leave untouched
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not _is_compressible(headers.get("content-type", ""))
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= self.offload_size:
+                compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            _add_vary(headers)
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                headers["etag"] = f"W/{headers['etag']}"
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _precompressed_variant(path: Path, accept_encoding: str) -> Optional[Tuple[Path, str]]:
+    available: List[str] = []
+    for encoding in ("br", "gzip"):
+        if path.with_name(path.name + _ENCODING_EXTENSIONS[encoding]).is_file():
+            available.append(encoding)
+    encoding = negotiate_encoding(accept_encoding, available)
+    if encoding is None:
+        return None
+    return path.with_name(path.name + _ENCODING_EXTENSIONS[encoding]), encoding
+
+
+def _variant_file_response(
+    path: Path,
+    accept_encoding: str,
+    status_code: int = 200,
+    stat_result: Optional[os.stat_result] = None,
+) -> FileResponse:
+    variant = _precompressed_variant(path, accept_encoding)
+    media_type = mimetypes.guess_type(str(path))[0] or "text/plain"
+    if variant is None:
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+    else:
+        variant_path, encoding = variant
+        response = FileResponse(variant_path, status_code=status_code, media_type=media_type)
+        response.headers["content-encoding"] = encoding
+    _add_vary(response.headers)
+    return response
+
+
+def precompressed_file_response(path: Path, request: Request) -> FileResponse:
+    """FileResponse for `path`, using a precompressed sibling when acceptable."""
+    return _variant_file_response(path, request.headers.get("accept-encoding", ""))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves `.br`/`.gz` siblings when the client accepts them."""
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str]",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        path = Path(full_path)
+        if path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        response = _variant_file_response(
+            path, request_headers.get("accept-encoding", ""), status_code, stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def precompress_directory(directory: Path, minimum_size: int = DEFAULT_MINIMUM_SIZE) -> int:
+    """
+    Write `.gz` (and `.br` when available) siblings for compressible files.
+
+    Existing variants newer than their source are kept. Returns the number of
+    files written. Read-only directories are skipped with a warning.
+    """
+    written = 0
+    for path in directory.rglob("*"):
+        if not path.is_file() or path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        stat = path.stat()
+        if stat.st_size < minimum_size:
+            continue
+        data = None
+        for encoding in _supported_encodings():
+            target = path.with_name(path.name + _ENCODING_EXTENSIONS[encoding])
+            if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            compressed = compress(data, encoding, static=True)
+            if len(compressed) >= len(data):
+                continue
+            try:
+                target.write_bytes(compressed)
+            except OSError as exc:
+                logger.warning("Cannot precompress %s: %s", path, exc)
+                return written
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        count = precompress_directory(Path(arg))
+        print(f"Precompressed {count} files in {arg}")
@@ -3,6 +3,14 @@
 from fastapi import APIRouter
 
 from app.config import get_settings
+from app.deps.auth import auth_cache_stats
+from app.services.latex import get_tectonic_pool, renderer_stats
+from app.services.llm_cache import get_llm_cache
+from app.services.pdf_cache import get_pdf_cache
+from app.services.prefetch import get_video_prefetcher
+from app.services.replenishment import get_replenishment_scheduler
+from app.services.supabase import account_status_cache_stats, supabase_request_stats
+from app.services.workspace_writes import get_workspace_write_buffer
 
 router = APIRouter(tags=["health"])
 
@@ -31,3 +39,25 @@ async def readiness():
             "status": "not_ready",
             "error": str(e),
         }
+
+
+@router.get("/metricsz")
+async def metrics():
+    """In-process cache and prefetch counters for this instance."""
+    llm_cache = get_llm_cache()
+    prefetcher = get_video_prefetcher()
+    writes = get_workspace_write_buffer()
+    replenishment = get_replenishment_scheduler()
+    pdf_cache = get_pdf_cache()
+    return {
+        "authUserCache": auth_cache_stats(),
+        "accountStatusCache": account_status_cache_stats(),
+        "supabase": supabase_request_stats(),
+        "llmCache": llm_cache.stats() if llm_cache else None,
+        "videoPrefetch": prefetcher.stats() if prefetcher else None,
+        "workspaceWrites": writes.stats() if writes else None,
+        "tokenReplenishment": replenishment.stats() if replenishment else None,
+        "latexCompile": get_tectonic_pool().stats(),
+        "pdfRenderers": renderer_stats(),
+        "pdfCache": pdf_cache.stats() if pdf_cache else None,
+    }
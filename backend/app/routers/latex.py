@@ -1,36 +1,373 @@
-"""LaTeX compilation endpoint for PDF generation."""
+"""LaTeX compilation endpoints for PDF generation."""
 
-from typing import Optional
+import asyncio
+import posixpath
+import re
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Set, Tuple, TypeVar
+from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException, Response
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
+from app.config import get_settings
 from app.deps.auth import CurrentUser
-from app.services.latex import compile_markdown_to_pdf
+from app.services.latex import (
+    CompileBusyError,
+    CompileLimitError,
+    compile_markdown_to_pdf,
+    compile_packet_to_pdf,
+    validate_markdown,
+)
+from app.services.latex_templates import get_latex_template, get_latex_templates
+from app.services.metering import TOKEN_COSTS, InsufficientTokensError, charge_tokens
+from app.services.supabase import load_document_bodies
+from app.services.workspace_writes import read_history_page, read_workspace
 
 router = APIRouter(prefix="/api/latex", tags=["latex"])
 
+# How often a running compile checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 0.25
+MAX_BATCH_DOCUMENTS = 5
+# History entries fetched per page while exporting
+EXPORT_PAGE_SIZE = 20
+# Times an export compile waits out a full instance before reporting it busy
+EXPORT_BUSY_RETRIES = 3
+EXPORT_BUSY_RETRY_SECONDS = 2.0
+
+# History entry field -> entry name suffix and the profile setting naming its template
+_EXPORT_FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("resumeContent", "resume", "selectedResumeTemplate"),
+    ("coverLetterContent", "cover-letter", "selectedCoverLetterTemplate"),
+)
+# Runs of anything but letters and digits (any script) become one dash
+_NAME_SEPARATORS = re.compile(r"[\W_]+")
+
+T = TypeVar("T")
+
 
 class CompileRequest(BaseModel):
     content: str
     filename: Optional[str] = None
+    # Template ID (see app.services.latex_templates); the default when omitted
+    template: Optional[str] = None
+
+
+class BatchCompileRequest(BaseModel):
+    documents: List[CompileRequest] = Field(..., min_length=1, max_length=MAX_BATCH_DOCUMENTS)
+    # Merge every document into one PDF (an application packet) instead of a ZIP;
+    # a packet is set in the first document's template
+    merge: bool = False
+    filename: Optional[str] = None
+
+
+async def _unless_disconnected(request: Request, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it (and its Tectonic process) if the client goes away."""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client closed request.")
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+def _compile_error(exc: Exception) -> HTTPException:
+    """Map a compile failure to the endpoint's HTTP error."""
+    if isinstance(exc, HTTPException):
+        return exc
+    if isinstance(exc, ValueError):
+        return HTTPException(status_code=400, detail=str(exc))
+    if isinstance(exc, InsufficientTokensError):
+        return HTTPException(status_code=402, detail=str(exc))
+    if isinstance(exc, CompileLimitError):
+        return HTTPException(status_code=429, detail=str(exc))
+    if isinstance(exc, CompileBusyError):
+        return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "2"})
+    if isinstance(exc, RuntimeError):
+        return HTTPException(status_code=500, detail=str(exc))
+    return HTTPException(status_code=500, detail="Failed to generate PDF.")
+
+
+def _attachment(filename: Optional[str], default: str) -> Dict[str, str]:
+    """
+    Content-Disposition for a download named by the client: path, quotes and
+    control characters are stripped, and a non-ASCII name gets an ASCII
+    fallback plus its RFC 5987 `filename*` form.
+    """
+    name = posixpath.basename((filename or "").replace("\\", "/"))
+    name = "".join(char for char in name if char.isprintable() and char != '"').strip() or default
+    fallback = "".join(char if char.isascii() else "_" for char in name)
+    value = f'attachment; filename="{fallback}"'
+    if fallback != name:
+        value += f"; filename*=UTF-8''{quote(name, safe='')}"
+    return {"Content-Disposition": value}
+
+
+def _pdf_response(pdf_bytes: bytes, filename: Optional[str], default: str) -> Response:
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=_attachment(filename, default))
 
 
 @router.post("/compile")
-async def compile_resume(req: CompileRequest, user: CurrentUser):
-    """Compile markdown content into PDF using Tectonic."""
+async def compile_resume(req: CompileRequest, request: Request, user: CurrentUser):
+    """Compile markdown content into PDF in the requested template."""
+    try:
+        async with charge_tokens(user["id"], TOKEN_COSTS["pdf_download"]):
+            pdf_bytes = await _unless_disconnected(
+                request, compile_markdown_to_pdf(req.content, user["id"], req.template)
+            )
+    except Exception as exc:
+        raise _compile_error(exc)
+
+    return _pdf_response(pdf_bytes, req.filename, "resume.pdf")
+
+
+def _entry_names(documents: List[CompileRequest]) -> List[str]:
+    """Unique, path-free .pdf names for the ZIP entries."""
+    names: List[str] = []
+    for index, doc in enumerate(documents, start=1):
+        base = posixpath.basename((doc.filename or "").replace("\\", "/")).strip() or f"document-{index}.pdf"
+        if not base.lower().endswith(".pdf"):
+            base += ".pdf"
+        name, suffix = base, 2
+        while name in names:
+            name = f"{base[:-4]}-{suffix}.pdf"
+            suffix += 1
+        names.append(name)
+    return names
+
+
+class _ZipChunks:
+    """Unseekable file for ZipFile that hands back what was written since the last drain."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_result(archive: zipfile.ZipFile, name: str, task: "asyncio.Task[bytes]") -> None:
+    """Add a finished compile to the archive, or `<name>.error.txt` if it failed."""
     try:
-        pdf_bytes = compile_markdown_to_pdf(req.content)
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
-    except RuntimeError as re:
-        raise HTTPException(status_code=500, detail=str(re))
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to generate PDF.")
-
-    filename = req.filename or "resume.pdf"
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        archive.writestr(name, task.result())
+    except Exception as exc:
+        # Headers are long gone; report the failure inside the archive
+        archive.writestr(f"{name[:-4]}.error.txt", _compile_error(exc).detail)
+
+
+async def _stream_zip(
+    names: Dict["asyncio.Task[bytes]", str],
+    done: Set["asyncio.Task[bytes]"],
+    pending: Set["asyncio.Task[bytes]"],
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive entry by entry, in the order the PDFs finish."""
+    out = _ZipChunks()
+    try:
+        # Already-compressed PDFs gain nothing from deflate
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+            while True:
+                # Tasks that finished together go in request order
+                for task in sorted(done, key=list(names).index):
+                    _write_result(archive, names[task], task)
+                    yield out.drain()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        yield out.drain()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@router.post("/compile-batch")
+async def compile_batch(req: BatchCompileRequest, request: Request, user: CurrentUser):
+    """
+    Compile several documents in one request.
+
+    With `merge`, returns one PDF with each document starting on a new page.
+    Otherwise compiles them in parallel and streams a ZIP, adding each PDF as
+    soon as it's ready. A document that fails after the stream has started
+    appears as `<name>.error.txt` in the archive.
+    """
+    try:
+        for doc in req.documents:
+            validate_markdown(doc.content)
+            get_latex_template(doc.template)
+    except ValueError as exc:
+        raise _compile_error(exc)
+
+    if req.merge:
+        try:
+            async with charge_tokens(user["id"], TOKEN_COSTS["pdf_download"] * len(req.documents)):
+                pdf_bytes = await _unless_disconnected(
+                    request,
+                    compile_packet_to_pdf([doc.content for doc in req.documents], user["id"], req.documents[0].template),
+                )
+        except Exception as exc:
+            raise _compile_error(exc)
+        return _pdf_response(pdf_bytes, req.filename, "application-packet.pdf")
+
+    # Stay within the per-user compile limit however many documents there are
+    slots = asyncio.Semaphore(get_settings().latex_compile_per_user_limit)
+
+    async def compile_one(doc: CompileRequest) -> bytes:
+        # Each document is charged on its own, so one that fails is refunded
+        async with slots, charge_tokens(user["id"], TOKEN_COSTS["pdf_download"]):
+            return await compile_markdown_to_pdf(doc.content, user["id"], doc.template)
+
+    names = {
+        asyncio.create_task(compile_one(doc)): name
+        for doc, name in zip(req.documents, _entry_names(req.documents))
+    }
+    try:
+        done, pending = await _unless_disconnected(
+            request, asyncio.wait(names, return_when=asyncio.FIRST_COMPLETED)
+        )
+        # Capacity and balance errors before anything is sent keep their status codes
+        for task in done:
+            exc = task.exception()
+            if isinstance(exc, (CompileLimitError, CompileBusyError, InsufficientTokensError)):
+                raise _compile_error(exc)
+    except BaseException:
+        for task in names:
+            task.cancel()
+        raise
+
+    return StreamingResponse(
+        _stream_zip(names, done, pending),
+        media_type="application/zip",
+        headers=_attachment(req.filename, "documents.zip"),
+    )
+
+
+def _export_name(entry: Dict[str, Any], suffix: str, taken: Set[str]) -> str:
+    """A unique `<date>-<company>-<job-title>-<suffix>.pdf` name for a history entry."""
+    parts = [str(entry.get("generatedAt") or "")[:10], entry.get("companyName"), entry.get("jobTitle")]
+    slugs = [_NAME_SEPARATORS.sub("-", str(part).lower()).strip("-")[:40] for part in parts if part]
+    base = "-".join([slug for slug in slugs if slug] + [suffix])
+    name, index = f"{base}.pdf", 2
+    while name in taken:
+        name = f"{base}-{index}.pdf"
+        index += 1
+    taken.add(name)
+    return name
+
+
+async def _export_documents(
+    user_id: str,
+    items: List[Dict[str, Any]],
+    cursor: Optional[str],
+    templates: Dict[str, Optional[str]],
+) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+    """
+    Yield (entry name, markdown, template) for every PDF in the document
+    history, newest first, fetching one page of entries and one entry's
+    bodies at a time.
+    """
+    taken: Set[str] = set()
+    while True:
+        for entry in items:
+            document = await load_document_bodies(user_id, entry)
+            for field, suffix, setting in _EXPORT_FIELDS:
+                content = document.get(field)
+                if isinstance(content, str) and content.strip():
+                    yield _export_name(entry, suffix, taken), content, templates.get(setting)
+        if cursor is None:
+            return
+        items, cursor = await read_history_page(user_id, "documentHistory", EXPORT_PAGE_SIZE, cursor)
+
+
+async def _compile_for_export(content: str, user_id: str, template: Optional[str]) -> bytes:
+    """Compile (and charge for) one exported document, waiting out a briefly full instance."""
+    async with charge_tokens(user_id, TOKEN_COSTS["pdf_download"]):
+        for _ in range(EXPORT_BUSY_RETRIES):
+            try:
+                return await compile_markdown_to_pdf(content, user_id, template)
+            except CompileBusyError:
+                await asyncio.sleep(EXPORT_BUSY_RETRY_SECONDS)
+        return await compile_markdown_to_pdf(content, user_id, template)
+
+
+async def _stream_export(
+    documents: AsyncIterator[Tuple[str, str, Optional[str]]], user_id: str
+) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP of the exported PDFs in the order they finish.
+
+    At most the per-user compile limit of documents are in flight, and the
+    next one is only read once a slot frees up, so memory stays flat however
+    long the history is.
+    """
+    window = get_settings().latex_compile_per_user_limit
+    names: Dict["asyncio.Task[bytes]", str] = {}
+    out = _ZipChunks()
+    try:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+            exhausted = False
+            while True:
+                while not exhausted and len(names) < window:
+                    document = await anext(documents, None)
+                    if document is None:
+                        exhausted = True
+                        break
+                    name, content, template = document
+                    names[asyncio.create_task(_compile_for_export(content, user_id, template))] = name
+                if not names:
+                    break
+                done, _ = await asyncio.wait(names, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=list(names).index):
+                    _write_result(archive, names.pop(task), task)
+                    yield out.drain()
+        yield out.drain()
+    finally:
+        for task in names:
+            task.cancel()
+        await documents.aclose()
+
+
+@router.get("/export")
+async def export_documents(user: CurrentUser, filename: Optional[str] = None):
+    """
+    Export the whole document history as a ZIP of PDFs.
+
+    Each entry's resume and cover letter compile in the templates chosen in
+    the profile, from the PDF cache where possible, within the per-user
+    compile limit, and cost a token each like single downloads. The ZIP streams as PDFs finish; a document that fails
+    appears as `<name>.error.txt` in the archive.
+    """
+    user_id = user["id"]
+    items, cursor = await read_history_page(user_id, "documentHistory", EXPORT_PAGE_SIZE, None)
+    if not items:
+        raise HTTPException(status_code=404, detail="No documents to export.")
+
+    profile = (await read_workspace(user_id, fields={"profile"})).get("profile") or {}
+    registry = get_latex_templates()
+    # A template that no longer exists falls back to the default rather than failing every document
+    templates = {
+        setting: profile.get(setting) if profile.get(setting) in registry else None
+        for _, _, setting in _EXPORT_FIELDS
+    }
+    return StreamingResponse(
+        _stream_export(_export_documents(user_id, items, cursor, templates), user_id),
+        media_type="application/zip",
+        headers=_attachment(filename, "documents.zip"),
     )
@@ -8,6 +8,14 @@ from pydantic import BaseModel
 from app.deps.agent import get_agent_service
 from app.deps.auth import CurrentUser
 from app.schemas.generation import GenerateDocumentsRequest
+from app.services.metering import (
+    TOKEN_COSTS,
+    InsufficientTokensError,
+    charge_tokens,
+    generation_cost,
+)
+from app.services.prefetch import get_video_prefetcher
+from app.services.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/api/llm", tags=["llm"])
 
@@ -71,15 +79,17 @@ class VideoRequest(BaseModel):
 
 @router.post("/generate-documents")
 async def generate_documents(req: GenerateDocumentsRequest, user: CurrentUser):
-    """Generate tailored resume and cover letter.
-    
-    Token validation is handled client-side. This endpoint only requires authentication.
-    """
+    """Generate tailored resume and cover letter."""
+    options = req.options.model_dump()
     try:
-        return await get_agent_service().generate_documents(
-            profile=req.profile.model_dump(),
-            options=req.options.model_dump(),
-        )
+        async with charge_tokens(user["id"], generation_cost(options)):
+            result = await get_agent_service().generate_documents(
+                profile=req.profile.model_dump(),
+                options=options,
+            )
+            return FastJSONResponse(result)
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -87,22 +97,32 @@ async def generate_documents(req: GenerateDocumentsRequest, user: CurrentUser):
 @router.post("/career-path")
 async def career_path(req: CareerPathRequest, user: CurrentUser):
     """Build career path from current to target role."""
+    agent = get_agent_service()
     try:
-        return await get_agent_service().career_path(
+        result = await agent.career_path(
             req.profile, req.currentRole, req.targetRole
         )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
+    # Milestone videos are requested next; start them all now
+    prefetcher = get_video_prefetcher()
+    if prefetcher:
+        prefetcher.schedule(agent, user["id"], req.targetRole, result)
+    return FastJSONResponse(result)
+
 
 @router.post("/networking/brief")
 async def networking_brief(req: NetworkingRequest, user: CurrentUser):
     """Generate networking coffee chat brief."""
     try:
-        result = await get_agent_service().networking_brief(
-            req.profile, req.counterpartInfo
-        )
-        return {"text": result}
+        async with charge_tokens(user["id"], TOKEN_COSTS["networking"]):
+            result = await get_agent_service().networking_brief(
+                req.profile, req.counterpartInfo
+            )
+            return {"text": result}
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -111,10 +131,13 @@ async def networking_brief(req: NetworkingRequest, user: CurrentUser):
 async def networking_reach_out(req: NetworkingRequest, user: CurrentUser):
     """Draft personalized outreach message."""
     try:
-        result = await get_agent_service().networking_reach_out(
-            req.profile, req.counterpartInfo
-        )
-        return {"text": result}
+        async with charge_tokens(user["id"], TOKEN_COSTS["networking"]):
+            result = await get_agent_service().networking_reach_out(
+                req.profile, req.counterpartInfo
+            )
+            return {"text": result}
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -123,9 +146,12 @@ async def networking_reach_out(req: NetworkingRequest, user: CurrentUser):
 async def application_fit(req: ApplicationAnalysisRequest, user: CurrentUser):
     """Analyze resume fit for job description."""
     try:
-        return await get_agent_service().analyze_application(
-            req.resumeText, req.jobDescription
-        )
+        async with charge_tokens(user["id"], TOKEN_COSTS["application_fit"]):
+            return await get_agent_service().analyze_application(
+                req.resumeText, req.jobDescription
+            )
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -134,7 +160,10 @@ async def application_fit(req: ApplicationAnalysisRequest, user: CurrentUser):
 async def mentor_match(req: MentorMatchRequest, user: CurrentUser):
     """Match thesis topic to faculty mentors."""
     try:
-        return await get_agent_service().mentor_match(req.topic, req.facultyList)
+        async with charge_tokens(user["id"], TOKEN_COSTS["mentor_match"]):
+            return await get_agent_service().mentor_match(req.topic, req.facultyList)
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -152,8 +181,11 @@ async def negotiation(req: NegotiationRequest, user: CurrentUser):
 async def interview_story(req: InterviewStoryRequest, user: CurrentUser):
     """Refine story into STAR format."""
     try:
-        result = await get_agent_service().interview_story(req.brainDump)
-        return {"text": result}
+        async with charge_tokens(user["id"], TOKEN_COSTS["interview"]):
+            result = await get_agent_service().interview_story(req.brainDump)
+            return {"text": result}
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -162,7 +194,10 @@ async def interview_story(req: InterviewStoryRequest, user: CurrentUser):
 async def interview_questions(req: InterviewQuestionsRequest, user: CurrentUser):
     """Generate likely interview questions."""
     try:
-        return await get_agent_service().interview_questions(req.jobDescription)
+        async with charge_tokens(user["id"], TOKEN_COSTS["interview"]):
+            return await get_agent_service().interview_questions(req.jobDescription)
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -171,8 +206,11 @@ async def interview_questions(req: InterviewQuestionsRequest, user: CurrentUser)
 async def reframe(req: ReframeFeedbackRequest, user: CurrentUser):
     """Reframe feedback into growth plan."""
     try:
-        result = await get_agent_service().reframe_feedback(req.feedback)
-        return {"text": result}
+        async with charge_tokens(user["id"], TOKEN_COSTS["interview"]):
+            result = await get_agent_service().reframe_feedback(req.feedback)
+            return {"text": result}
+    except InsufficientTokensError as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -192,6 +230,11 @@ async def career_chat(req: CareerChatRequest, user: CurrentUser):
 @router.post("/career/videos")
 async def career_videos(req: VideoRequest, user: CurrentUser):
     """Get video recommendations for career milestone."""
+    prefetcher = get_video_prefetcher()
+    if prefetcher:
+        videos = await prefetcher.get(user["id"], req.targetRole, req.milestone)
+        if videos is not None:
+            return videos
     try:
         return await get_agent_service().video_recommendations(
             req.targetRole, req.milestone
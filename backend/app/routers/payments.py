@@ -5,7 +5,9 @@ from typing import Literal, Optional
 from fastapi import APIRouter, Header, HTTPException, Request
 from pydantic import BaseModel
 
-from app.deps.auth import CurrentUser
+from app.deps.auth import CurrentUser, CurrentUserStrict
+from app.services.etag import conditional_json
+from app.services.metering import get_token_ledger
 from app.services.polar import PolarClient, handle_polar_webhook
 from app.services.supabase import fetch_subscription_status, get_token_status, deduct_tokens
 
@@ -22,7 +24,7 @@ class CheckoutRequest(BaseModel):
 
 
 @router.post("/checkout")
-async def create_checkout(req: CheckoutRequest, user: CurrentUser):
+async def create_checkout(req: CheckoutRequest, user: CurrentUserStrict):
     """Create Polar checkout session."""
     client = PolarClient()
     url = await client.create_checkout_session(
@@ -38,15 +40,19 @@ async def create_checkout(req: CheckoutRequest, user: CurrentUser):
 
 
 @router.get("/status")
-async def get_subscription_status(user: CurrentUser):
+async def get_subscription_status(request: Request, user: CurrentUser):
     """Get user's subscription status."""
-    return await fetch_subscription_status(user["id"])
+    return conditional_json(request, await fetch_subscription_status(user["id"]))
 
 
 @router.get("/tokens")
-async def get_tokens(user: CurrentUser):
+async def get_tokens(request: Request, user: CurrentUser):
     """Get detailed token status including replenishment info."""
-    return await get_token_status(user["id"])
+    status = await get_token_status(user["id"])
+    ledger = get_token_ledger()
+    if ledger:
+        status["tokens"] += ledger.outstanding(user["id"])
+    return conditional_json(request, status)
 
 
 @router.post("/webhook")
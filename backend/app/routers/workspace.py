@@ -1,30 +1,211 @@
 """Workspace persistence endpoints."""
 
-from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, FrozenSet, Optional
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request
 
 from app.deps.auth import CurrentUser
-from app.services.supabase import fetch_workspace, persist_workspace
+from app.schemas.workspace import ChatAppendRequest, DocumentEntry
+from app.services.etag import etag_matches, json_response, make_etag, not_modified
+from app.services.metering import get_token_ledger
+from app.services.serialization import loads
+from app.services.supabase import (
+    TOKEN_FIELDS,
+    WORKSPACE_FIELDS,
+    SupabaseNotFound,
+    SupabaseUnavailable,
+    fetch_workspace_version,
+    load_document_bodies,
+    replenish_is_due,
+)
+from app.services.workspace_writes import (
+    CHAT_APPEND,
+    CHAT_REMOVE,
+    DOCUMENT_ADD,
+    DOCUMENT_REMOVE,
+    PROFILE_PATCH,
+    SNAPSHOT,
+    get_workspace_write_buffer,
+    read_document_entry,
+    read_history_page,
+    read_workspace,
+    write_workspace,
+)
 
 router = APIRouter(prefix="/api/workspace", tags=["workspace"])
 
+DEFAULT_PAGE_SIZE = 20
+SAVE_FAILED_MESSAGE = "Some recent changes couldn't be saved yet. They'll be retried on your next save."
+MAX_PAGE_SIZE = 100
+
+
+def _parse_fields(fields: Optional[str]) -> FrozenSet[str]:
+    if not fields:
+        return WORKSPACE_FIELDS
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested - WORKSPACE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown workspace fields: {', '.join(sorted(unknown))}.",
+        )
+    return requested
+
+
+async def _save(user_id: str, kind: str, payload: Any) -> Dict[str, Any]:
+    try:
+        version: Optional[int] = await write_workspace(user_id, kind, payload)
+    except SupabaseUnavailable:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    result: Dict[str, Any] = {"ok": True}
+    if version is not None:
+        result["version"] = version
+    return result
+
 
 @router.get("")
-async def get_workspace(user: CurrentUser):
-    """Fetch user's workspace data."""
-    return await fetch_workspace(user["id"])
+async def get_workspace(
+    request: Request,
+    user: CurrentUser,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of workspace fields"),
+):
+    """
+    Fetch user's workspace data, or only the requested `fields`.
+
+    The ETag is derived from the stored version, this instance's unflushed
+    saves and its leased tokens, so a matching If-None-Match is answered
+    with 304 after reading only `updated_at`. It is computed before the full
+    read; a write racing the read can only make the tag stale, never wrong.
+
+    Buffered saves that kept failing are retried first; if they still fail
+    the response carries `saveError` (and is never a 304) so the client can
+    tell the user.
+    """
+    user_id = user["id"]
+    wanted = _parse_fields(fields)
+    writes = get_workspace_write_buffer()
+    if writes and writes.failure(user_id):
+        await writes.flush_user(user_id)
+    save_failed = bool(writes and writes.failure(user_id))
+    ledger = get_token_ledger()
+    etag = make_etag(
+        await fetch_workspace_version(user_id),
+        writes.version(user_id) if writes else None,
+        ledger.outstanding(user_id) if ledger else 0,
+        sorted(wanted),
+    )
+    # A due replenishment changes the balance without bumping the version
+    replenish_due = bool(wanted & TOKEN_FIELDS) and replenish_is_due(user_id)
+    if etag_matches(request, etag) and not (replenish_due or save_failed):
+        return not_modified(etag)
+
+    workspace = await read_workspace(user_id, wanted)
+    if ledger and "tokens" in workspace:
+        # Tokens leased to this instance are spendable but not in the row
+        workspace["tokens"] = (workspace.get("tokens") or 0) + ledger.outstanding(user_id)
+    if save_failed:
+        workspace["saveError"] = SAVE_FAILED_MESSAGE
+    return json_response(workspace, etag)
+
+
+async def _history_page(user_id: str, history: str, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    try:
+        items, next_cursor = await read_history_page(user_id, history, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": items, "nextCursor": next_cursor}
+
+
+@router.get("/documents")
+async def list_documents(
+    user: CurrentUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Page through the document history, newest first."""
+    return await _history_page(user["id"], "documentHistory", limit, cursor)
+
+
+@router.get("/documents/{document_id}")
+async def get_document(request: Request, document_id: str, user: CurrentUser):
+    """
+    One document with its bodies (resume, cover letter, analysis), which the
+    workspace and history listings leave out. Bodies are content-addressed,
+    so the entry alone determines the ETag.
+    """
+    user_id = user["id"]
+    try:
+        entry = await read_document_entry(user_id, document_id)
+    except SupabaseNotFound:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    etag = make_etag(entry)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(await load_document_bodies(user_id, entry), etag)
+
+
+@router.get("/chats")
+async def list_chats(
+    user: CurrentUser,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Page through career chats (with messages), most recently updated first."""
+    return await _history_page(user["id"], "careerChatHistory", limit, cursor)
 
 
 @router.post("")
-async def save_workspace(payload: dict, user: CurrentUser):
+async def save_workspace(request: Request, user: CurrentUser):
     """Save user's workspace data."""
     try:
-        await persist_workspace(
-            user_id=user["id"],
-            profile=payload.get("profile"),
-            document_history=payload.get("documentHistory"),
-            career_chat_history=payload.get("careerChatHistory"),
-            tokens=payload.get("tokens"),
-        )
-        return {"ok": True}
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
+        payload = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body.")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Workspace payload must be an object.")
+
+    # With server-side metering the balance is owned by the ledger, not the client
+    tokens = None if get_token_ledger() else payload.get("tokens")
+    return await _save(user["id"], SNAPSHOT, {
+        "profile": payload.get("profile"),
+        "documentHistory": payload.get("documentHistory"),
+        "careerChatHistory": payload.get("careerChatHistory"),
+        "tokens": tokens,
+    })
+
+
+@router.patch("/profile")
+async def update_profile(user: CurrentUser, patch: Dict[str, Any] = Body(...)):
+    """Merge the given top-level fields into the stored profile."""
+    return await _save(user["id"], PROFILE_PATCH, patch)
+
+
+@router.post("/documents")
+async def save_document(document: DocumentEntry, user: CurrentUser):
+    """Add one entry to the document history."""
+    return await _save(user["id"], DOCUMENT_ADD, document.model_dump())
+
+
+@router.delete("/documents/{document_id}")
+async def delete_document(document_id: str, user: CurrentUser):
+    """Remove one entry from the document history."""
+    return await _save(user["id"], DOCUMENT_REMOVE, document_id)
+
+
+@router.post("/chats/{chat_id}/messages")
+async def save_chat_messages(chat_id: str, req: ChatAppendRequest, user: CurrentUser):
+    """Append messages to a career chat, creating it on first use."""
+    return await _save(user["id"], CHAT_APPEND, {
+        "chatId": chat_id,
+        "title": req.title,
+        "timestamp": req.timestamp,
+        "messages": [message.model_dump() for message in req.messages],
+    })
+
+
+@router.delete("/chats/{chat_id}")
+async def delete_chat(chat_id: str, user: CurrentUser):
+    """Remove a career chat and its messages."""
+    return await _save(user["id"], CHAT_REMOVE, chat_id)
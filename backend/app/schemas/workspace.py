@@ -0,0 +1,26 @@
+"""Workspace history request models."""
+
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class DocumentEntry(BaseModel):
+    """A document history entry; fields beyond the keys are stored as sent."""
+    model_config = {"extra": "allow"}
+
+    id: str
+    generatedAt: Optional[str] = None
+
+
+class ChatMessage(BaseModel):
+    id: str
+    role: Literal["user", "model", "system"]
+    content: str = ""
+    timestamp: Optional[str] = None
+
+
+class ChatAppendRequest(BaseModel):
+    title: Optional[str] = None
+    timestamp: Optional[str] = None
+    messages: List[ChatMessage] = []
@@ -12,6 +12,7 @@ import re
 from typing import Any, Dict, List, Optional
 
 from app.config import get_settings
+from app.services.llm_cache import get_llm_cache
 
 # Vertex AI imports (stable API)
 try:
@@ -516,6 +517,13 @@ Faculty: {faculty_list}
         location: str,
     ) -> Dict[str, str]:
         """Prepare salary negotiation info."""
+        cache = get_llm_cache()
+        cache_key = (job_title, location)
+        if cache:
+            cached = await cache.get("negotiation", cache_key)
+            if cached is not None:
+                return cached
+
         prompt = f"""
 Provide realistic salary range and negotiation tips for '{job_title}' in '{location}'.
 Return JSON: salaryRange, tips.
@@ -525,7 +533,12 @@ Return JSON: salaryRange, tips.
             "Salary negotiation coach.",
             response_mime="application/json",
         )
-        return _safe_parse_json(raw) or {"salaryRange": "", "tips": ""}
+        parsed = _safe_parse_json(raw)
+        if not parsed:
+            return {"salaryRange": "", "tips": ""}
+        if cache:
+            await cache.set("negotiation", cache_key, parsed)
+        return parsed
 
     async def interview_story(self, brain_dump: str) -> str:
         """Refine story into STAR format answer."""
@@ -536,13 +549,24 @@ Return JSON: salaryRange, tips.
 
     async def interview_questions(self, job_description: str) -> List[Dict[str, Any]]:
         """Generate likely interview questions."""
+        cache = get_llm_cache()
+        if cache:
+            cached = await cache.get("interview_questions", (job_description,))
+            if cached is not None:
+                return cached
+
         prompt = f"Generate 5-7 likely interview questions (behavioral + technical) for: {job_description}"
         raw = await self._run_llm(
             prompt,
             "Hiring manager.",
             response_mime="application/json",
         )
-        return _safe_parse_json(raw) or []
+        parsed = _safe_parse_json(raw)
+        if not parsed:
+            return []
+        if cache:
+            await cache.set("interview_questions", (job_description,), parsed)
+        return parsed
 
     async def reframe_feedback(self, feedback_text: str) -> str:
         """Reframe feedback into growth plan."""
@@ -557,6 +581,13 @@ Return JSON: salaryRange, tips.
         milestone: Dict[str, Any],
     ) -> List[Dict[str, Any]]:
         """Recommend educational videos for milestone."""
+        cache = get_llm_cache()
+        cache_key = (target_role, str(milestone.get("milestoneTitle") or ""))
+        if cache:
+            cached = await cache.get("videos", cache_key)
+            if cached is not None:
+                return cached
+
         prompt = f"""
 Recommend 3-5 educational YouTube videos for milestone '{milestone.get("milestoneTitle")}' toward '{target_role}'.
 Return JSON array: title, channel, description, videoId.
@@ -566,7 +597,12 @@ Return JSON array: title, channel, description, videoId.
             "Practical resource curator.",
             response_mime="application/json",
         )
-        return _safe_parse_json(raw) or []
+        parsed = _safe_parse_json(raw)
+        if not parsed:
+            return []
+        if cache:
+            await cache.set("videos", cache_key, parsed)
+        return parsed
 
     async def career_chat(
         self,
@@ -0,0 +1,177 @@
+"""
+Local verification of Supabase access tokens.
+
+Tokens are checked in-process (signature, `exp`, `aud`, `sub`) against the
+project's JWT secret (HS256) or its published JWKS (asymmetric signing keys),
+so authenticated requests don't need a round-trip to Supabase Auth.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.services.http import SUPABASE_AUTH, get_http_client
+
+try:
+    import jwt
+    JWT_AVAILABLE = True
+except ImportError:
+    jwt = None
+    JWT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "ES256", "EdDSA"})
+
+# Don't refetch the JWKS for unknown key IDs more often than this
+MIN_JWKS_REFETCH_SECONDS = 30
+
+
+def unverified_expiry(token: str) -> Optional[int]:
+    """Read `exp` from a JWT without verifying it (for cache bounds only)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return int(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+class TokenInvalidError(Exception):
+    """The token is malformed, expired, or fails verification."""
+
+
+class VerificationUnavailableError(Exception):
+    """The token can't be checked locally (no key material or library)."""
+
+
+class JWKSCache:
+    """Periodically refreshed cache of the project's JSON Web Key Set."""
+
+    def __init__(self, jwks_path: str, refresh_seconds: int) -> None:
+        self.jwks_path = jwks_path
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[str, Any] = {}
+        # Never fetched: monotonic time can be near zero on a fresh boot
+        self._fetched_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: Optional[str]) -> Any:
+        """Return the signing key for `kid`, refreshing the set when stale or unknown."""
+        age = time.monotonic() - self._fetched_at
+        if age > self.refresh_seconds or (kid not in self._keys and age > MIN_JWKS_REFETCH_SECONDS):
+            await self._refresh()
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+        if key is None:
+            raise VerificationUnavailableError(f"No JWKS key for kid={kid!r}")
+        return key
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if time.monotonic() - self._fetched_at <= MIN_JWKS_REFETCH_SECONDS:
+                return
+            try:
+                client = get_http_client(SUPABASE_AUTH)
+                resp = await client.get(self.jwks_path, timeout=5)
+                resp.raise_for_status()
+                keys = {}
+                for jwk in resp.json().get("keys", []):
+                    try:
+                        keys[jwk.get("kid")] = jwt.PyJWK(jwk).key
+                    except Exception as exc:
+                        logger.warning("Skipping unusable JWK %s: %s", jwk.get("kid"), exc)
+                self._keys = keys
+            except Exception as exc:
+                # Keep serving previously fetched keys
+                logger.warning("JWKS refresh failed: %s", exc)
+            finally:
+                self._fetched_at = time.monotonic()
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens without calling Supabase Auth."""
+
+    def __init__(
+        self,
+        jwt_secret: Optional[str],
+        audience: str,
+        jwks: Optional[JWKSCache],
+        leeway_seconds: int = 0,
+    ) -> None:
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.jwks = jwks
+        self.leeway_seconds = leeway_seconds
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return {"id", "email", "exp"} for a valid token."""
+        if not JWT_AVAILABLE:
+            raise VerificationUnavailableError("PyJWT not installed")
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as exc:
+            raise TokenInvalidError("Malformed token.") from exc
+
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise VerificationUnavailableError("SUPABASE_JWT_SECRET not configured")
+            key: Any = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            if self.jwks is None:
+                raise VerificationUnavailableError("JWKS not configured")
+            key = await self.jwks.get_key(header.get("kid"))
+        else:
+            raise TokenInvalidError(f"Unsupported token algorithm: {algorithm}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                leeway=self.leeway_seconds,
+                options={"require": ["exp", "sub", "aud"]},
+            )
+        except jwt.ExpiredSignatureError as exc:
+            raise TokenInvalidError("Token expired.") from exc
+        except jwt.InvalidTokenError as exc:
+            raise TokenInvalidError(f"Invalid token: {exc}") from exc
+
+        if not claims.get("sub"):
+            raise TokenInvalidError("Token has no subject.")
+
+        metadata = claims.get("user_metadata") or {}
+        return {
+            "id": claims["sub"],
+            "email": claims.get("email") or metadata.get("email"),
+            "exp": claims["exp"],
+        }
+
+
+_token_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> Optional[TokenVerifier]:
+    """Get the shared verifier, or None when local verification is disabled."""
+    global _token_verifier
+    settings = get_settings()
+    if not settings.auth_local_verification:
+        return None
+    if _token_verifier is None:
+        _token_verifier = TokenVerifier(
+            jwt_secret=settings.supabase_jwt_secret,
+            audience=settings.auth_jwt_audience,
+            jwks=JWKSCache("/auth/v1/.well-known/jwks.json", settings.auth_jwks_refresh_seconds),
+            leeway_seconds=settings.auth_jwt_leeway_seconds,
+        )
+    return _token_verifier
@@ -0,0 +1,138 @@
+"""In-process caching primitives shared by services."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry expiry.
+
+    Not thread-safe; intended for use from the event loop only.
+    `on_evict` is called with (key, value) whenever an entry is dropped
+    because it expired or was pushed out by the size bound.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Return cached value or `default`; expired entries are dropped."""
+        entry = self._data.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            if count:
+                self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value, evicting expired and least recently used entries."""
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.purge()
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._evict(oldest)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove entry without calling `on_evict`."""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def purge(self) -> int:
+        """Drop all expired entries. Returns the number removed."""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._evict(key)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for metrics endpoints."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _evict(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None and self._on_evict is not None:
+            self._on_evict(key, entry[1])
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    Callers arriving while a call for `key` is in flight await its result
+    (or exception) instead of starting their own. The call outlives any one
+    cancelled caller; with `cancel_abandoned` it is cancelled once every
+    caller waiting on it has been.
+    """
+
+    def __init__(self, cancel_abandoned: bool = False) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict["asyncio.Future[Any]", int] = {}
+        self.cancel_abandoned = cancel_abandoned
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            remaining = self._waiters.pop(future) - 1
+            if remaining:
+                self._waiters[future] = remaining
+            elif self.cancel_abandoned and not future.done():
+                future.cancel()
+
+    def _finish(self, key: Hashable, future: "asyncio.Future[Any]") -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
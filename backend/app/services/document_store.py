@@ -0,0 +1,115 @@
+"""
+Content-addressed, compressed storage of document history bodies.
+
+History entries keep only their metadata (id, job title, company, date) in
+`workspace_documents`. The heavy fields - the markdown resume and cover
+letter, the analysis and the parsed copies - are stored once per distinct
+value in `document_bodies` (docs/DocumentBodies.sql), keyed by the SHA-256 of
+their JSON encoding and compressed with zstd (gzip without it). An entry's
+`bodies` map points at them by field, so regenerating an identical resume
+stores nothing new, and bodies are only read when a document is opened.
+
+This module is the codec; the reads and writes live in services/supabase.py.
+"""
+
+import gzip
+import hashlib
+from typing import Any, Dict, Tuple
+
+from app.services.serialization import dumps, loads
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Fields moved out of the history entry, by entry key
+BODY_FIELDS = ("resumeContent", "coverLetterContent", "analysisResult", "parsedResume", "parsedCoverLetter")
+# Entry key holding {field: body hash}
+BODIES_KEY = "bodies"
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Bodies are written once and read rarely: favour size
+ZSTD_LEVEL = 12
+GZIP_LEVEL = 9
+
+# hash -> (encoding, stored bytes, uncompressed size)
+EncodedBody = Tuple[str, bytes, int]
+
+
+def body_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compress_body(raw: bytes) -> Tuple[str, bytes]:
+    """Compress with the best available codec; store as-is if that doesn't help."""
+    if ZSTD_AVAILABLE:
+        encoding, data = ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        encoding, data = GZIP, gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if len(data) >= len(raw):
+        return IDENTITY, raw
+    return encoding, data
+
+
+def decompress_body(encoding: str, data: bytes) -> bytes:
+    if encoding == IDENTITY:
+        return data
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    if encoding == ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read zstd-compressed document bodies.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown document body encoding: {encoding}")
+
+
+def _split(document: Dict[str, Any], encode: bool) -> Tuple[Dict[str, Any], Dict[str, EncodedBody]]:
+    metadata = {key: value for key, value in document.items() if key not in BODY_FIELDS}
+    refs = dict(document.get(BODIES_KEY) or {})
+    bodies: Dict[str, EncodedBody] = {}
+    for field in BODY_FIELDS:
+        if field not in document:
+            continue  # Metadata-only entries keep their existing refs
+        value = document[field]
+        if value is None:
+            refs.pop(field, None)
+            continue
+        raw = dumps(value)
+        digest = body_hash(raw)
+        refs[field] = digest
+        if encode and digest not in bodies:
+            encoding, data = compress_body(raw)
+            bodies[digest] = (encoding, data, len(raw))
+    if refs or BODIES_KEY in document:
+        metadata[BODIES_KEY] = refs
+    return metadata, bodies
+
+
+def document_metadata(document: Dict[str, Any]) -> Dict[str, Any]:
+    """The history entry as stored: body fields replaced by their hashes."""
+    return _split(document, encode=False)[0]
+
+
+def split_document(document: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, EncodedBody]]:
+    """(metadata entry, {hash: encoded body}) for a full or metadata-only entry."""
+    return _split(document, encode=True)
+
+
+def hydrate_document(metadata: Dict[str, Any], bodies: Dict[str, bytes]) -> Dict[str, Any]:
+    """
+    Fill an entry's body fields from `bodies` (hash -> uncompressed bytes).
+
+    Fields still stored inline (entries saved before the split) win; refs
+    whose body is missing are left out.
+    """
+    document = dict(metadata)
+    for field, digest in (metadata.get(BODIES_KEY) or {}).items():
+        if field not in document and digest in bodies:
+            document[field] = loads(bodies[digest])
+    return document
@@ -0,0 +1,59 @@
+"""ETag helpers for conditional GETs (`If-None-Match` -> 304)."""
+
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+from app.services.serialization import dumps
+
+# Per-user data: browsers may keep it but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from version parts (bodies are re-encoded by compression)."""
+    digest = hashlib.sha256(dumps(parts)).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(content: Any, etag: str) -> Response:
+    return Response(
+        content=dumps(content),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def conditional_json(request: Request, content: Any) -> Response:
+    """JSON response tagged with a hash of its body, or 304 if the client has it."""
+    body = dumps(content)
+    etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
@@ -0,0 +1,101 @@
+"""
+Shared, pooled HTTP clients per upstream.
+
+One long-lived `httpx.AsyncClient` per upstream keeps TCP+TLS connections
+alive between requests instead of paying connection setup on every call.
+Clients are created lazily and closed from the app lifespan.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import get_settings
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+POLAR_API_URL = "https://api.polar.sh/v1"
+
+# Upstream names accepted by get_http_client()
+SUPABASE = "supabase"
+SUPABASE_AUTH = "supabase_auth"
+POLAR = "polar"
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    http2 = settings.http2_enabled and H2_AVAILABLE
+    if settings.http2_enabled and not H2_AVAILABLE:
+        logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+
+    if name in (SUPABASE, SUPABASE_AUTH):
+        base_url = str(settings.supabase_url)
+        # Supabase REST calls set a per-attempt timeout (app.services.supabase._request)
+        timeout = settings.supabase_attempt_timeout_seconds if name == SUPABASE else settings.auth_timeout_seconds
+    elif name == POLAR:
+        base_url = POLAR_API_URL
+        timeout = settings.polar_timeout_seconds
+    else:
+        raise ValueError(f"Unknown upstream: {name}")
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=settings.http_connect_timeout_seconds),
+        limits=limits,
+        http2=http2,
+    )
+
+
+class HTTPClientRegistry:
+    """Lazily created, shared clients keyed by upstream name."""
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = _build_client(name)
+            self._clients[name] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close all clients and their pooled connections."""
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as exc:
+                logger.warning("Closing %s HTTP client failed: %s", name, exc)
+
+
+_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_registry() -> HTTPClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = HTTPClientRegistry()
+    return _registry
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Get the shared client for an upstream (SUPABASE, SUPABASE_AUTH, POLAR)."""
+    return get_http_registry().get(name)
+
+
+async def close_http_clients() -> None:
+    if _registry is not None:
+        await _registry.aclose()
@@ -1,112 +1,504 @@
-"""LaTeX PDF generation service using Tectonic."""
+"""
+LaTeX PDF generation service using Tectonic.
 
+Tectonic runs as an asyncio subprocess, so a compile never blocks the event
+loop. A `TectonicPool` bounds how many run at once (one per CPU core by
+default) and admits a limited queue behind them; beyond that, and beyond a
+per-user concurrency limit, requests are rejected up front instead of
+piling up. Cancelling a compile (e.g. when the client disconnects) kills
+the Tectonic process and frees its slot.
+
+Tectonic keeps downloaded bundle files and the generated LaTeX format in
+its cache directory. Point `cache_dir` at a persistent directory, fill it
+with `warm_up()` (at image build: `python -m app.services.latex --warm-up
+--cache-dir DIR`), and set `only_cached` so compiles never touch the
+network and only pay for typesetting the document itself.
+
+Documents that app.services.pdf_render can set are rendered in-process
+instead; Tectonic remains the path for everything else.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
 import re
 import shutil
-import subprocess
+import sys
 import tempfile
+import time
 from pathlib import Path
-from typing import Final
+from typing import Any, Dict, Final, List, Optional
+
+from app.config import get_settings
+from app.services import pdf_render
+from app.services.latex_templates import LatexTemplate, get_latex_template, get_latex_templates
+from app.services.markdown_parser import Block, Span, parse_markdown
+from app.services.pdf_cache import get_pdf_cache, pdf_cache_key
+
+logger = logging.getLogger(__name__)
 
 SAFE_CHAR_LIMIT: Final[int] = 20000
+# Part of the PDF cache key, with the template's own version: bump whenever
+# the converted body changes
+TEMPLATE_VERSION: Final[str] = "2"
+
+# Exercises every construct _markdown_to_latex emits, so warming up with it
+# caches every bundle file a real compile can need
+WARMUP_MARKDOWN: Final[str] = """# Warm-up
+## Section
+### Subsection
+Body text with {special} & characters_$%#~^, **bold**, *italic*, ***both***,
+`code` and a [link](https://example.com/?a=1&b=2#top).
+
+- First item
+  1. Nested numbered item
+- Second item
+
+3. Numbered from three
+"""
+
 
+class CompileBusyError(Exception):
+    """Every compile slot and queue place is taken."""
+
+
+class CompileLimitError(Exception):
+    """The user already has the maximum number of compiles in progress."""
+
+
+_LATEX_ESCAPES: Final[Dict[str, str]] = {
+    "\\": r"\textbackslash{}",
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\textasciicircum{}",
+}
+# One pass per span; str.translate with multi-character replacements is slower
+_LATEX_SPECIALS = re.compile("[%s]" % re.escape("".join(_LATEX_ESCAPES)))
+
+# Inside \href the URL is read verbatim except for these
+_URL_ESCAPES: Final[Dict[int, str]] = str.maketrans({
+    "%": r"\%",
+    "#": r"\#",
+    "&": r"\&",
+    "\\": "%5C",
+    "{": "%7B",
+    "}": "%7D",
+    "~": "%7E",
+    "^": "%5E",
+    "$": "%24",
+    "_": "%5F",
+})
+
+# Remove potential security exploits
+_UNSAFE_COMMANDS = re.compile(r"\\(write18|input|include)\b", re.IGNORECASE)
+
+_STYLE_COMMANDS: Final[Dict[str, str]] = {
+    "": "%s",
+    "b": r"\textbf{%s}",
+    "i": r"\textit{%s}",
+    "bi": r"\textbf{\textit{%s}}",
+    "code": r"\texttt{%s}",
+}
 
 def _escape_latex(text: str) -> str:
     """Escape LaTeX control characters."""
-    replacements = {
-        "\\": r"\textbackslash{}",
-        "&": r"\&",
-        "%": r"\%",
-        "$": r"\$",
-        "#": r"\#",
-        "_": r"\_",
-        "{": r"\{",
-        "}": r"\}",
-        "~": r"\textasciitilde{}",
-        "^": r"\textasciicircum{}",
-    }
-    escaped = "".join(replacements.get(ch, ch) for ch in text)
-    # Remove potential security exploits
-    escaped = re.sub(r"\\(write18|input|include)\b", "", escaped, flags=re.IGNORECASE)
-    return escaped
-
-
-def _markdown_to_latex(markdown: str) -> str:
-    """Convert simple markdown to LaTeX."""
-    lines = markdown.splitlines()
+    return _LATEX_SPECIALS.sub(lambda match: _LATEX_ESCAPES[match.group()], text)
+
+
+def _spans_to_latex(spans: List[Span]) -> str:
+    if len(spans) == 1 and spans[0][1:] == ("", None):
+        return _escape_latex(spans[0][0])
+    parts: List[str] = []
+    link: Optional[str] = None
+    linked: List[str] = []
+    for text, style, href in spans:
+        if href != link:
+            if linked:
+                parts.append(r"\href{%s}{%s}" % (link.translate(_URL_ESCAPES), "".join(linked)))
+                linked = []
+            link = href
+        (linked if href else parts).append(_STYLE_COMMANDS[style] % _escape_latex(text))
+    if linked:
+        parts.append(r"\href{%s}{%s}" % (link.translate(_URL_ESCAPES), "".join(linked)))
+    return "".join(parts)
+
+
+def _list_to_latex(block: Block) -> str:
+    _, ordered, start, items = block
+    environment = "enumerate" if ordered else "itemize"
+    lines = [f"\\begin{{{environment}}}" + (f"[start={start}]" if ordered and start != 1 else "")]
+    for spans, children in items:
+        text = _spans_to_latex(spans)
+        # A leading [ would be read as \item's optional label
+        lines.append("\\item " + ("{}" + text if text.startswith("[") else text))
+        lines.extend(_list_to_latex(child) for child in children)
+    lines.append(f"\\end{{{environment}}}")
+    return "\n".join(lines)
+
+
+def _markdown_to_latex_body(markdown: str, template: Optional[LatexTemplate] = None) -> str:
+    """Convert markdown (see app.services.markdown_parser) to the body of a LaTeX document."""
+    headings = (template or get_latex_template()).headings
     body_parts = []
-    list_buffer = []
-
-    def flush_list():
-        nonlocal list_buffer
-        if list_buffer:
-            items = "\n".join([f"\\item {_escape_latex(item)}" for item in list_buffer])
-            body_parts.append("\\begin{itemize}\n" + items + "\n\\end{itemize}")
-            list_buffer = []
-
-    for raw in lines:
-        line = raw.strip()
-        if not line:
-            flush_list()
-            body_parts.append("")
-            continue
-
-        if line.startswith("# "):
-            flush_list()
-            body_parts.append(f"\\section*{{{_escape_latex(line[2:].strip())}}}")
-        elif line.startswith("## "):
-            flush_list()
-            body_parts.append(f"\\subsection*{{{_escape_latex(line[3:].strip())}}}")
-        elif line.startswith("- "):
-            list_buffer.append(line[2:].strip())
+    for block in parse_markdown(markdown):
+        if block[0] == "heading":
+            body_parts.append(headings[block[1]] % _spans_to_latex(block[2]))
+        elif block[0] == "list":
+            body_parts.append(_list_to_latex(block))
         else:
-            flush_list()
-            body_parts.append(_escape_latex(line))
-
-    flush_list()
-    body = "\n\n".join(body_parts)
-
-    return r"""
-\documentclass[11pt]{article}
-\usepackage[margin=1in]{geometry}
-\usepackage[T1]{fontenc}
-\usepackage[utf8]{inputenc}
-\usepackage{hyperref}
-\usepackage{enumitem}
-\setlist[itemize]{leftmargin=*}
-\begin{document}
-%s
-\end{document}
-""" % body
-
-
-def compile_markdown_to_pdf(markdown: str) -> bytes:
-    """Compile markdown to PDF using Tectonic."""
+            body_parts.append(_spans_to_latex(block[1]))
+    # Text is escaped as it is emitted, so one pass over the body covers it all
+    return _UNSAFE_COMMANDS.sub("", "\n\n".join(body_parts))
+
+
+def _markdown_to_latex(markdown: str, template: Optional[LatexTemplate] = None) -> str:
+    """Convert markdown to a LaTeX document in `template` (the default template if None)."""
+    template = template or get_latex_template()
+    return template.document(_markdown_to_latex_body(markdown, template))
+
+
+def _packet_to_latex(documents: List[str], template: Optional[LatexTemplate] = None) -> str:
+    """Convert several markdown documents to one LaTeX document, each starting on a new page."""
+    template = template or get_latex_template()
+    return template.document(
+        "\n\n\\clearpage\n\n".join(_markdown_to_latex_body(markdown, template) for markdown in documents)
+    )
+
+
+class TectonicPool:
+    """Bounded, queue-admitted pool of Tectonic subprocesses."""
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        per_user_limit: int,
+        timeout_seconds: float,
+        executable: str = "tectonic",
+        cache_dir: Optional[str] = None,
+        bundle: Optional[str] = None,
+        only_cached: bool = False,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.per_user_limit = per_user_limit
+        self.timeout_seconds = timeout_seconds
+        self.executable = executable
+        self.cache_dir = cache_dir
+        self.bundle = bundle
+        self.only_cached = only_cached
+        self.warmed_up = False
+        self.warm_up_seconds: Optional[float] = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self._running = 0
+        self._queued = 0
+        self._per_user: Dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rejected_busy = 0
+        self.rejected_user = 0
+        self.compile_seconds = 0.0
+        self.max_compile_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _admit(self, user_id: Optional[str]) -> None:
+        if user_id is not None and self._per_user.get(user_id, 0) >= self.per_user_limit:
+            self.rejected_user += 1
+            raise CompileLimitError("Too many PDF exports in progress. Please wait for one to finish.")
+        if self._running + self._queued >= self.workers + self.max_queue:
+            self.rejected_busy += 1
+            raise CompileBusyError("PDF export is busy. Please retry shortly.")
+        if user_id is not None:
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def _leave(self, user_id: Optional[str]) -> None:
+        if user_id is None:
+            return
+        remaining = self._per_user.get(user_id, 1) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    async def compile(self, latex_source: str, user_id: Optional[str] = None) -> bytes:
+        """
+        Compile a LaTeX document to PDF bytes.
+
+        Raises CompileLimitError/CompileBusyError without queueing when the
+        user or the pool is at capacity, RuntimeError when Tectonic fails or
+        times out.
+        """
+        self._admit(user_id)
+        try:
+            queued_at = time.monotonic()
+            self._queued += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._queued -= 1
+            self.max_wait_seconds = max(self.max_wait_seconds, time.monotonic() - queued_at)
+
+            self._running += 1
+            try:
+                return await self._run(latex_source)
+            finally:
+                self._running -= 1
+                self._slots.release()
+        finally:
+            self._leave(user_id)
+
+    def _command(self, outdir: str, tex_name: str, only_cached: bool) -> List[str]:
+        command = [self.executable, "-o", outdir]
+        if self.bundle:
+            command += ["--bundle", self.bundle]
+        if only_cached:
+            command.append("--only-cached")
+        return command + [tex_name]
+
+    def _env(self) -> Optional[Dict[str, str]]:
+        if not self.cache_dir:
+            return None
+        return {**os.environ, "TECTONIC_CACHE_DIR": self.cache_dir}
+
+    async def warm_up(self) -> None:
+        """
+        Compile a representative document in every template to fill the Tectonic cache.
+
+        Always allowed to fetch, so this populates the cache that
+        `only_cached` compiles then rely on. Raises like `compile`.
+        """
+        started = time.monotonic()
+        if self.cache_dir:
+            await asyncio.to_thread(Path(self.cache_dir).mkdir, parents=True, exist_ok=True)
+        for template in get_latex_templates().values():
+            # One slot per template, so user compiles don't wait for the whole warm-up
+            async with self._slots:
+                self._running += 1
+                try:
+                    await self._run(_markdown_to_latex(WARMUP_MARKDOWN, template), only_cached=False)
+                finally:
+                    self._running -= 1
+        self.warmed_up = True
+        self.warm_up_seconds = time.monotonic() - started
+
+    async def _run(self, latex_source: str, only_cached: Optional[bool] = None) -> bytes:
+        if only_cached is None:
+            only_cached = self.only_cached
+        started = time.monotonic()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tex_path = Path(tmpdir) / "resume.tex"
+            tex_path.write_text(latex_source, encoding="utf-8")
+
+            # Output goes to a file rather than pipes: nothing to drain if the run is killed
+            log_path = Path(tmpdir) / "tectonic.log"
+            with log_path.open("wb") as log:
+                proc = await asyncio.create_subprocess_exec(
+                    *self._command(tmpdir, tex_path.name, only_cached),
+                    cwd=tmpdir,
+                    env=self._env(),
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=asyncio.subprocess.STDOUT,
+                )
+            try:
+                await asyncio.wait_for(proc.wait(), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise RuntimeError(f"Tectonic timed out after {self.timeout_seconds:g}s.")
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    # Reap it even if we're cancelled again meanwhile; SIGKILL makes this quick
+                    reaped = asyncio.ensure_future(proc.wait())
+                    while not reaped.done():
+                        try:
+                            await asyncio.shield(reaped)
+                        except asyncio.CancelledError:
+                            pass
+
+            elapsed = time.monotonic() - started
+            if proc.returncode != 0:
+                self.failed += 1
+                output = log_path.read_text(encoding="utf-8", errors="replace")
+                raise RuntimeError(f"Tectonic failed: {output}")
+
+            pdf_path = Path(tmpdir) / "resume.pdf"
+            if not pdf_path.exists():
+                self.failed += 1
+                raise RuntimeError("PDF not generated.")
+
+            self.completed += 1
+            self.compile_seconds += elapsed
+            self.max_compile_seconds = max(self.max_compile_seconds, elapsed)
+            return pdf_path.read_bytes()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "onlyCached": self.only_cached,
+            "warmedUp": self.warmed_up,
+            "warmUpSeconds": round(self.warm_up_seconds, 3) if self.warm_up_seconds is not None else None,
+            "running": self._running,
+            "queued": self._queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "rejectedBusy": self.rejected_busy,
+            "rejectedUserLimit": self.rejected_user,
+            "avgCompileSeconds": round(self.compile_seconds / self.completed, 3) if self.completed else None,
+            "maxCompileSeconds": round(self.max_compile_seconds, 3),
+            "maxWaitSeconds": round(self.max_wait_seconds, 3),
+        }
+
+
+_pool: Optional[TectonicPool] = None
+
+
+def get_tectonic_pool() -> TectonicPool:
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        _pool = TectonicPool(
+            workers=settings.latex_compile_workers or os.cpu_count() or 1,
+            max_queue=settings.latex_compile_queue_size,
+            per_user_limit=settings.latex_compile_per_user_limit,
+            timeout_seconds=settings.latex_compile_timeout_seconds,
+            cache_dir=settings.latex_tectonic_cache_dir,
+            bundle=settings.latex_tectonic_bundle,
+            only_cached=settings.latex_tectonic_only_cached,
+        )
+    return _pool
+
+
+async def warm_up_tectonic() -> None:
+    """Fill the shared pool's Tectonic cache in the background; failures are only logged."""
+    pool = get_tectonic_pool()
+    if shutil.which(pool.executable) is None:
+        return
+    try:
+        await pool.warm_up()
+        logger.info("Tectonic warm-up finished in %.2fs", pool.warm_up_seconds)
+    except Exception as exc:
+        logger.warning("Tectonic warm-up failed: %s", exc)
+
+
+# Documents rendered by each engine (cache hits excluded), for /metricsz
+_renders: Dict[str, int] = {"simple": 0, "tectonic": 0}
+
+
+def renderer_stats() -> Dict[str, int]:
+    return dict(_renders)
+
+
+def validate_markdown(markdown: str) -> None:
+    """Raise ValueError for content the compile endpoints refuse."""
     if not markdown:
         raise ValueError("No content provided.")
     if len(markdown) > SAFE_CHAR_LIMIT:
         raise ValueError(f"Content exceeds {SAFE_CHAR_LIMIT} character limit.")
-    if shutil.which("tectonic") is None:
-        raise RuntimeError("Tectonic not installed.")
 
-    latex_source = _markdown_to_latex(markdown)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tex_path = Path(tmpdir) / "resume.tex"
-        tex_path.write_text(latex_source, encoding="utf-8")
+async def _compile(documents: List[str], user_id: Optional[str], template_name: Optional[str]) -> bytes:
+    for markdown in documents:
+        validate_markdown(markdown)
+    template = get_latex_template(template_name)
 
-        result = subprocess.run(
-            ["tectonic", "-o", tmpdir, tex_path.name],
-            cwd=tmpdir,
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
+    if (
+        template.in_process
+        and get_settings().pdf_simple_renderer_enabled
+        and all(pdf_render.supports(markdown) for markdown in documents)
+    ):
+        template_version = f"simple-{pdf_render.RENDERER_VERSION}-{template.cache_version}"
+
+        async def compile_pdf() -> bytes:
+            pdf = await asyncio.to_thread(pdf_render.render_documents_pdf, documents)
+            _renders["simple"] += 1
+            return pdf
+    else:
+        template_version = f"{TEMPLATE_VERSION}-{template.cache_version}"
+
+        async def compile_pdf() -> bytes:
+            pool = get_tectonic_pool()
+            if shutil.which(pool.executable) is None:
+                raise RuntimeError("Tectonic not installed.")
+            if len(documents) == 1:
+                latex_source = _markdown_to_latex(documents[0], template)
+            else:
+                latex_source = _packet_to_latex(documents, template)
+            pdf = await pool.compile(latex_source, user_id)
+            _renders["tectonic"] += 1
+            return pdf
+
+    cache = get_pdf_cache()
+    if cache is None:
+        return await compile_pdf()
+    # NUL can't survive normalization as a line break, so packets never collide with single documents
+    return await cache.get_or_compile(pdf_cache_key("\0".join(documents), template_version), compile_pdf)
+
+
+async def compile_markdown_to_pdf(
+    markdown: str,
+    user_id: Optional[str] = None,
+    template: Optional[str] = None,
+) -> bytes:
+    """
+    Render markdown to PDF in the named template, via the PDF cache.
+
+    Documents the in-process renderer can set (see pdf_render.supports) in a
+    template it reproduces skip Tectonic entirely; the rest compile with
+    Tectonic, off the event loop. Raises ValueError for an unknown template.
+    """
+    return await _compile([markdown], user_id, template)
+
+
+async def compile_packet_to_pdf(
+    documents: List[str],
+    user_id: Optional[str] = None,
+    template: Optional[str] = None,
+) -> bytes:
+    """Render several markdown documents into one PDF in one template, each starting on a new page."""
+    if not documents:
+        raise ValueError("No documents provided.")
+    return await _compile(documents, user_id, template)
 
-        if result.returncode != 0:
-            raise RuntimeError(f"Tectonic failed: {result.stderr or result.stdout}")
 
-        pdf_path = Path(tmpdir) / "resume.pdf"
-        if not pdf_path.exists():
-            raise RuntimeError("PDF not generated.")
+if __name__ == "__main__":
+    # Image build step: populate a Tectonic cache directory for --only-cached compiles
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--warm-up", action="store_true", help="compile a warm-up document into --cache-dir")
+    parser.add_argument("--cache-dir", required=True)
+    parser.add_argument("--bundle")
+    parser.add_argument("--executable", default="tectonic")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+    if not args.warm_up:
+        parser.error("nothing to do; pass --warm-up")
 
-        return pdf_path.read_bytes()
+    warm_pool = TectonicPool(
+        workers=1,
+        max_queue=0,
+        per_user_limit=1,
+        timeout_seconds=args.timeout,
+        executable=args.executable,
+        cache_dir=args.cache_dir,
+        bundle=args.bundle,
+    )
+    try:
+        asyncio.run(warm_pool.warm_up())
+    except RuntimeError as exc:
+        print(f"Tectonic warm-up failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Warmed Tectonic cache in {args.cache_dir} ({warm_pool.warm_up_seconds:.1f}s)")
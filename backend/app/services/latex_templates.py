@@ -0,0 +1,216 @@
+"""
+Named LaTeX templates for PDF export.
+
+A template is a preamble plus the macros that set `#`, `##` and `###`
+headings; app.services.latex wraps the converted markdown body in it. The
+registry is validated once (at startup, via `get_latex_templates()`) and
+each template's document prefix is built then, so a compile only
+concatenates strings. Template IDs match the frontend's template picker
+(`components/TemplateSelector.tsx`).
+
+Bump a template's `version` whenever its output changes: it is part of the
+PDF cache key.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Final, List, Optional
+
+from app.services.pdf_render import LATEX_FONT_PACKAGES
+
+DEFAULT_TEMPLATE: Final[str] = "classic"
+
+# Heading commands LaTeX defines itself; anything else must be \newcommand'ed in the preamble
+_BUILTIN_COMMANDS: Final[frozenset] = frozenset({"section", "subsection", "subsubsection", "paragraph"})
+_UNSAFE_COMMANDS = re.compile(r"\\(write18|input|include|openin|openout|immediate)\b", re.IGNORECASE)
+_NAME = re.compile(r"[a-z][a-z0-9-]*")
+_COMMAND = re.compile(r"\\([A-Za-z]+)")
+_DEFINED = re.compile(r"\\newcommand\{?\\([A-Za-z]+)")
+
+
+class LatexTemplateError(Exception):
+    """A template in the registry is malformed."""
+
+
+class LatexTemplate:
+    """A named preamble with heading macros; `document()` wraps a converted body."""
+
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        preamble: str,
+        headings: Dict[int, str],
+        in_process: bool = False,
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.preamble = preamble
+        # Heading level -> format string with one %s for the converted text
+        self.headings = headings
+        # Whether app.services.pdf_render reproduces this template's layout
+        self.in_process = in_process
+        self._prefix = preamble + "\\begin{document}\n"
+
+    @property
+    def cache_version(self) -> str:
+        return f"{self.name}-{self.version}"
+
+    def document(self, body: str) -> str:
+        return self._prefix + body + "\n\\end{document}\n"
+
+
+def _braces_balance(source: str) -> bool:
+    depth = 0
+    for char in re.sub(r"\\[{}\\]", "", source):
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def _validate(template: LatexTemplate) -> None:
+    problems: List[str] = []
+    if not _NAME.fullmatch(template.name):
+        problems.append("name must be lowercase letters, digits and dashes")
+    if not template.version:
+        problems.append("missing version")
+    if "\\documentclass" not in template.preamble or "\\begin{document}" in template.preamble:
+        problems.append("preamble must start the document class and stop before \\begin{document}")
+    if _UNSAFE_COMMANDS.search(template.preamble):
+        problems.append("preamble uses a file or shell command")
+    if not _braces_balance(template.preamble):
+        problems.append("unbalanced braces in preamble")
+    if template.in_process:
+        for package in LATEX_FONT_PACKAGES:
+            if f"\\usepackage{{{package}}}" not in template.preamble:
+                problems.append(f"in-process template must load {package} to match the renderer's fonts")
+
+    defined = set(_DEFINED.findall(template.preamble))
+    for level in (1, 2, 3):
+        heading = template.headings.get(level)
+        if heading is None:
+            problems.append(f"no macro for level {level} headings")
+            continue
+        try:
+            heading % ""
+        except (TypeError, ValueError):
+            problems.append(f"level {level} heading must contain exactly one %s")
+        for command in _COMMAND.findall(heading):
+            if command not in _BUILTIN_COMMANDS and command not in defined:
+                problems.append(f"level {level} heading uses undefined \\{command}")
+        if not _braces_balance(heading):
+            problems.append(f"unbalanced braces in level {level} heading")
+
+    if problems:
+        raise LatexTemplateError(f"LaTeX template {template.name!r}: " + "; ".join(problems))
+
+
+_TEMPLATES: Final[List[LatexTemplate]] = [
+    LatexTemplate(
+        name="classic",
+        version="2",
+        preamble=r"""
+\documentclass[11pt]{article}
+\usepackage[margin=1in]{geometry}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{mathptmx}
+\usepackage{courier}
+\usepackage{hyperref}
+\usepackage{enumitem}
+\setlist[itemize]{leftmargin=*}
+""",
+        headings={1: r"\section*{%s}", 2: r"\subsection*{%s}", 3: r"\subsubsection*{%s}"},
+        in_process=True,
+    ),
+    LatexTemplate(
+        name="tech",
+        version="1",
+        preamble=r"""
+\documentclass[10pt]{article}
+\usepackage[margin=0.75in]{geometry}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{xcolor}
+\definecolor{accent}{HTML}{4F46E5}
+\usepackage[colorlinks=true,urlcolor=accent,linkcolor=accent]{hyperref}
+\usepackage{enumitem}
+\setlist{leftmargin=*,itemsep=1pt,topsep=2pt}
+\renewcommand{\familydefault}{\sfdefault}
+\setlength{\parindent}{0pt}
+\setlength{\parskip}{4pt}
+\pagestyle{empty}
+\newcommand{\techname}[1]{{\LARGE\bfseries\color{accent}#1}\par\vspace{4pt}}
+\newcommand{\techsection}[1]{\par\vspace{8pt}{\large\bfseries\color{accent}#1}\par\vspace{1pt}{\color{accent}\hrule}\vspace{4pt}}
+\newcommand{\techsubsection}[1]{\par\vspace{4pt}{\bfseries #1}\par}
+""",
+        headings={1: r"\techname{%s}", 2: r"\techsection{%s}", 3: r"\techsubsection{%s}"},
+    ),
+    LatexTemplate(
+        name="professional",
+        version="1",
+        preamble=r"""
+\documentclass[11pt]{article}
+\usepackage[margin=1in]{geometry}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{hyperref}
+\usepackage{enumitem}
+\setlist{leftmargin=*}
+\setlength{\parindent}{0pt}
+\setlength{\parskip}{10pt}
+\pagestyle{empty}
+\newcommand{\lettername}[1]{{\Large\bfseries #1}\par}
+\newcommand{\lettersection}[1]{\par{\bfseries #1}\par}
+""",
+        headings={1: r"\lettername{%s}", 2: r"\lettersection{%s}", 3: r"\lettersection{%s}"},
+    ),
+    LatexTemplate(
+        name="finance",
+        version="1",
+        preamble=r"""
+\documentclass[11pt]{article}
+\usepackage[margin=1in]{geometry}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{mathptmx}
+\usepackage{hyperref}
+\usepackage{enumitem}
+\setlist{leftmargin=*,itemsep=0pt}
+\setlength{\parindent}{0pt}
+\setlength{\parskip}{6pt}
+\pagestyle{empty}
+\newcommand{\financename}[1]{\begin{center}{\Large\scshape #1}\end{center}}
+\newcommand{\financesection}[1]{\par\vspace{6pt}{\scshape #1}\par\vspace{-4pt}\rule{\linewidth}{0.4pt}\par}
+\newcommand{\financesubsection}[1]{\par{\bfseries #1}\par}
+""",
+        headings={1: r"\financename{%s}", 2: r"\financesection{%s}", 3: r"\financesubsection{%s}"},
+    ),
+]
+
+
+@lru_cache
+def get_latex_templates() -> Dict[str, LatexTemplate]:
+    """Validated template registry by name; raises LatexTemplateError for a malformed template."""
+    registry: Dict[str, LatexTemplate] = {}
+    for template in _TEMPLATES:
+        _validate(template)
+        if template.name in registry:
+            raise LatexTemplateError(f"LaTeX template {template.name!r} is defined twice")
+        registry[template.name] = template
+    if DEFAULT_TEMPLATE not in registry:
+        raise LatexTemplateError(f"Default LaTeX template {DEFAULT_TEMPLATE!r} is missing")
+    return registry
+
+
+def get_latex_template(name: Optional[str] = None) -> LatexTemplate:
+    """Template by name, the default when none is chosen; ValueError for an unknown one."""
+    templates = get_latex_templates()
+    template = templates.get(name or DEFAULT_TEMPLATE)
+    if template is None:
+        raise ValueError(f"Unknown template {name!r}. Choose one of: {', '.join(templates)}.")
+    return template
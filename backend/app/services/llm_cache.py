@@ -0,0 +1,294 @@
+"""
+Shared response cache for generic LLM queries.
+
+Role/location/topic style prompts (salary negotiation, interview questions,
+milestone videos) are asked by many users with trivially different wording.
+Lookups go through progressively looser normalization rules so that
+"Software Engineer"/"NYC" and "SWE"/"New York, NY" share one entry:
+
+1. exact       - raw inputs
+2. fold        - case, punctuation and whitespace folding
+3. alias       - folded inputs mapped through the alias tables below
+4. similarity  - optional embedding cosine similarity on the alias key
+
+Hits are counted per rule so the effect of each rule is visible in /metricsz.
+Responses are stored serialized, so every hit is a private copy that its
+caller may mutate without touching what other users get.
+"""
+
+import asyncio
+import logging
+import math
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.services.cache import TTLCache
+from app.services.serialization import dumps, loads
+
+try:
+    from vertexai.language_models import TextEmbeddingModel
+    EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    TextEmbeddingModel = None
+    EMBEDDINGS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RULES = ("exact", "fold", "alias", "similarity")
+
+# Max embedding vectors kept per namespace for similarity search
+MAX_EMBEDDINGS_PER_NAMESPACE = 1000
+
+# ============================================================================
+# ALIAS TABLES
+# Keys and values are already folded (lowercase, no punctuation).
+# ============================================================================
+
+ROLE_ALIASES: Dict[str, str] = {
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "software dev": "software engineer",
+    "software development engineer": "software engineer",
+    "software eng": "software engineer",
+    "senior swe": "senior software engineer",
+    "sr software engineer": "senior software engineer",
+    "sr swe": "senior software engineer",
+    "fe engineer": "frontend engineer",
+    "front end engineer": "frontend engineer",
+    "front end developer": "frontend engineer",
+    "frontend developer": "frontend engineer",
+    "be engineer": "backend engineer",
+    "back end engineer": "backend engineer",
+    "backend developer": "backend engineer",
+    "full stack engineer": "fullstack engineer",
+    "full stack developer": "fullstack engineer",
+    "fullstack developer": "fullstack engineer",
+    "mle": "machine learning engineer",
+    "ml engineer": "machine learning engineer",
+    "ai engineer": "machine learning engineer",
+    "ds": "data scientist",
+    "de": "data engineer",
+    "sre": "site reliability engineer",
+    "devops": "devops engineer",
+    "pm": "product manager",
+    "tpm": "technical program manager",
+    "em": "engineering manager",
+    "ui ux designer": "ux designer",
+    "ui designer": "ux designer",
+    "qa engineer": "quality assurance engineer",
+    "qa": "quality assurance engineer",
+    "ib analyst": "investment banking analyst",
+    "vp": "vice president",
+    "cto": "chief technology officer",
+    "ceo": "chief executive officer",
+    "cfo": "chief financial officer",
+}
+
+LOCATION_ALIASES: Dict[str, str] = {
+    "nyc": "new york",
+    "ny": "new york",
+    "new york ny": "new york",
+    "new york city": "new york",
+    "new york usa": "new york",
+    "manhattan": "new york",
+    "sf": "san francisco",
+    "san francisco ca": "san francisco",
+    "san fran": "san francisco",
+    "bay area": "san francisco",
+    "sf bay area": "san francisco",
+    "la": "los angeles",
+    "los angeles ca": "los angeles",
+    "seattle wa": "seattle",
+    "boston ma": "boston",
+    "chicago il": "chicago",
+    "austin tx": "austin",
+    "dc": "washington dc",
+    "washington d c": "washington dc",
+    "london uk": "london",
+    "london england": "london",
+    "london united kingdom": "london",
+    "berlin germany": "berlin",
+    "paris france": "paris",
+    "stockholm sweden": "stockholm",
+    "toronto on": "toronto",
+    "toronto canada": "toronto",
+    "remote us": "remote",
+    "remote usa": "remote",
+    "fully remote": "remote",
+}
+
+# Which alias table applies to each positional part of a namespace's key
+NAMESPACE_ALIASES: Dict[str, Tuple[Optional[Dict[str, str]], ...]] = {
+    "negotiation": (ROLE_ALIASES, LOCATION_ALIASES),
+    "interview_questions": (None,),
+    "videos": (ROLE_ALIASES, None),
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+
+
+def fold(text: str) -> str:
+    """Case, punctuation and whitespace folding."""
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+
+def canonicalize(namespace: str, parts: Sequence[str]) -> Tuple[str, ...]:
+    """Apply the namespace's alias tables to folded key parts."""
+    tables = NAMESPACE_ALIASES.get(namespace, ())
+    canonical = []
+    for index, part in enumerate(parts):
+        folded = fold(part)
+        table = tables[index] if index < len(tables) else None
+        canonical.append(table.get(folded, folded) if table else folded)
+    return tuple(canonical)
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+Embedder = Callable[[str], Awaitable[Optional[List[float]]]]
+
+
+class LLMResponseCache:
+    """Normalized-key response cache with per-rule hit accounting."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_seconds: int,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.92,
+    ) -> None:
+        self._entries = TTLCache(maxsize, ttl_seconds)
+        self._embedder = embedder
+        self._threshold = similarity_threshold
+        self._vectors: Dict[str, "OrderedDict[Tuple[str, ...], List[float]]"] = {}
+        self.rule_hits: Dict[str, int] = {rule: 0 for rule in RULES}
+        self.lookups = 0
+
+    def _keys(self, namespace: str, parts: Sequence[str]) -> List[Tuple[str, Any]]:
+        return [
+            ("exact", (namespace, "exact", tuple(parts))),
+            ("fold", (namespace, "fold", tuple(fold(p) for p in parts))),
+            ("alias", (namespace, "alias", canonicalize(namespace, parts))),
+        ]
+
+    async def get(self, namespace: str, parts: Sequence[str]) -> Optional[Any]:
+        """Look up a cached response, trying each normalization rule in turn."""
+        self.lookups += 1
+        for rule, key in self._keys(namespace, parts):
+            value = self._entries.get(key, count=False)
+            if value is not None:
+                self.rule_hits[rule] += 1
+                return loads(value)
+
+        if self._embedder is None:
+            return None
+
+        canonical = canonicalize(namespace, parts)
+        vector = await self._embed(" | ".join(canonical))
+        if vector is None:
+            return None
+        best_key, best_score = None, 0.0
+        for other_key, other_vector in self._vectors.get(namespace, {}).items():
+            score = _cosine(vector, other_vector)
+            if score > best_score:
+                best_key, best_score = other_key, score
+        if best_key is not None and best_score >= self._threshold:
+            value = self._entries.get((namespace, "alias", best_key), count=False)
+            if value is not None:
+                self.rule_hits["similarity"] += 1
+                # Remember this phrasing so the next lookup is a cheap alias hit
+                self._entries.set((namespace, "alias", canonical), value)
+                return loads(value)
+        return None
+
+    async def set(self, namespace: str, parts: Sequence[str], value: Any) -> None:
+        """Store a response under every normalization level of its key."""
+        stored = dumps(value)
+        for _rule, key in self._keys(namespace, parts):
+            self._entries.set(key, stored)
+
+        if self._embedder is None:
+            return
+        canonical = canonicalize(namespace, parts)
+        vectors = self._vectors.setdefault(namespace, OrderedDict())
+        if canonical in vectors:
+            return
+        vector = await self._embed(" | ".join(canonical))
+        if vector is None:
+            return
+        vectors[canonical] = vector
+        while len(vectors) > MAX_EMBEDDINGS_PER_NAMESPACE:
+            vectors.popitem(last=False)
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        try:
+            return await self._embedder(text)
+        except Exception as exc:
+            logger.warning("Cache embedding failed: %s", exc)
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counts and hit rates per normalization rule."""
+        hits = sum(self.rule_hits.values())
+
+        def rate(count: int) -> float:
+            return round(count / self.lookups, 4) if self.lookups else 0.0
+
+        return {
+            "lookups": self.lookups,
+            "hits": hits,
+            "misses": self.lookups - hits,
+            "hitRate": rate(hits),
+            "rules": {
+                rule: {"hits": count, "hitRate": rate(count)}
+                for rule, count in self.rule_hits.items()
+            },
+            "entries": len(self._entries),
+        }
+
+
+def _vertex_embedder(model_name: str) -> Optional[Embedder]:
+    """Build an embedder backed by a Vertex AI text embedding model."""
+    if not EMBEDDINGS_AVAILABLE:
+        logger.warning("Embedding model configured but Vertex AI SDK not installed")
+        return None
+
+    model = None
+
+    async def embed(text: str) -> Optional[List[float]]:
+        nonlocal model
+        if model is None:
+            model = TextEmbeddingModel.from_pretrained(model_name)
+        embeddings = await asyncio.to_thread(model.get_embeddings, [text])
+        return list(embeddings[0].values) if embeddings else None
+
+    return embed
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get the shared response cache, or None when caching is disabled."""
+    global _llm_cache
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return None
+    if _llm_cache is None:
+        embedder = None
+        if settings.llm_cache_embedding_model:
+            embedder = _vertex_embedder(settings.llm_cache_embedding_model)
+        _llm_cache = LLMResponseCache(
+            maxsize=settings.llm_cache_max_entries,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            embedder=embedder,
+            similarity_threshold=settings.llm_cache_similarity_threshold,
+        )
+    return _llm_cache
@@ -0,0 +1,143 @@
+"""
+Markdown parser shared by the PDF renderers.
+
+Reads the markdown the app generates into a small block tree that both the
+LaTeX converter (app.services.latex) and the in-process renderer
+(app.services.pdf_render) consume, so the two always agree on structure.
+Each line is classified by one regex match and each line's inline markup by
+one scan:
+
+- `# `, `## `, `### ` headings
+- `- `, `* `, `+ ` bullet and `1. `/`1) ` numbered lists, nested by indentation
+- `**bold**`, `*italic*`, `***both***` (or with underscores), `` `code` ``
+  and `[text](url)` links, with http(s) and mailto URLs only
+- every other non-blank line is its own paragraph; a blank line ends a list
+
+Blocks are tuples:
+    ("heading", level, spans)
+    ("paragraph", spans)
+    ("list", ordered, start, items)   items: [(spans, [nested list blocks])]
+Spans are (text, style, href) with style one of "", "b", "i", "bi", "code".
+"""
+
+import re
+from typing import Any, List, Optional, Tuple
+
+Span = Tuple[str, str, Optional[str]]
+Block = Tuple[Any, ...]
+
+# LaTeX nests lists at most four deep
+MAX_LIST_DEPTH = 4
+TAB_WIDTH = 4
+
+_LINE = re.compile(
+    r"(?P<indent>[ \t]*)(?:"
+    r"(?P<hashes>#{1,3})[ \t]+(?P<heading>.*)"
+    r"|(?P<bullet>[-*+])[ \t]+(?P<item>.*)"
+    r"|(?P<number>\d{1,9})[.)][ \t]+(?P<numbered>.*)"
+    r"|(?P<text>.*))"
+)
+
+# Alternatives are tried left to right at each position, so *** before ** before *;
+# the lookahead skips positions that can't start any of them in one test
+_INLINE = re.compile(
+    r"(?=[`\[*_])(?:"
+    r"`(?P<code>[^`]+)`"
+    r"|\[(?P<label>[^\]]+)\]\((?P<href>(?:[^()\s]|\([^()\s]*\))+)\)"
+    r"|\*\*\*(?P<strong_em>\S(?:.*?\S)?)\*\*\*"
+    r"|\*\*(?P<strong>\S(?:.*?\S)?)\*\*"
+    r"|(?<!\w)__(?P<strong_u>\S(?:.*?\S)?)__(?!\w)"
+    r"|\*(?P<em>\S(?:.*?\S)?)\*"
+    r"|(?<!\w)_(?P<em_u>\S(?:.*?\S)?)_(?!\w))"
+)
+
+# Lines without any of these characters are a single plain span
+_MARKUP_CHARS = re.compile(r"[*_`\[]")
+
+_SAFE_URL = re.compile(r"(?:https?://|mailto:)\S+", re.IGNORECASE)
+
+_STYLE_GROUPS = {
+    "strong_em": "bi",
+    "strong": "b",
+    "strong_u": "b",
+    "em": "i",
+    "em_u": "i",
+}
+
+
+def _combine(style: str, add: str) -> str:
+    if style == "code":
+        return style
+    flags = set(style) | set(add)
+    return ("b" if "b" in flags else "") + ("i" if "i" in flags else "")
+
+
+def parse_inline(text: str, style: str = "", href: Optional[str] = None) -> List[Span]:
+    """Split a line of text into styled spans."""
+    if not _MARKUP_CHARS.search(text):
+        return [(text, style, href)] if text else []
+    spans: List[Span] = []
+    position = 0
+    for match in _INLINE.finditer(text):
+        if match.start() > position:
+            spans.append((text[position:match.start()], style, href))
+        group = match.lastgroup
+        if group == "code":
+            spans.append((match.group("code"), "code", href))
+        elif group in ("label", "href"):
+            url = match.group("href")
+            link = url if _SAFE_URL.fullmatch(url) else href
+            spans.extend(parse_inline(match.group("label"), style, link))
+        else:
+            spans.extend(parse_inline(match.group(group), _combine(style, _STYLE_GROUPS[group]), href))
+        position = match.end()
+    if position < len(text):
+        spans.append((text[position:], style, href))
+    return spans
+
+
+def _indent_width(indent: str) -> int:
+    return len(indent.expandtabs(TAB_WIDTH))
+
+
+def parse_markdown(markdown: str) -> List[Block]:
+    """Parse markdown into blocks; see the module docstring for the shapes."""
+    blocks: List[Block] = []
+    # Open lists, outermost first: (indent, ordered, items)
+    stack: List[Tuple[int, bool, list]] = []
+
+    for raw in markdown.splitlines():
+        match = _LINE.match(raw.rstrip())
+        kind = match.lastgroup
+        if kind == "text" or kind == "heading":
+            stack.clear()
+            if kind == "heading":
+                blocks.append(("heading", len(match.group("hashes")), parse_inline(match.group("heading").strip())))
+            elif match.group("text"):
+                blocks.append(("paragraph", parse_inline(match.group("text"))))
+            continue
+
+        ordered = kind == "numbered"
+        spans = parse_inline(match.group(kind).strip())
+        indent = _indent_width(match.group("indent"))
+
+        while len(stack) > 1 and stack[-1][0] > indent:
+            stack.pop()
+        if stack and (indent <= stack[-1][0] or len(stack) == MAX_LIST_DEPTH):
+            # Same level as the innermost open list (or as deep as lists go)
+            indent = stack[-1][0]
+            if stack[-1][1] == ordered:
+                stack[-1][2].append((spans, []))
+                continue
+            # A different kind of list: close it and open a sibling
+            stack.pop()
+
+        new_list: List[Tuple[List[Span], List[Block]]] = [(spans, [])]
+        block = ("list", ordered, int(match.group("number")) if ordered else 1, new_list)
+        if stack:
+            stack[-1][2][-1][1].append(block)
+        else:
+            blocks.append(block)
+        stack.append((indent, ordered, new_list))
+
+    return blocks
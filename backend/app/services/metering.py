@@ -0,0 +1,242 @@
+"""
+Server-side token metering with leased balances.
+
+Instead of a `deduct_tokens` RPC per LLM call, the ledger leases a block of
+a user's tokens (the lease amount is removed from the workspace balance in
+Supabase up front), debits locally with no network hop, and periodically
+reports cumulative consumption per lease in one batched RPC.
+
+Correctness across restarts and instances:
+- Leased tokens are already gone from the database balance, so concurrent
+  instances can never spend more than the user owns.
+- Usage reports carry each lease's absolute consumed total, so a retried
+  flush cannot double-charge.
+- On shutdown every lease is released and its unused tokens refunded. If an
+  instance dies instead, the database settles its leases once they expire
+  (see docs/TokenMetering.sql); only usage since the last flush is lost.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.supabase import acquire_token_lease, invalidate_account_status, report_token_usage
+
+logger = logging.getLogger(__name__)
+
+# Token prices per LLM feature (kept in sync with the frontend)
+TOKEN_COSTS: Dict[str, int] = {
+    "application_fit": 2,
+    "mentor_match": 2,
+    "networking": 1,
+    "interview": 1,
+    "pdf_download": 1,  # Per compiled document
+}
+
+# Stop using a lease this long before the database would expire it, so the
+# final usage report always lands before server-side settlement.
+LEASE_EXPIRY_MARGIN_SECONDS = 60
+
+
+class InsufficientTokensError(Exception):
+    """Raised when a user's balance cannot cover a debit."""
+
+
+def generation_cost(options: Dict[str, Any]) -> int:
+    """Token cost of a generate-documents request."""
+    base = int(bool(options.get("generateResume"))) + int(bool(options.get("generateCoverLetter")))
+    thinking = 10 if options.get("thinkingMode") and base > 0 else 0
+    has_job = bool((options.get("jobDescription") or "").strip())
+    analysis = 2 if has_job and (options.get("generateResume") or options.get("uploadedResume")) else 0
+    return base + thinking + analysis
+
+
+class _Lease:
+    __slots__ = ("user_id", "lease_id", "granted", "consumed", "reported", "expires_at")
+
+    def __init__(self, user_id: str, lease_id: str, granted: int, expires_at: float) -> None:
+        self.user_id = user_id
+        self.lease_id = lease_id
+        self.granted = granted
+        self.consumed = 0
+        self.reported = 0
+        self.expires_at = expires_at
+
+    @property
+    def remaining(self) -> int:
+        return self.granted - self.consumed
+
+
+Charges = List[Tuple[_Lease, int]]
+
+
+class TokenLedger:
+    """In-process ledger of leased token balances."""
+
+    def __init__(self, lease_size: int, lease_ttl_seconds: int, flush_interval: float) -> None:
+        self.lease_size = lease_size
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.flush_interval = flush_interval
+        self._leases: Dict[str, List[_Lease]] = {}
+        self._retired: List[_Lease] = []
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self._flush_lock = asyncio.Lock()
+
+    def outstanding(self, user_id: str) -> int:
+        """Leased tokens this instance holds for the user but hasn't spent."""
+        self._retire_expired(user_id)
+        return sum(lease.remaining for lease in self._leases.get(user_id, []))
+
+    async def debit(self, user_id: str, amount: int) -> Charges:
+        """Debit tokens locally, leasing a new block only when needed."""
+        self.start()
+        charges = self._try_consume(user_id, amount)
+        if charges is not None:
+            return charges
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            charges = self._try_consume(user_id, amount)
+            if charges is not None:
+                return charges
+
+            needed = amount - self.outstanding(user_id)
+            lease = await acquire_token_lease(
+                user_id, max(self.lease_size, needed), self.lease_ttl_seconds
+            )
+            if lease["granted"] > 0 and lease["leaseId"]:
+                expires_at = time.monotonic() + self.lease_ttl_seconds - LEASE_EXPIRY_MARGIN_SECONDS
+                self._leases.setdefault(user_id, []).append(
+                    _Lease(user_id, lease["leaseId"], lease["granted"], expires_at)
+                )
+
+            charges = self._try_consume(user_id, amount)
+            if charges is None:
+                raise InsufficientTokensError("Insufficient tokens.")
+            return charges
+
+    def refund(self, charges: Charges) -> None:
+        """Return tokens from a failed call to the leases they came from."""
+        for lease, amount in charges:
+            lease.consumed -= amount
+
+    def _try_consume(self, user_id: str, amount: int) -> Optional[Charges]:
+        if self.outstanding(user_id) < amount:
+            return None
+        charges: Charges = []
+        for lease in self._leases.get(user_id, []):
+            take = min(lease.remaining, amount)
+            if take > 0:
+                lease.consumed += take
+                charges.append((lease, take))
+                amount -= take
+            if amount == 0:
+                break
+        return charges
+
+    def _retire_expired(self, user_id: str) -> None:
+        leases = self._leases.get(user_id)
+        if not leases:
+            return
+        now = time.monotonic()
+        live = [lease for lease in leases if lease.expires_at > now]
+        if len(live) != len(leases):
+            self._retired.extend(lease for lease in leases if lease.expires_at <= now)
+            if live:
+                self._leases[user_id] = live
+            else:
+                del self._leases[user_id]
+
+    async def flush(self, release_all: bool = False) -> int:
+        """Report pending usage in one batch. Returns the number of leases reported."""
+        async with self._flush_lock:
+            for user_id in list(self._leases):
+                if release_all:
+                    self._retired.extend(self._leases.pop(user_id))
+                else:
+                    self._retire_expired(user_id)
+
+            batch: List[Tuple[_Lease, int, bool]] = []
+            for leases in self._leases.values():
+                batch.extend((lease, lease.consumed, False) for lease in leases if lease.consumed != lease.reported)
+            batch.extend((lease, lease.consumed, True) for lease in self._retired)
+            if not batch:
+                return 0
+
+            try:
+                await report_token_usage([
+                    {"lease_id": lease.lease_id, "consumed": consumed, "release": release}
+                    for lease, consumed, release in batch
+                ])
+            except Exception as exc:
+                logger.warning("Token usage flush failed, will retry: %s", exc)
+                return 0
+
+            released = set()
+            for lease, consumed, release in batch:
+                lease.reported = consumed
+                if release:
+                    released.add(id(lease))
+                    # Unused tokens went back to the stored balance
+                    invalidate_account_status(lease.user_id)
+            self._retired = [lease for lease in self._retired if id(lease) not in released]
+            return len(batch)
+
+    def start(self) -> None:
+        """Start the periodic flusher if it isn't running."""
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher and release all leases back to Supabase."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush(release_all=True)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+_token_ledger: Optional[TokenLedger] = None
+
+
+def get_token_ledger() -> Optional[TokenLedger]:
+    """Get the shared ledger, or None when server-side metering is disabled."""
+    global _token_ledger
+    settings = get_settings()
+    if not settings.token_metering_enabled:
+        return None
+    if _token_ledger is None:
+        _token_ledger = TokenLedger(
+            lease_size=settings.token_lease_size,
+            lease_ttl_seconds=settings.token_lease_ttl_seconds,
+            flush_interval=settings.token_flush_interval_seconds,
+        )
+    return _token_ledger
+
+
+@asynccontextmanager
+async def charge_tokens(user_id: str, amount: int) -> AsyncIterator[None]:
+    """Debit `amount` tokens for the enclosed LLM call; refund if it fails."""
+    ledger = get_token_ledger()
+    if ledger is None or amount <= 0:
+        yield
+        return
+
+    charges = await ledger.debit(user_id, amount)
+    try:
+        yield
+    except BaseException:
+        ledger.refund(charges)
+        raise
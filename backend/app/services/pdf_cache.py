@@ -0,0 +1,266 @@
+"""
+Content-addressed cache of compiled resume PDFs.
+
+Users download the same document many times; compiling identical markdown
+with the same template always yields the same PDF, so the key is a hash of
+the normalized markdown plus the template version.
+
+- Hot tier: small PDFs are kept in memory, bounded by total bytes.
+- Disk tier: every PDF is written under `directory`, bounded by total bytes
+  and evicted least recently used. The index is rebuilt from file mtimes on
+  first use, so entries survive restarts when the directory does.
+- Concurrent misses for one key share a single compile (SingleFlight).
+
+Disk errors are logged and treated as misses; the cache never fails a
+request. Several processes may share a directory, but each enforces the
+size bound on its own view of it.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def normalize_markdown(markdown: str) -> str:
+    """
+    Canonical form of markdown for cache keys.
+
+    Only folds differences the LaTeX conversion ignores: line endings,
+    trailing whitespace per line, and runs of blank lines. Leading
+    whitespace is kept because it nests list items.
+    """
+    lines = [line.rstrip() for line in markdown.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip("\n")
+
+
+def pdf_cache_key(markdown: str, template_version: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(template_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_markdown(markdown).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PDFCache:
+    """Two-tier (memory, disk) LRU cache of PDF bytes keyed by content hash."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        memory_max_bytes: int,
+        memory_item_max_bytes: int,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_item_max_bytes = memory_item_max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> size in bytes, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._index_loaded = False
+        self._index_lock = asyncio.Lock()
+        self._flights = SingleFlight(cancel_abandoned=True)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    # ------------------------------------------------------------------
+    # Disk index
+    # ------------------------------------------------------------------
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for path in self.directory.glob("*/*.pdf"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        return entries
+
+    async def _ensure_index(self) -> None:
+        if self._index_loaded:
+            return
+        async with self._index_lock:
+            if self._index_loaded:
+                return
+            try:
+                await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+                entries = await asyncio.to_thread(self._scan)
+            except OSError as exc:
+                self.disk_errors += 1
+                logger.warning("PDF cache directory %s unusable: %s", self.directory, exc)
+                entries = []
+            for _, key, size in entries:
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._index_loaded = True
+        await self._evict_disk()
+
+    def _forget_disk(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    async def _evict_disk(self) -> None:
+        while self._disk_bytes > self.max_bytes and self._disk:
+            key = next(iter(self._disk))
+            self._forget_disk(key)
+            self.evictions += 1
+            try:
+                await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+            except OSError as exc:
+                self.disk_errors += 1
+                logger.warning("PDF cache eviction of %s failed: %s", key, exc)
+
+    # ------------------------------------------------------------------
+    # Tiers
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, pdf: bytes) -> None:
+        if len(pdf) > self.memory_item_max_bytes or key in self._memory:
+            return
+        self._memory[key] = pdf
+        self._memory_bytes += len(pdf)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_bytes -= len(dropped)
+
+    def _read(self, key: str) -> bytes:
+        path = self._path(key)
+        pdf = path.read_bytes()
+        os.utime(path)  # Keep recency across restarts
+        return pdf
+
+    def _write(self, key: str, pdf: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(pdf)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the cached PDF for `key`, or None."""
+        pdf = self._memory.get(key)
+        if pdf is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return pdf
+
+        await self._ensure_index()
+        if key in self._disk:
+            try:
+                pdf = await asyncio.to_thread(self._read, key)
+            except OSError as exc:
+                # Evicted by another process sharing the directory, or unreadable
+                self._forget_disk(key)
+                if not isinstance(exc, FileNotFoundError):
+                    self.disk_errors += 1
+                    logger.warning("PDF cache read of %s failed: %s", key, exc)
+            else:
+                self._disk.move_to_end(key)
+                self.disk_hits += 1
+                self._remember(key, pdf)
+                return pdf
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, pdf: bytes) -> None:
+        """Store a PDF in both tiers."""
+        self._remember(key, pdf)
+        await self._ensure_index()
+        if len(pdf) > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, pdf)
+        except OSError as exc:
+            self.disk_errors += 1
+            logger.warning("PDF cache write of %s failed: %s", key, exc)
+            return
+        self._forget_disk(key)
+        self._disk[key] = len(pdf)
+        self._disk_bytes += len(pdf)
+        await self._evict_disk()
+
+    async def get_or_compile(self, key: str, compile_pdf: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Return the cached PDF for `key`, compiling and storing it on a miss.
+
+        Concurrent misses for the same key share one `compile_pdf` call;
+        it's cancelled only if every request waiting on it goes away.
+        """
+        pdf = await self.get(key)
+        if pdf is not None:
+            return pdf
+
+        async def compile_and_store() -> bytes:
+            compiled = await compile_pdf()
+            await self.put(key, compiled)
+            return compiled
+
+        return await self._flights.do(key, compile_and_store)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memoryHits": self.memory_hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "sharedCompiles": self._flights.shared,
+            "memoryEntries": len(self._memory),
+            "memoryBytes": self._memory_bytes,
+            "diskEntries": len(self._disk),
+            "diskBytes": self._disk_bytes,
+            "evictions": self.evictions,
+            "diskErrors": self.disk_errors,
+        }
+
+
+_pdf_cache: Optional[PDFCache] = None
+
+
+def get_pdf_cache() -> Optional[PDFCache]:
+    """Get the shared PDF cache, or None when caching is disabled."""
+    global _pdf_cache
+    settings = get_settings()
+    if not settings.pdf_cache_enabled:
+        return None
+    if _pdf_cache is None:
+        _pdf_cache = PDFCache(
+            directory=settings.pdf_cache_dir or os.path.join(tempfile.gettempdir(), "rezzy-pdf-cache"),
+            max_bytes=settings.pdf_cache_max_bytes,
+            memory_max_bytes=settings.pdf_cache_memory_max_bytes,
+            memory_item_max_bytes=settings.pdf_cache_memory_item_max_bytes,
+        )
+    return _pdf_cache
@@ -0,0 +1,572 @@
+"""
+In-process PDF renderer for simple markdown documents.
+
+Sets the blocks of app.services.markdown_parser - the same tree
+`_markdown_to_latex` converts: headings, nested bullet and numbered lists,
+paragraphs, bold/italic/code spans and links - and lays them out like the
+LaTeX template (article 11pt on US letter, 1in margins, justified
+paragraphs with a 17pt indent, centred page numbers) without spawning a
+TeX engine. Templates it stands in for load `LATEX_FONT_PACKAGES`.
+
+Text is set in the standard Times and Courier fonts with their AFM
+widths, which every PDF viewer provides, so nothing needs embedding. That
+limits documents to the WinAnsi (cp1252) character set; `supports()`
+reports whether a document fits, and anything else goes to Tectonic.
+Output is deterministic, so identical markdown yields identical bytes.
+"""
+
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, Final, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from app.services.markdown_parser import Block, Span, parse_markdown
+
+# Part of the PDF cache key: bump whenever the rendered output changes
+RENDERER_VERSION: Final[str] = "2"
+
+# ============================================================================
+# FONT METRICS
+# Widths in 1/1000 em for WinAnsi codes 32-126, from the Adobe AFM files.
+# ============================================================================
+
+_TIMES_ROMAN_ASCII = [
+    250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+    278, 278, 564, 564, 564, 444, 921,
+    722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889,
+    722, 722, 556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611,
+    333, 278, 333, 469, 500, 333,
+    444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778,
+    500, 500, 500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444,
+    480, 200, 480, 541,
+]
+
+_TIMES_BOLD_ASCII = [
+    250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+    333, 333, 570, 570, 570, 500, 930,
+    722, 667, 722, 722, 667, 611, 778, 778, 389, 500, 778, 667, 944,
+    722, 778, 611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667,
+    333, 278, 333, 581, 500, 333,
+    500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833,
+    556, 500, 556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444,
+    394, 220, 394, 520,
+]
+
+_TIMES_ITALIC_ASCII = [
+    250, 333, 420, 500, 500, 833, 778, 214, 333, 333, 500, 675, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+    333, 333, 675, 675, 675, 500, 920,
+    611, 611, 667, 722, 611, 611, 722, 722, 333, 444, 667, 556, 833,
+    667, 722, 611, 722, 611, 500, 556, 722, 611, 833, 611, 556, 556,
+    389, 278, 389, 422, 500, 333,
+    500, 500, 444, 500, 444, 278, 500, 500, 278, 278, 444, 278, 722,
+    500, 500, 500, 500, 389, 389, 278, 500, 444, 667, 444, 444, 389,
+    400, 275, 400, 541,
+]
+
+_TIMES_BOLD_ITALIC_ASCII = [
+    250, 389, 555, 500, 500, 833, 778, 278, 333, 333, 500, 570, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500,
+    333, 333, 570, 570, 570, 500, 832,
+    667, 667, 667, 722, 667, 667, 722, 778, 389, 500, 667, 611, 889,
+    722, 722, 611, 722, 667, 556, 611, 722, 667, 889, 667, 611, 611,
+    333, 278, 333, 570, 500, 333,
+    500, 500, 444, 500, 444, 333, 500, 556, 278, 278, 500, 278, 778,
+    556, 500, 500, 500, 389, 389, 278, 556, 444, 667, 500, 444, 389,
+    348, 220, 348, 570,
+]
+
+# Non-ASCII WinAnsi glyphs without an ASCII base letter; accented letters
+# take the width of their base letter
+_TIMES_ROMAN_EXTRA = {
+    "€": 500, "‚": 333, "ƒ": 500, "„": 444, "…": 1000, "†": 500,
+    "‡": 500, "ˆ": 333, "‰": 1000, "‹": 333, "Œ": 889, "‘": 333,
+    "’": 333, "“": 444, "”": 444, "•": 350, "–": 500, "—": 1000,
+    "˜": 333, "™": 980, "›": 333, "œ": 722, " ": 250, "¡": 333,
+    "¢": 500, "£": 500, "¤": 500, "¥": 500, "¦": 200, "§": 500,
+    "¨": 333, "©": 760, "ª": 276, "«": 500, "¬": 564, "­": 333,
+    "®": 760, "¯": 333, "°": 400, "±": 564, "²": 300, "³": 300,
+    "´": 333, "µ": 500, "¶": 453, "·": 250, "¸": 333, "¹": 300,
+    "º": 310, "»": 500, "¼": 750, "½": 750, "¾": 750, "¿": 444,
+    "Æ": 889, "Ð": 722, "×": 564, "Ø": 722, "Þ": 556, "ß": 500,
+    "æ": 667, "ð": 500, "÷": 564, "ø": 500, "þ": 500,
+}
+
+_TIMES_BOLD_EXTRA = {
+    **_TIMES_ROMAN_EXTRA,
+    "„": 500, "™": 1000, "Œ": 1000, "œ": 722, "“": 500, "”": 500,
+    "©": 747, "®": 747, "ª": 300, "º": 330, "¬": 570, "±": 570,
+    "¶": 540, "¿": 500, "Æ": 1000, "×": 570, "Ø": 778, "Þ": 611,
+    "ß": 556, "æ": 722, "÷": 570, "þ": 556, "¦": 220,
+    "¨": 333, "²": 300, "³": 300, "¹": 300,
+}
+
+_TIMES_ITALIC_EXTRA = {
+    **_TIMES_ROMAN_EXTRA,
+    "„": 556, "…": 889, "—": 889, "“": 556, "”": 556, "™": 980,
+    "Œ": 944, "œ": 667, "Æ": 889, "æ": 667, "¬": 675, "±": 675,
+    "×": 675, "÷": 675, "¶": 523, "¿": 500, "ª": 276, "º": 310,
+    "¦": 275, "Þ": 611, "Ø": 722,
+}
+
+_TIMES_BOLD_ITALIC_EXTRA = {
+    **_TIMES_BOLD_EXTRA,
+    "…": 1000, "—": 1000, "Œ": 944, "œ": 722, "Æ": 944, "æ": 722,
+    "ß": 500, "ª": 266, "º": 300, "¶": 500, "Þ": 611, "Ø": 722,
+    "þ": 500, "¦": 220,
+}
+
+
+def _width_table(ascii_widths: List[int], extra: Dict[str, int]) -> Dict[str, int]:
+    table = {chr(32 + i): width for i, width in enumerate(ascii_widths)}
+    for code in range(128, 256):
+        try:
+            char = bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            continue
+        if char in extra:
+            table[char] = extra[char]
+            continue
+        base = unicodedata.normalize("NFD", char)[0]
+        table[char] = table.get(base, 500)
+    return table
+
+
+FONTS: Final[Dict[str, Tuple[str, Dict[str, int]]]] = {
+    "F1": ("Times-Roman", _width_table(_TIMES_ROMAN_ASCII, _TIMES_ROMAN_EXTRA)),
+    "F2": ("Times-Bold", _width_table(_TIMES_BOLD_ASCII, _TIMES_BOLD_EXTRA)),
+    "F3": ("Times-Italic", _width_table(_TIMES_ITALIC_ASCII, _TIMES_ITALIC_EXTRA)),
+    "F4": ("Times-BoldItalic", _width_table(_TIMES_BOLD_ITALIC_ASCII, _TIMES_BOLD_ITALIC_EXTRA)),
+    "F5": ("Courier", {char: 600 for char in _width_table(_TIMES_ROMAN_ASCII, {})}),
+}
+REGULAR, BOLD, ITALIC, BOLD_ITALIC, MONOSPACE = "F1", "F2", "F3", "F4", "F5"
+
+# LaTeX packages that switch a template to these fonts (Times text, Courier
+# \texttt); templates rendered in-process must load them so both engines
+# produce the same typeface
+LATEX_FONT_PACKAGES: Final[Tuple[str, ...]] = ("mathptmx", "courier")
+
+# Span style -> font, in running text and in (bold) headings
+BODY_FONTS: Final[Dict[str, str]] = {"": REGULAR, "b": BOLD, "i": ITALIC, "bi": BOLD_ITALIC, "code": MONOSPACE}
+HEADING_FONTS: Final[Dict[str, str]] = {"": BOLD, "b": BOLD, "i": BOLD_ITALIC, "bi": BOLD_ITALIC, "code": MONOSPACE}
+
+# ============================================================================
+# LAYOUT (article class, 11pt, geometry margin=1in)
+# ============================================================================
+
+PAGE_WIDTH, PAGE_HEIGHT = 612.0, 792.0
+MARGIN = 72.0
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+TOP_SKIP = 11.0
+FOOT_BASELINE = MARGIN - 30.0  # \footskip below the text block
+
+BODY_SIZE, BODY_LEADING = 10.95, 13.6
+PAR_INDENT = 17.0
+LABEL_SEP = 5.5  # 0.5em; enumitem leftmargin=* makes the label box as wide as the bullet
+# Past this much stretch per space a line is left ragged rather than justified
+MAX_SPACE_STRETCH = 3.0
+
+# List depth -> (\topsep + \partopsep around the list, \itemsep + \parsep between items)
+LIST_SPACING: Final[Dict[int, Tuple[float, float]]] = {1: (12.0, 9.0), 2: (4.5, 4.0), 3: (2.0, 2.0), 4: (2.0, 2.0)}
+# \leftmargini..iv, used by enumerate; itemize is leftmargin=* in the template
+ENUMERATE_MARGINS: Final[Tuple[float, ...]] = (27.5, 24.2, 20.6, 18.7)
+# \labelitemi..iv as (text, font)
+BULLETS: Final[Tuple[Tuple[str, str], ...]] = (("•", REGULAR), ("–", BOLD), ("*", REGULAR), ("·", REGULAR))
+
+# heading level -> (size, leading, space before, space after)
+HEADINGS: Final[Dict[int, Tuple[float, float, float, float]]] = {
+    1: (14.4, 18.0, 16.5, 10.8),
+    2: (12.0, 14.5, 15.3, 7.1),
+    3: (10.95, 13.6, 15.3, 7.1),
+}
+
+# TeX input ligatures of the T1-encoded template fonts, longest first;
+# the typewriter font has none
+_LIGATURES = (("---", "—"), ("--", "–"), ("``", "“"), ("''", "”"),
+              ("<<", "«"), (">>", "»"), ("`", "‘"), ("'", "’"))
+
+# hyperref's default link border: a 1pt cyan box
+_LINK_STYLE = "/Border [0 0 1] /C [0 1 1]"
+
+# A word is a run of (text, font, href, width) segments with no space between
+# them, measured once: (segments, width, width of the space after it)
+Segment = Tuple[str, str, Optional[str], float]
+Word = Tuple[List[Segment], float, float]
+
+_WHITESPACE = re.compile(r"(\s+)")
+
+
+def _typeset_text(text: str) -> str:
+    for source, glyph in _LIGATURES:
+        text = text.replace(source, glyph)
+    return text
+
+
+def supports(markdown: str) -> bool:
+    """Whether every character can be set in the standard fonts."""
+    try:
+        encoded = _typeset_text(markdown).encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return all(byte >= 32 or byte in (9, 10, 13) for byte in encoded)
+
+
+def text_width(text: str, font: str, size: float) -> float:
+    widths = FONTS[font][1]
+    try:
+        return sum(map(widths.__getitem__, text)) * size / 1000.0
+    except KeyError:
+        return sum(widths.get(char, 500) for char in text) * size / 1000.0
+
+
+def _word(segments: List[Segment], size: float) -> Word:
+    return segments, sum(segment[3] for segment in segments), text_width(" ", segments[-1][1], size)
+
+
+def _num(value: float) -> str:
+    return ("%.2f" % value).rstrip("0").rstrip(".")
+
+
+def _pdf_string(text: str) -> str:
+    raw = text.encode("cp1252").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _words(spans: List[Span], fonts: Dict[str, str], size: float) -> List[Word]:
+    """Split styled spans into measured words, keeping each character's font and link."""
+    words: List[Word] = []
+    current: List[Segment] = []
+    for text, style, href in spans:
+        if style != "code":
+            text = _typeset_text(text)
+        font = fonts[style]
+        for index, part in enumerate(_WHITESPACE.split(text)):
+            if index % 2:
+                if current:
+                    words.append(_word(current, size))
+                    current = []
+            elif part:
+                current.append((part, font, href, text_width(part, font, size)))
+    if current:
+        words.append(_word(current, size))
+    return words
+
+
+class _Layout:
+    """Page filling into per-page content streams and link annotations."""
+
+    def __init__(self) -> None:
+        self.pages: List[List[str]] = []
+        self.links: List[List[Tuple[Tuple[float, float, float, float], str]]] = []
+        self.baseline: Optional[float] = None
+        self.pending_space = 0.0
+        self.word_spacing = 0.0
+        self._new_page()
+
+    def _new_page(self) -> None:
+        self.pages.append([])
+        self.links.append([])
+        self.baseline = None
+        self.pending_space = 0.0
+        self.word_spacing = 0.0
+
+    def space(self, amount: float) -> None:
+        # Like \addvspace: adjacent skips don't add up, the larger one wins
+        self.pending_space = max(self.pending_space, amount)
+
+    def _next_baseline(self, leading: float) -> float:
+        if self.baseline is None:
+            return PAGE_HEIGHT - MARGIN - TOP_SKIP
+        return self.baseline - leading - self.pending_space
+
+    def fits(self, leading: float, extra: float = 0.0) -> bool:
+        return self.baseline is None or self._next_baseline(leading) - extra >= MARGIN
+
+    def next_line(self, leading: float) -> float:
+        """Move to the next baseline, starting a new page when the text block is full."""
+        if not self.fits(leading):
+            self._new_page()
+        self.baseline = self._next_baseline(leading)
+        self.pending_space = 0.0
+        return self.baseline
+
+    def text(self, x: float, text: str, font: str, size: float, word_spacing: float = 0.0) -> None:
+        # Word spacing is text state: it carries over to later lines until reset
+        spacing = ""
+        if " " in text and word_spacing != self.word_spacing:
+            spacing = f"{_num(word_spacing)} Tw "
+            self.word_spacing = word_spacing
+        self.pages[-1].append(
+            f"BT /{font} {_num(size)} Tf {spacing}{_num(x)} {_num(self.baseline)} Td {_pdf_string(text)} Tj ET"
+        )
+
+    def link(self, x0: float, x1: float, size: float, href: str) -> None:
+        # Glyph descender and ascender plus hyperref's 1pt border
+        rect = (x0, self.baseline - 0.22 * size - 1, x1, self.baseline + 0.68 * size + 1)
+        self.links[-1].append((rect, href))
+
+    def line(self, x: float, words: List[Word], size: float, leading: float, stretch: float = 0.0) -> None:
+        """Set one line of words from `x`, widening each space by `stretch`."""
+        self.next_line(leading)
+        run_x, run_text, run_font = x, "", None
+        link: Optional[List[Any]] = None  # [href, x0, x1]
+        for index, (segments, _, _) in enumerate(words):
+            if index:
+                if segments[0][1] == run_font:
+                    run_text += " "
+                x += words[index - 1][2] + stretch
+            for text, font, href, width in segments:
+                if font != run_font:
+                    if run_text:
+                        self.text(run_x, run_text, run_font, size, stretch)
+                    run_x, run_text, run_font = x, "", font
+                run_text += text
+                if link is not None and link[0] != href:
+                    self.link(link[1], link[2], size, link[0])
+                    link = None
+                if href is not None:
+                    if link is None:
+                        link = [href, x, x]
+                    link[2] = x + width
+                x += width
+        if run_text:
+            self.text(run_x, run_text, run_font, size, stretch)
+        if link is not None:
+            self.link(link[1], link[2], size, link[0])
+
+    def break_page(self) -> None:
+        if self.baseline is not None:
+            self._new_page()
+
+
+def _split_long_word(word: Word, size: float, width: float) -> List[Word]:
+    pieces: List[Word] = []
+    current: List[Segment] = []
+    current_width = 0.0
+    for text, font, href, _ in word[0]:
+        for char in text:
+            char_width = text_width(char, font, size)
+            if current and current_width + char_width > width:
+                pieces.append(_word(current, size))
+                current, current_width = [], 0.0
+            if current and current[-1][1:3] == (font, href):
+                current[-1] = (current[-1][0] + char, font, href, current[-1][3] + char_width)
+            else:
+                current.append((char, font, href, char_width))
+            current_width += char_width
+    return pieces + [_word(current, size)] if current else pieces
+
+
+def _break_lines(words: List[Word], size: float, first_width: float, width: float) -> List[List[Word]]:
+    """Greedy line breaking; returns the words of each line."""
+    lines: List[List[Word]] = []
+    current: List[Word] = []
+    current_width = 0.0
+    for word in words:
+        available = first_width if not lines else width
+        word_width = word[1]
+        if word_width > available:
+            # Overfull: break inside the word rather than run off the page
+            if current:
+                lines.append(current)
+                current, current_width = [], 0.0
+            pieces = _split_long_word(word, size, width if lines else first_width)
+            lines.extend([piece] for piece in pieces[:-1])
+            word, word_width = pieces[-1], pieces[-1][1]
+        elif current and current_width + current[-1][2] + word_width > available:
+            lines.append(current)
+            current, current_width = [], 0.0
+        current_width += (current[-1][2] if current else 0.0) + word_width
+        current.append(word)
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _set_paragraph(
+    layout: _Layout,
+    spans: List[Span],
+    x: float,
+    indent: float,
+    label: Optional[Tuple[float, str, str]] = None,
+) -> None:
+    """Set justified body text; `label` is (x, text, font) for a list label on the first line."""
+    width = TEXT_WIDTH - (x - MARGIN)
+    lines = _break_lines(_words(spans, BODY_FONTS, BODY_SIZE), BODY_SIZE, width - indent, width) or [[]]
+    for index, words in enumerate(lines):
+        line_x = x + (indent if index == 0 else 0.0)
+        stretch = 0.0
+        # Justify every line but the last
+        if index < len(lines) - 1 and len(words) > 1:
+            natural = sum(word[1] for word in words) + sum(word[2] for word in words[:-1])
+            candidate = ((width - (line_x - x)) - natural) / (len(words) - 1)
+            if 0 < candidate <= text_width(" ", REGULAR, BODY_SIZE) * MAX_SPACE_STRETCH:
+                stretch = candidate
+        layout.line(line_x, words, BODY_SIZE, BODY_LEADING, stretch)
+        if index == 0 and label is not None:
+            layout.text(label[0], label[1], label[2], BODY_SIZE)
+
+
+def _alpha(number: int) -> str:
+    return chr(ord("a") + number - 1) if 1 <= number <= 26 else str(number)
+
+
+def _roman(number: int) -> str:
+    digits = ((1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+              (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i"))
+    out = ""
+    for value, numeral in digits:
+        while number >= value:
+            out += numeral
+            number -= value
+    return out or str(number)
+
+
+def _enumerate_label(number: int, level: int) -> str:
+    # \labelenumi..iv of the article class
+    if level == 1:
+        return f"{number}."
+    if level == 2:
+        return f"({_alpha(number)})"
+    if level == 3:
+        return f"{_roman(number)}."
+    return f"{_alpha(number).upper()}."
+
+
+def _set_list(layout: _Layout, block: Block, x: float, depth: int, levels: Tuple[int, int]) -> None:
+    """Set a (possibly nested) list; `levels` counts enclosing itemize and enumerate lists."""
+    _, ordered, start, items = block
+    itemize_level, enumerate_level = levels
+    skip, item_sep = LIST_SPACING[depth]
+    if ordered:
+        enumerate_level += 1
+        content_x = x + ENUMERATE_MARGINS[depth - 1]
+    else:
+        itemize_level += 1
+        bullet, bullet_font = BULLETS[itemize_level - 1]
+        bullet_width = text_width(bullet, bullet_font, BODY_SIZE)
+        content_x = x + bullet_width + LABEL_SEP
+
+    layout.space(skip)
+    for index, (spans, children) in enumerate(items):
+        if index:
+            layout.space(item_sep)
+        if ordered:
+            label = _enumerate_label(start + index, enumerate_level)
+            # Labels are right-aligned against the item text
+            label_x = content_x - LABEL_SEP - text_width(label, REGULAR, BODY_SIZE)
+            _set_paragraph(layout, spans, content_x, 0.0, (label_x, label, REGULAR))
+        else:
+            _set_paragraph(layout, spans, content_x, 0.0, (x, bullet, bullet_font))
+        for child in children:
+            _set_list(layout, child, content_x, depth + 1, (itemize_level, enumerate_level))
+    layout.space(skip)
+
+
+def _set_heading(layout: _Layout, level: int, spans: List[Span]) -> None:
+    size, leading, before, after = HEADINGS[level]
+    layout.space(before)
+    # Keep the heading with at least one line of what follows
+    if not layout.fits(leading, after + BODY_LEADING):
+        layout.break_page()
+    for words in _break_lines(_words(spans, HEADING_FONTS, size), size, TEXT_WIDTH, TEXT_WIDTH):
+        layout.line(MARGIN, words, size, leading)
+    layout.space(after)
+
+
+def _layout_blocks(blocks: List[Block]) -> Tuple[List[List[str]], List[List[Any]]]:
+    layout = _Layout()
+    previous = None
+    for block in blocks:
+        kind = block[0]
+        if kind == "heading":
+            _set_heading(layout, block[1], block[2])
+        elif kind == "list":
+            _set_list(layout, block, MARGIN, 1, (0, 0))
+        elif kind == "paragraph":
+            _set_paragraph(layout, block[1], MARGIN, 0.0 if previous == "heading" else PAR_INDENT)
+        elif kind == "pagebreak":
+            layout.break_page()
+        previous = kind
+    return layout.pages, layout.links
+
+
+def _page_number(number: int) -> str:
+    label = str(number)
+    x = MARGIN + (TEXT_WIDTH - text_width(label, REGULAR, BODY_SIZE)) / 2
+    return f"BT /{REGULAR} {_num(BODY_SIZE)} Tf {_num(x)} {_num(FOOT_BASELINE)} Td {_pdf_string(label)} Tj ET"
+
+
+def _link_annotation(rect: Tuple[float, float, float, float], href: str) -> bytes:
+    uri = quote(href, safe=":/?#[]@!$&'()*+,;=%~").replace("(", "\\(").replace(")", "\\)")
+    return (
+        f"<< /Type /Annot /Subtype /Link /Rect [{' '.join(_num(value) for value in rect)}] "
+        f"{_LINK_STYLE} /A << /S /URI /URI ({uri}) >> >>"
+    ).encode("ascii")
+
+
+def _assemble(pages: List[List[str]], links: List[List[Any]]) -> bytes:
+    """Serialize pages of content operators and their links as a PDF 1.4 file."""
+    font_ids = {name: 3 + index for index, name in enumerate(FONTS)}
+    font_resources = " ".join(f"/{name} {obj} 0 R" for name, obj in font_ids.items())
+    # Each page is followed by its content stream and link annotations
+    page_ids = []
+    next_id = 3 + len(FONTS)
+    for page_links in links:
+        page_ids.append(next_id)
+        next_id += 2 + len(page_links)
+
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 %s %s] >>" % (
+            " ".join(f"{page_id} 0 R" for page_id in page_ids).encode(),
+            len(pages), _num(PAGE_WIDTH).encode(), _num(PAGE_HEIGHT).encode(),
+        ),
+    ]
+    for base_font, _ in FONTS.values():
+        objects.append(
+            f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>".encode()
+        )
+    for number, (page_id, ops, page_links) in enumerate(zip(page_ids, pages, links), start=1):
+        annots = ""
+        if page_links:
+            refs = " ".join(f"{page_id + 2 + index} 0 R" for index in range(len(page_links)))
+            annots = f"/Annots [{refs}] "
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /Resources << /Font << {font_resources} >> >> "
+            f"{annots}/Contents {page_id + 1} 0 R >>".encode()
+        )
+        content = zlib.compress("\n".join(ops + [_page_number(number)]).encode("latin-1"), 6)
+        objects.append(
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        objects.extend(_link_annotation(rect, href) for rect, href in page_links)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for obj_id, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_documents_pdf(documents: Sequence[str]) -> bytes:
+    """Render markdown documents into one PDF, each starting on a new page. Callers check `supports()` first."""
+    blocks: List[Block] = []
+    for index, markdown in enumerate(documents):
+        if index:
+            blocks.append(("pagebreak",))
+        blocks.extend(parse_markdown(markdown))
+    return _assemble(*_layout_blocks(blocks))
+
+
+def render_markdown_pdf(markdown: str) -> bytes:
+    """Render markdown to PDF bytes. Callers check `supports()` first."""
+    return render_documents_pdf([markdown])
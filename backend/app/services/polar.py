@@ -1,13 +1,12 @@
 """Polar payment integration service."""
 
 import hmac
-import json
 from hashlib import sha256
 from typing import Optional
 
-import httpx
-
 from app.config import get_settings
+from app.services.http import POLAR, get_http_client
+from app.services.serialization import dumps, loads
 from app.services.supabase import upsert_subscription_status
 
 
@@ -18,7 +17,6 @@ class PolarClient:
         self.settings = get_settings()
         if not self.settings.polar_api_key:
             raise RuntimeError("Polar API key not configured.")
-        self.base_url = "https://api.polar.sh/v1"
         self.headers = {
             "Authorization": f"Bearer {self.settings.polar_api_key}",
             "Content-Type": "application/json",
@@ -60,17 +58,17 @@ class PolarClient:
             },
         }
 
-        async with httpx.AsyncClient(
-            base_url=self.base_url,
+        client = get_http_client(POLAR)
+        resp = await client.post(
+            "/checkouts/",
+            content=dumps(payload),
             headers=self.headers,
-            timeout=15,
-        ) as client:
-            resp = await client.post("/checkouts/", json=payload)
+        )
 
         if resp.status_code >= 300:
             raise RuntimeError(f"Polar checkout failed: {resp.text}")
 
-        data = resp.json()
+        data = loads(resp.content)
         return data.get("url") or ""
 
 
@@ -103,7 +101,7 @@ async def handle_polar_webhook(
         raise RuntimeError("Invalid webhook signature.")
 
     try:
-        event = json.loads(raw_body.decode())
+        event = loads(raw_body)
     except Exception as exc:
         raise RuntimeError(f"Invalid webhook payload: {exc}") from exc
 
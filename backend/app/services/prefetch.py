@@ -0,0 +1,119 @@
+"""
+Speculative prefetch of milestone video recommendations.
+
+As soon as a career path is generated every milestone is known, so the
+`video_recommendations` calls the frontend makes afterwards are started
+right away, concurrently, and parked in a short-lived per-user cache.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.agents import AgentService
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on parked prefetches across all users
+MAX_PREFETCH_ENTRIES = 2000
+
+PrefetchKey = Tuple[str, str, str]
+
+
+def _prefetch_key(user_id: str, target_role: str, milestone: Dict[str, Any]) -> PrefetchKey:
+    title = str(milestone.get("milestoneTitle") or "")
+    return (user_id, " ".join(target_role.lower().split()), " ".join(title.lower().split()))
+
+
+def _cancel_unused(_key: Hashable, task: "asyncio.Task[Any]") -> None:
+    if not task.done():
+        task.cancel()
+
+
+class VideoPrefetcher:
+    """Runs and caches `video_recommendations` for every milestone of a path."""
+
+    def __init__(self, ttl_seconds: int, concurrency: int) -> None:
+        self._tasks = TTLCache(MAX_PREFETCH_ENTRIES, ttl_seconds, on_evict=_cancel_unused)
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def schedule(
+        self,
+        agent: AgentService,
+        user_id: str,
+        target_role: str,
+        career_path: Dict[str, Any],
+    ) -> int:
+        """Start prefetches for all milestones. Returns the number scheduled."""
+        milestones = career_path.get("path") if isinstance(career_path, dict) else None
+        if not isinstance(milestones, list):
+            return 0
+
+        scheduled = 0
+        for milestone in milestones:
+            if not isinstance(milestone, dict) or not milestone.get("milestoneTitle"):
+                continue
+            key = _prefetch_key(user_id, target_role, milestone)
+            if key in self._tasks:
+                continue
+            task = asyncio.create_task(self._fetch(agent, target_role, milestone))
+            task.add_done_callback(_consume_exception)
+            self._tasks.set(key, task)
+            scheduled += 1
+        return scheduled
+
+    async def get(
+        self,
+        user_id: str,
+        target_role: str,
+        milestone: Dict[str, Any],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return prefetched videos, waiting for an in-flight prefetch if needed."""
+        task = self._tasks.get(_prefetch_key(user_id, target_role, milestone))
+        if task is None:
+            return None
+        try:
+            # Shield so a disconnecting client doesn't kill a shared prefetch
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return self._tasks.stats()
+
+    async def _fetch(
+        self,
+        agent: AgentService,
+        target_role: str,
+        milestone: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        async with self._semaphore:
+            return await agent.video_recommendations(target_role, milestone)
+
+
+def _consume_exception(task: "asyncio.Task[Any]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Video prefetch failed: %s", task.exception())
+
+
+_video_prefetcher: Optional[VideoPrefetcher] = None
+
+
+def get_video_prefetcher() -> Optional[VideoPrefetcher]:
+    """Get the shared prefetcher, or None when prefetching is disabled."""
+    global _video_prefetcher
+    settings = get_settings()
+    if not settings.video_prefetch_enabled:
+        return None
+    if _video_prefetcher is None:
+        _video_prefetcher = VideoPrefetcher(
+            ttl_seconds=settings.video_prefetch_ttl_seconds,
+            concurrency=settings.video_prefetch_concurrency,
+        )
+    return _video_prefetcher
@@ -0,0 +1,176 @@
+"""
+Background token replenishment.
+
+Instead of workspace reads checking each user's 30-day period, one instance
+at a time sweeps every due user:
+
+- Leader election: an instance sweeps only while it holds the
+  `token_replenishment` lease in Supabase (see docs/TokenReplenishment.sql).
+  The lease lasts one interval and the leader renews it on every batch and
+  every sweep, so it stays leader until it stops; others take over once it
+  lapses.
+- Due users are replenished in pages of `batch_size` through one bulk RPC,
+  paced to at most `batches_per_second` pages.
+
+Like the metering flusher, this needs CPU outside requests (Cloud Run "CPU
+always allocated"); without it, schedule the RPC with pg_cron instead.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.services.supabase import (
+    invalidate_account_status,
+    release_scheduler_lease,
+    replenish_due_tokens,
+    try_acquire_scheduler_lease,
+)
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "token_replenishment"
+# Spread the first sweep of instances that start together
+STARTUP_JITTER_SECONDS = 5.0
+
+
+class ReplenishmentScheduler:
+    """Periodic, leader-only sweep of due token replenishments."""
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        batch_size: int,
+        batches_per_second: float,
+        leader_ttl_seconds: Optional[int] = None,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batches_per_second = batches_per_second
+        self.leader_ttl_seconds = leader_ttl_seconds or max(int(interval_seconds), 1)
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._is_leader = False
+        self.sweeps = 0
+        self.skipped = 0
+        self.failures = 0
+        self.batches = 0
+        self.replenished = 0
+        self.last_batch_size: Optional[int] = None
+        self.last_batch_seconds: Optional[float] = None
+        self.max_batch_seconds = 0.0
+        self.last_sweep_seconds: Optional[float] = None
+        self.last_sweep_at: Optional[float] = None
+
+    async def _renew(self) -> bool:
+        self._is_leader = await try_acquire_scheduler_lease(LEASE_NAME, self.holder, self.leader_ttl_seconds)
+        return self._is_leader
+
+    async def sweep(self) -> int:
+        """Replenish all due users if this instance is the leader. Returns how many."""
+        if not await self._renew():
+            self.skipped += 1
+            return 0
+
+        started = time.monotonic()
+        min_batch_seconds = 1.0 / self.batches_per_second if self.batches_per_second > 0 else 0.0
+        total = 0
+        after: Optional[str] = None
+        while True:
+            batch_started = time.monotonic()
+            rows = await replenish_due_tokens(self.batch_size, after)
+            elapsed = time.monotonic() - batch_started
+
+            self.batches += 1
+            self.last_batch_size = len(rows)
+            self.last_batch_seconds = elapsed
+            self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+            for row in rows:
+                invalidate_account_status(row["user_id"])
+            total += len(rows)
+            self.replenished += len(rows)
+            if len(rows) < self.batch_size:
+                break
+
+            after = max(row["user_id"] for row in rows)
+            await asyncio.sleep(max(0.0, min_batch_seconds - elapsed))
+            if not await self._renew():
+                logger.warning("Lost the token replenishment lease mid-sweep; stopping after %d users", total)
+                break
+
+        self.sweeps += 1
+        self.last_sweep_seconds = time.monotonic() - started
+        self.last_sweep_at = time.time()
+        if total:
+            logger.info("Replenished tokens for %d users in %.2fs", total, self.last_sweep_seconds)
+        return total
+
+    def start(self) -> None:
+        """Start the periodic sweep if it isn't running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop sweeping and hand the lease to another instance."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._is_leader:
+            self._is_leader = False
+            try:
+                await release_scheduler_lease(LEASE_NAME, self.holder)
+            except Exception as exc:
+                logger.warning("Releasing the token replenishment lease failed: %s", exc)
+
+    async def _run(self) -> None:
+        await asyncio.sleep(random.uniform(0, STARTUP_JITTER_SECONDS))
+        while True:
+            try:
+                await self.sweep()
+            except Exception as exc:
+                self.failures += 1
+                logger.warning("Token replenishment sweep failed, will retry: %s", exc)
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leader": self._is_leader,
+            "sweeps": self.sweeps,
+            "skippedNotLeader": self.skipped,
+            "failures": self.failures,
+            "batches": self.batches,
+            "replenished": self.replenished,
+            "lastBatchSize": self.last_batch_size,
+            "lastBatchSeconds": round(self.last_batch_seconds, 3) if self.last_batch_seconds is not None else None,
+            "maxBatchSeconds": round(self.max_batch_seconds, 3),
+            "lastSweepSeconds": round(self.last_sweep_seconds, 3) if self.last_sweep_seconds is not None else None,
+            "lastSweepAt": self.last_sweep_at,
+        }
+
+
+_scheduler: Optional[ReplenishmentScheduler] = None
+
+
+def get_replenishment_scheduler() -> Optional[ReplenishmentScheduler]:
+    """Get the shared scheduler, or None when background replenishment is disabled."""
+    global _scheduler
+    settings = get_settings()
+    if not settings.token_replenish_scheduler_enabled:
+        return None
+    if _scheduler is None:
+        _scheduler = ReplenishmentScheduler(
+            interval_seconds=settings.token_replenish_interval_seconds,
+            batch_size=settings.token_replenish_batch_size,
+            batches_per_second=settings.token_replenish_batches_per_second,
+        )
+    return _scheduler
@@ -0,0 +1,91 @@
+"""
+Retry backoff and circuit breaking for upstream calls.
+
+A `CircuitBreaker` counts consecutive failed calls to one upstream. Once it
+opens, callers fail fast instead of queueing behind timeouts; after
+`reset_seconds` a single probe call is let through, and its outcome closes
+the circuit or keeps it open for another period.
+"""
+
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if self._clock() - self._opened_at < self.reset_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now. Counts rejections."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = self._clock()
+            # One probe at a time; a probe that never reports back is replaced
+            if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be let through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_seconds - self._clock())
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.opened += 1
+            # A failed probe (or a straggler) restarts the open period
+            self._opened_at = self._clock()
+            self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retryAfter": round(self.retry_after(), 1),
+        }
@@ -0,0 +1,35 @@
+"""Fast JSON (de)serialization with a stdlib fallback."""
+
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSONResponse = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Parse JSON from bytes or str."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Default response class for the app. Routes returning large payloads should
+# return `FastJSONResponse(...)` directly, which also skips FastAPI's
+# `jsonable_encoder` pass over the content.
+FastJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
@@ -1,10 +1,22 @@
 """Supabase service for workspace and subscription management."""
 
-from typing import Any, Dict, Optional
+import asyncio
+import base64
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
 
 import httpx
 
 from app.config import get_settings
+from app.services.cache import SingleFlight, TTLCache
+from app.services.document_store import decompress_body, document_metadata, hydrate_document, split_document
+from app.services.http import SUPABASE, get_http_client
+from app.services.resilience import CircuitBreaker, backoff_delay
+from app.services.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
 
 # Default values
 EMPTY_WORKSPACE = {
@@ -13,9 +25,59 @@ EMPTY_WORKSPACE = {
     "careerChatHistory": [],
     "tokens": 50,
 }
+# Workspace fields stored on the workspaces row, by column
+ROW_COLUMNS = {
+    "profile": "profile",
+    "tokens": "tokens",
+    "tokensReplenishedAt": "tokens_replenished_at",
+    "rolledOverTokens": "rolled_over_tokens",
+}
+WORKSPACE_FIELDS = frozenset(ROW_COLUMNS) | {"documentHistory", "careerChatHistory"}
+TOKEN_FIELDS = frozenset({"tokens", "tokensReplenishedAt", "rolledOverTokens"})
 FREE_PLAN_TOKENS = 50
 PAID_PLAN_TOKENS = 200
 MAX_ROLLOVER_TOKENS = 200  # Max tokens that can roll over (1 month worth)
+REPLENISH_INTERVAL_SECONDS = 30 * 24 * 3600
+# Re-ask the RPC this often when the replenishment time is unknown
+REPLENISH_RECHECK_SECONDS = 3600
+REPLENISH_CACHE_MAX_ENTRIES = 50000
+
+ACCOUNT_STATUS_CACHE_MAX_ENTRIES = 10000
+
+# Upstream failures worth retrying (and counted against the circuit)
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+# Failures before the request reached Supabase: safe to retry any call
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# user_id -> next replenishment due (epoch seconds); entries expire when due
+_replenish_due = TTLCache(REPLENISH_CACHE_MAX_ENTRIES, REPLENISH_INTERVAL_SECONDS)
+
+# user_id -> (workspace token row, subscription row), shared by the status reads
+_account_status: Optional[TTLCache] = None
+_account_status_flight = SingleFlight()
+
+_circuit: Optional[CircuitBreaker] = None
+_request_stats = {"calls": 0, "retries": 0, "failures": 0}
+
+
+class SupabaseError(Exception):
+    """Supabase rejected a request."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SupabaseNotFound(SupabaseError):
+    """The requested row (or endpoint) doesn't exist."""
+
+
+class SupabaseUnavailable(SupabaseError):
+    """Supabase is unreachable, timing out or failing, or the circuit is open."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 def _headers() -> Dict[str, str]:
@@ -30,42 +92,399 @@ def _headers() -> Dict[str, str]:
     }
 
 
-async def fetch_workspace(user_id: str, check_replenish: bool = True) -> Dict[str, Any]:
-    """Fetch user's workspace data. Optionally checks for token replenishment."""
+def _get_circuit() -> CircuitBreaker:
+    global _circuit
+    if _circuit is None:
+        settings = get_settings()
+        _circuit = CircuitBreaker(
+            settings.supabase_circuit_failure_threshold,
+            settings.supabase_circuit_reset_seconds,
+        )
+    return _circuit
+
+
+def supabase_request_stats() -> Dict[str, Any]:
+    return {**_request_stats, "circuit": _get_circuit().stats()}
+
+
+async def _request(
+    method: str,
+    path: str,
+    *,
+    idempotent: bool = True,
+    deadline: Optional[float] = None,
+    attempt_timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """
+    Send a Supabase REST request with retries, a deadline and circuit breaking.
+
+    Timeouts, connection errors and RETRYABLE_STATUS responses are retried
+    with jittered backoff while `deadline` seconds (default
+    `supabase_deadline_seconds`) allow, each attempt bounded by
+    `attempt_timeout` (default `supabase_attempt_timeout_seconds`). Calls
+    that aren't `idempotent` are only retried when the request never left.
+    When retries run out, or the circuit is open, raises SupabaseUnavailable.
+    Any other response is returned for the caller to check (see
+    _raise_for_status).
+    """
     settings = get_settings()
-    
-    # First, try to replenish tokens if 30 days have passed
-    if check_replenish:
-        await replenish_tokens_if_due(user_id)
-
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=10,
-    ) as client:
-        resp = await client.get(
-            "/rest/v1/workspaces",
-            params={
-                "user_id": f"eq.{user_id}",
-                "select": "profile,document_history,career_chat_history,tokens,tokens_replenished_at,rolled_over_tokens",
-                "limit": 1,
-            },
+    circuit = _get_circuit()
+    if not circuit.allow():
+        raise SupabaseUnavailable("Supabase is unavailable (circuit open).", circuit.retry_after())
+
+    _request_stats["calls"] += 1
+    client = get_http_client(SUPABASE)
+    expires = time.monotonic() + (settings.supabase_deadline_seconds if deadline is None else deadline)
+    attempt = 0
+    while True:
+        budget = min(
+            attempt_timeout or settings.supabase_attempt_timeout_seconds,
+            max(expires - time.monotonic(), 0.1),
+        )
+        # A per-request timeout replaces the client's, so keep its connect limit
+        timeout = httpx.Timeout(budget, connect=min(settings.http_connect_timeout_seconds, budget))
+        try:
+            resp = await client.request(method, path, headers=_headers(), timeout=timeout, **kwargs)
+        except httpx.TransportError as exc:
+            failure = f"{type(exc).__name__}: {exc}"
+            retry_safe = idempotent or isinstance(exc, NOT_SENT_ERRORS)
+        else:
+            if resp.status_code not in RETRYABLE_STATUS:
+                circuit.record_success()
+                return resp
+            failure = f"HTTP {resp.status_code}: {resp.text[:200]}"
+            retry_safe = idempotent
+
+        attempt += 1
+        delay = backoff_delay(
+            attempt - 1, settings.supabase_retry_backoff_seconds, settings.supabase_retry_backoff_max_seconds
         )
+        if not retry_safe or attempt >= settings.supabase_retry_attempts or time.monotonic() + delay >= expires:
+            _request_stats["failures"] += 1
+            circuit.record_failure()
+            logger.warning("Supabase %s %s failed after %d attempt(s): %s", method, path, attempt, failure)
+            raise SupabaseUnavailable(f"Supabase is unavailable ({failure}).", circuit.retry_after() or None)
+        _request_stats["retries"] += 1
+        await asyncio.sleep(delay)
+
+
+def _raise_for_status(resp: httpx.Response, message: str) -> None:
+    """Raise SupabaseNotFound/SupabaseError for a 4xx response."""
+    if resp.status_code == 404:
+        raise SupabaseNotFound(f"{message}: {resp.text}", 404)
+    if resp.status_code >= 400:
+        raise SupabaseError(f"{message}: {resp.text}", resp.status_code)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def replenish_is_due(user_id: str) -> bool:
+    """
+    True when the next workspace read should run the replenish RPC: only
+    without the background scheduler, which otherwise owns replenishment.
+    """
+    return not get_settings().token_replenish_scheduler_enabled and user_id not in _replenish_due
+
+
+def _remember_replenished_at(user_id: str, replenished_at: Optional[float]) -> None:
+    """Cache the next due time so workspace reads skip the replenish RPC until then."""
+    now = time.time()
+    if replenished_at is None:
+        ttl = REPLENISH_RECHECK_SECONDS
+    else:
+        ttl = min(replenished_at + REPLENISH_INTERVAL_SECONDS - now, REPLENISH_INTERVAL_SECONDS)
+    if ttl > 0:
+        _replenish_due.set(user_id, now + ttl, ttl)
+    else:
+        _replenish_due.pop(user_id)
+
+
+async def _first_row(path: str, user_id: str, select: str) -> Optional[Dict[str, Any]]:
+    """The user's row, or None if there is none. Errors raise; they're never a missing row."""
+    resp = await _request("GET", path, params={"user_id": f"eq.{user_id}", "select": select, "limit": 1})
+    _raise_for_status(resp, f"Failed to read {path.rsplit('/', 1)[-1]}")
+    data = loads(resp.content)
+    return data[0] if isinstance(data, list) and data else None
 
-    if resp.status_code == 200:
-        data = resp.json()
-        if isinstance(data, list) and data:
-            row = data[0]
-            return {
-                "profile": row.get("profile"),
-                "documentHistory": row.get("document_history") or [],
-                "careerChatHistory": row.get("career_chat_history") or [],
-                "tokens": row.get("tokens", FREE_PLAN_TOKENS),
-                "tokensReplenishedAt": row.get("tokens_replenished_at"),
-                "rolledOverTokens": row.get("rolled_over_tokens", 0),
-            }
 
-    return EMPTY_WORKSPACE.copy()
+async def _select_workspace(user_id: str, columns: Iterable[str]) -> Optional[Dict[str, Any]]:
+    return await _first_row("/rest/v1/workspaces", user_id, ",".join(columns))
+
+
+async def fetch_workspace_version(user_id: str) -> Optional[str]:
+    """
+    The workspace's `updated_at`, bumped by any change to the row or its
+    history tables (see docs/WorkspaceHistory.sql). None if there's no row.
+    """
+    row = await _first_row("/rest/v1/workspaces", user_id, "updated_at")
+    return row.get("updated_at") if row else None
+
+
+def _chat_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row.get("id"),
+        "title": row.get("title") or "",
+        "timestamp": row.get("updated_at"),
+        "messages": row.get("workspace_chat_messages") or [],
+    }
+
+
+def encode_cursor(sort_value: Any, seq: int) -> str:
+    raw = dumps([sort_value, seq])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        sort_value, seq = loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if not isinstance(sort_value, str) or not isinstance(seq, int):
+        raise ValueError("Invalid cursor.")
+    # The value goes into a PostgREST filter, so only a timestamp may come back out
+    try:
+        sort_value = datetime.fromisoformat(sort_value).isoformat()
+    except ValueError as exc:
+        raise ValueError("Invalid cursor.") from exc
+    return sort_value, seq
+
+
+async def _select_page(
+    path: str,
+    user_id: str,
+    select: str,
+    sort_column: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    extra_params: Optional[Dict[str, str]] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    Keyset pagination, newest first, over (sort_column, seq).
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    params = {
+        "user_id": f"eq.{user_id}",
+        "select": f"{select},seq,{sort_column}",
+        "order": f"{sort_column}.desc,seq.desc",
+        **(extra_params or {}),
+    }
+    if limit is not None:
+        params["limit"] = str(limit + 1)
+    if cursor:
+        sort_value, seq = decode_cursor(cursor)
+        params["or"] = (
+            f'({sort_column}.lt."{sort_value}",'
+            f'and({sort_column}.eq."{sort_value}",seq.lt.{seq}))'
+        )
+
+    resp = await _request("GET", path, params=params)
+    _raise_for_status(resp, f"Failed to read {path.rsplit('/', 1)[-1]}")
+
+    rows = loads(resp.content)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][sort_column], rows[-1]["seq"])
+
+
+async def fetch_documents_page(
+    user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """Document history, newest first."""
+    rows, next_cursor = await _select_page(
+        "/rest/v1/workspace_documents", user_id, "data", "generated_at", limit, cursor
+    )
+    # Entries saved before bodies moved out still carry them inline; list metadata only
+    return [document_metadata(row["data"]) for row in rows], next_cursor
+
+
+async def fetch_document_entry(user_id: str, document_id: str) -> Dict[str, Any]:
+    """One history entry as stored (metadata and body refs). Raises SupabaseNotFound."""
+    resp = await _request(
+        "GET",
+        "/rest/v1/workspace_documents",
+        params={"user_id": f"eq.{user_id}", "id": f"eq.{document_id}", "select": "data", "limit": "1"},
+    )
+    _raise_for_status(resp, "Failed to fetch document")
+    rows = loads(resp.content)
+    if not rows:
+        raise SupabaseNotFound("Document not found.", 404)
+    return rows[0]["data"]
+
+
+async def _select_document_bodies(user_id: str, hashes: Iterable[str]) -> Dict[str, bytes]:
+    """Uncompressed bodies by hash; missing hashes are left out."""
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+    resp = await _request(
+        "GET",
+        "/rest/v1/document_bodies",
+        params={"user_id": f"eq.{user_id}", "hash": _in_filter(hashes), "select": "hash,encoding,body"},
+    )
+    _raise_for_status(resp, "Failed to fetch document bodies")
+    # bytea columns come back hex-encoded ("\\x...")
+    return {
+        row["hash"]: decompress_body(row["encoding"], bytes.fromhex(row["body"][2:]))
+        for row in loads(resp.content)
+    }
+
+
+async def load_document_bodies(user_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The full document for a stored entry, bodies included."""
+    refs = entry.get("bodies") or {}
+    wanted = {digest for field, digest in refs.items() if field not in entry}
+    return hydrate_document(entry, await _select_document_bodies(user_id, wanted))
+
+
+async def _store_document_bodies(user_id: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Upload the bodies of full history entries (identical ones are stored once)
+    and return the metadata entries that reference them.
+    """
+    entries = []
+    bodies: Dict[str, Tuple[str, bytes, int]] = {}
+    for document in documents:
+        entry, encoded = split_document(document)
+        entries.append(entry)
+        bodies.update(encoded)
+    if bodies:
+        await _rpc("put_document_bodies", {
+            "p_user_id": user_id,
+            "p_bodies": [
+                {"hash": digest, "encoding": encoding, "size": size, "body": base64.b64encode(data).decode()}
+                for digest, (encoding, data, size) in bodies.items()
+            ],
+        })
+    return entries
+
+
+async def fetch_chats_page(
+    user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """Career chats with their messages, most recently updated first."""
+    rows, next_cursor = await _select_page(
+        "/rest/v1/workspace_chats",
+        user_id,
+        "id,title,workspace_chat_messages(id,role,content,timestamp)",
+        "updated_at",
+        limit,
+        cursor,
+        {"workspace_chat_messages.order": "seq.asc"},
+    )
+    return [_chat_from_row(row) for row in rows], next_cursor
+
+
+async def _select_documents(user_id: str) -> list:
+    return (await fetch_documents_page(user_id))[0]
+
+
+async def _select_chats(user_id: str) -> list:
+    return (await fetch_chats_page(user_id))[0]
+
+
+async def _no_row() -> None:
+    return None
+
+
+async def _try_replenish(user_id: str) -> Optional[Dict[str, Any]]:
+    """Replenish for a workspace read; on failure the read goes ahead and the next one retries."""
+    try:
+        return await replenish_tokens_if_due(user_id)
+    except SupabaseError as exc:
+        logger.warning("Token replenishment for %s failed: %s", user_id, exc)
+        return None
+
+
+async def fetch_workspace(user_id: str, fields: Optional[Collection[str]] = None) -> Dict[str, Any]:
+    """
+    Fetch user's workspace data.
+
+    `fields` limits the result (and the reads behind it) to a subset of
+    WORKSPACE_FIELDS. The workspace row and the document/chat history tables
+    are read concurrently. With the background scheduler
+    (services/replenishment.py) reads never replenish tokens. Without it the
+    per-user replenish RPC runs alongside the reads when token fields are
+    requested and the user's cached due time has passed (or is unknown).
+
+    A missing row is a new user (EMPTY_WORKSPACE); a failed read raises
+    SupabaseError rather than passing for an empty workspace.
+    """
+    wanted = set(WORKSPACE_FIELDS if fields is None else fields)
+    check_replenish = bool(wanted & TOKEN_FIELDS) and replenish_is_due(user_id)
+    columns = [column for field, column in ROW_COLUMNS.items() if field in wanted]
+    if check_replenish and "tokens_replenished_at" not in columns:
+        columns.append("tokens_replenished_at")
+
+    reads = [
+        _select_workspace(user_id, columns) if columns else _no_row(),
+        _select_documents(user_id) if "documentHistory" in wanted else _no_row(),
+        _select_chats(user_id) if "careerChatHistory" in wanted else _no_row(),
+    ]
+    replenish = None
+    if check_replenish:
+        row, documents, chats, replenish = await asyncio.gather(*reads, _try_replenish(user_id))
+    else:
+        row, documents, chats = await asyncio.gather(*reads)
+
+    if row is None and not documents and not chats:
+        workspace = EMPTY_WORKSPACE.copy()
+    else:
+        row = row or {}
+        workspace = {
+            "profile": row.get("profile"),
+            "documentHistory": documents or [],
+            "careerChatHistory": chats or [],
+            "tokens": row.get("tokens", FREE_PLAN_TOKENS),
+            "tokensReplenishedAt": row.get("tokens_replenished_at"),
+            "rolledOverTokens": row.get("rolled_over_tokens", 0),
+        }
+
+        if replenish is not None:
+            if replenish["wasReplenished"]:
+                # The read may have raced the RPC; its balance is authoritative
+                workspace["tokens"] = replenish["newTokens"]
+                workspace["tokensReplenishedAt"] = datetime.now(timezone.utc).isoformat()
+            _remember_replenished_at(user_id, _parse_timestamp(workspace["tokensReplenishedAt"]))
+
+    return {field: value for field, value in workspace.items() if field in wanted}
+
+
+async def _rpc(
+    name: str,
+    params: Dict[str, Any],
+    idempotent: bool = True,
+    deadline: Optional[float] = None,
+    attempt_timeout: Optional[float] = None,
+) -> Any:
+    resp = await _request(
+        "POST",
+        f"/rest/v1/rpc/{name}",
+        content=dumps(params),
+        idempotent=idempotent,
+        deadline=deadline,
+        attempt_timeout=attempt_timeout,
+    )
+    _raise_for_status(resp, f"Supabase RPC {name} failed")
+    return loads(resp.content) if resp.content else None
+
+
+def _first_result(data: Any) -> Optional[Dict[str, Any]]:
+    """First row of a set-returning RPC's result."""
+    return data[0] if isinstance(data, list) and data else None
 
 
 async def persist_workspace(
@@ -75,35 +494,135 @@ async def persist_workspace(
     career_chat_history: Optional[list],
     tokens: Optional[int],
 ) -> None:
-    """Upsert user's workspace data."""
-    settings = get_settings()
-    
+    """
+    Save a full workspace snapshot (the legacy whole-workspace save).
+
+    Histories are reconciled against the row-per-item tables server-side:
+    unchanged items are left alone, new ones inserted, missing ones deleted.
+    """
+    writes = []
+
     # Build payload only with provided values
     payload: Dict[str, Any] = {"user_id": user_id}
-    
     if profile is not None:
         payload["profile"] = profile
+    if tokens is not None:
+        payload["tokens"] = tokens
+    if len(payload) > 1:
+        writes.append(_upsert_workspace_row(payload))
+
     if document_history is not None:
-        payload["document_history"] = document_history
+        writes.append(_replace_documents(user_id, document_history))
     if career_chat_history is not None:
-        payload["career_chat_history"] = career_chat_history
+        writes.append(_rpc(
+            "replace_workspace_chats",
+            {"p_user_id": user_id, "p_chats": career_chat_history},
+        ))
+
+    await asyncio.gather(*writes)
     if tokens is not None:
-        payload["tokens"] = tokens
+        invalidate_account_status(user_id)
+
+
+async def _replace_documents(user_id: str, documents: list) -> None:
+    # Bodies first, so a stored entry never points at a missing body
+    entries = await _store_document_bodies(user_id, documents)
+    await _rpc("replace_workspace_documents", {"p_user_id": user_id, "p_documents": entries})
+
+
+async def _upsert_workspace_row(payload: Dict[str, Any]) -> None:
+    resp = await _request(
+        "POST",
+        "/rest/v1/workspaces",
+        params={"on_conflict": "user_id"},
+        content=dumps(payload),
+        deadline=15,
+    )
+    _raise_for_status(resp, "Failed to save workspace")
+
+
+def _in_filter(values: Iterable[str]) -> str:
+    """PostgREST `in.(...)` filter with quoted values."""
+    quoted = ",".join('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values)
+    return f"in.({quoted})"
+
+
+async def add_documents(user_id: str, documents: List[Dict[str, Any]]) -> None:
+    """Insert (or replace) document history entries, after uploading their bodies."""
+    if not documents:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {
+            "user_id": user_id,
+            "id": entry["id"],
+            "generated_at": entry.get("generatedAt") or now,
+            "data": entry,
+        }
+        for entry in await _store_document_bodies(user_id, documents)
+    ]
+    resp = await _request(
+        "POST",
+        "/rest/v1/workspace_documents",
+        params={"on_conflict": "user_id,id"},
+        content=dumps(rows),
+        deadline=15,
+    )
+    _raise_for_status(resp, "Failed to save documents")
+
+
+async def remove_documents(user_id: str, document_ids: Iterable[str]) -> None:
+    document_ids = list(document_ids)
+    if not document_ids:
+        return
+    resp = await _request(
+        "DELETE",
+        "/rest/v1/workspace_documents",
+        params={"user_id": f"eq.{user_id}", "id": _in_filter(document_ids)},
+    )
+    _raise_for_status(resp, "Failed to delete documents")
+
+
+async def append_chat_messages(
+    user_id: str,
+    chat_id: str,
+    title: Optional[str],
+    timestamp: Optional[str],
+    messages: list,
+) -> None:
+    """
+    Create the chat if needed and append messages to it.
+
+    Messages are keyed by id, so re-sending a turn is harmless.
+    """
+    await _rpc(
+        "append_chat_messages",
+        {
+            "p_user_id": user_id,
+            "p_chat_id": chat_id,
+            "p_title": title,
+            "p_updated_at": timestamp,
+            "p_messages": messages,
+        },
+    )
+
+
+async def remove_chats(user_id: str, chat_ids: Iterable[str]) -> None:
+    """Delete chats; their messages go with them."""
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return
+    resp = await _request(
+        "DELETE",
+        "/rest/v1/workspace_chats",
+        params={"user_id": f"eq.{user_id}", "id": _in_filter(chat_ids)},
+    )
+    _raise_for_status(resp, "Failed to delete chats")
 
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=15,
-    ) as client:
-        resp = await client.post(
-            "/rest/v1/workspaces",
-            params={"on_conflict": "user_id"},
-            json=payload,
-        )
-    
-    if resp.status_code >= 400:
-        raise Exception(f"Failed to save workspace: {resp.text}")
-    resp.raise_for_status()
+
+async def patch_profile(user_id: str, patch: Dict[str, Any]) -> None:
+    """Merge top-level profile fields into the stored profile."""
+    await _rpc("patch_workspace_profile", {"p_user_id": user_id, "p_patch": patch})
 
 
 async def upsert_subscription_status(
@@ -115,8 +634,6 @@ async def upsert_subscription_status(
     polar_subscription_id: Optional[str],
 ) -> None:
     """Upsert user's subscription status."""
-    settings = get_settings()
-    
     payload: Dict[str, Any] = {
         "user_id": user_id,
         "status": status,
@@ -131,57 +648,32 @@ async def upsert_subscription_status(
     if polar_subscription_id is not None:
         payload["polar_subscription_id"] = polar_subscription_id
 
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=15,
-    ) as client:
-        resp = await client.post(
-            "/rest/v1/subscriptions",
-            params={"on_conflict": "user_id"},
-            json=payload,
-        )
-    
-    if resp.status_code >= 400:
-        raise Exception(f"Failed to save subscription: {resp.text}")
-    resp.raise_for_status()
+    resp = await _request(
+        "POST",
+        "/rest/v1/subscriptions",
+        params={"on_conflict": "user_id"},
+        content=dumps(payload),
+        deadline=15,
+    )
+    _raise_for_status(resp, "Failed to save subscription")
+    invalidate_account_status(user_id)
 
 
 async def fetch_subscription_status(user_id: str) -> Dict[str, Any]:
     """Fetch user's subscription status."""
-    settings = get_settings()
-
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=10,
-    ) as client:
-        resp = await client.get(
-            "/rest/v1/subscriptions",
-            params={
-                "user_id": f"eq.{user_id}",
-                "select": "status,plan,current_period_end",
-                "limit": 1,
-            },
-        )
-
-    if resp.status_code != 200:
+    _, row = await _fetch_account_status(user_id)
+    if row is None:
         return {"status": "free", "plan": "free", "tokens": FREE_PLAN_TOKENS}
 
-    data = resp.json()
-    if isinstance(data, list) and data:
-        row = data[0]
-        status = row.get("status") or "free"
-        plan = row.get("plan") or "free"
-        tokens = PAID_PLAN_TOKENS if status == "active" else FREE_PLAN_TOKENS
-        return {
-            "status": status,
-            "plan": plan,
-            "tokens": tokens,
-            "current_period_end": row.get("current_period_end"),
-        }
-
-    return {"status": "free", "plan": "free", "tokens": FREE_PLAN_TOKENS}
+    status = row.get("status") or "free"
+    plan = row.get("plan") or "free"
+    tokens = PAID_PLAN_TOKENS if status == "active" else FREE_PLAN_TOKENS
+    return {
+        "status": status,
+        "plan": plan,
+        "tokens": tokens,
+        "current_period_end": row.get("current_period_end"),
+    }
 
 
 async def ensure_active_subscription(user_id: str) -> Dict[str, Any]:
@@ -196,96 +688,123 @@ async def replenish_tokens_if_due(user_id: str) -> Dict[str, Any]:
     """
     Check if 30 days have passed since last replenishment and replenish tokens.
     Allows roll-over of up to 1 month worth of unused tokens.
-    
+
     Returns dict with new_tokens and was_replenished.
     """
-    settings = get_settings()
-    
-    # Call the database function to handle replenishment
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=10,
-    ) as client:
-        resp = await client.post(
-            "/rest/v1/rpc/replenish_user_tokens",
-            json={"p_user_id": user_id},
-        )
-    
-    if resp.status_code == 200:
-        data = resp.json()
-        if isinstance(data, list) and data:
-            row = data[0]
-            return {
-                "newTokens": row.get("new_tokens", FREE_PLAN_TOKENS),
-                "wasReplenished": row.get("was_replenished", False),
-            }
-    
-    return {"newTokens": FREE_PLAN_TOKENS, "wasReplenished": False}
+    # The database function checks the due date, so retrying is harmless
+    row = _first_result(await _rpc("replenish_user_tokens", {"p_user_id": user_id}))
+    if row is None:
+        return {"newTokens": FREE_PLAN_TOKENS, "wasReplenished": False}
+    if row.get("was_replenished"):
+        invalidate_account_status(user_id)
+    return {
+        "newTokens": row.get("new_tokens", FREE_PLAN_TOKENS),
+        "wasReplenished": row.get("was_replenished", False),
+    }
+
+
+async def replenish_due_tokens(limit: int, after: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Replenish up to `limit` users whose 30-day period has passed, in user_id
+    order after `after` (see docs/TokenReplenishment.sql). Unused tokens roll
+    over up to one month's worth.
+
+    Returns the replenished rows ({user_id, new_tokens, rolled_over_tokens}).
+    Only due rows are touched, so retrying a lost response is harmless.
+    """
+    # A bulk update can legitimately take longer than a single-row call
+    rows = await _rpc(
+        "replenish_due_tokens", {"p_limit": limit, "p_after": after}, deadline=60, attempt_timeout=30
+    )
+    return rows or []
+
+
+async def try_acquire_scheduler_lease(name: str, holder: str, ttl_seconds: int) -> bool:
+    """Take (or extend) the named leader lease if it's free, expired or already ours."""
+    return bool(await _rpc(
+        "try_acquire_scheduler_lease",
+        {"p_name": name, "p_holder": holder, "p_ttl_seconds": ttl_seconds},
+    ))
+
+
+async def release_scheduler_lease(name: str, holder: str) -> None:
+    await _rpc("release_scheduler_lease", {"p_name": name, "p_holder": holder})
 
 
 async def deduct_tokens(user_id: str, amount: int) -> Dict[str, Any]:
     """
     Deduct tokens from user's balance.
     
-    Returns dict with success, remaining_tokens, and error_message.
+    Returns dict with success, remaining_tokens, and error_message. Not
+    retried once sent: a lost response may still have deducted.
     """
-    settings = get_settings()
-    
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=10,
-    ) as client:
-        resp = await client.post(
-            "/rest/v1/rpc/deduct_tokens",
-            json={"p_user_id": user_id, "p_amount": amount},
+    row = _first_result(await _rpc(
+        "deduct_tokens", {"p_user_id": user_id, "p_amount": amount}, idempotent=False
+    ))
+    if row is None:
+        return {"success": False, "remainingTokens": 0, "errorMessage": "Failed to deduct tokens"}
+    if row.get("success"):
+        invalidate_account_status(user_id)
+    return {
+        "success": row.get("success", False),
+        "remainingTokens": row.get("remaining_tokens", 0),
+        "errorMessage": row.get("error_message"),
+    }
+
+
+def _account_status_cache() -> Optional[TTLCache]:
+    global _account_status
+    ttl = get_settings().account_status_cache_ttl_seconds
+    if ttl <= 0:
+        return None
+    if _account_status is None:
+        _account_status = TTLCache(ACCOUNT_STATUS_CACHE_MAX_ENTRIES, ttl)
+    return _account_status
+
+
+def invalidate_account_status(user_id: str) -> None:
+    """Drop cached token/subscription status after a balance or plan change."""
+    if _account_status is not None:
+        _account_status.pop(user_id)
+
+
+def account_status_cache_stats() -> Optional[Dict[str, Any]]:
+    cache = _account_status_cache()
+    return cache.stats() if cache else None
+
+
+async def _fetch_account_status(user_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Token and subscription rows for a user, read concurrently.
+
+    Cached briefly per user so `/status` and `/tokens` on the same page load
+    share one pair of reads; concurrent misses share a single fetch.
+    """
+    cache = _account_status_cache()
+    if cache is not None:
+        cached = cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    async def fetch() -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        rows = await asyncio.gather(
+            _first_row("/rest/v1/workspaces", user_id, "tokens,tokens_replenished_at,rolled_over_tokens"),
+            _first_row("/rest/v1/subscriptions", user_id, "status,plan,current_period_end"),
         )
-    
-    if resp.status_code == 200:
-        data = resp.json()
-        if isinstance(data, list) and data:
-            row = data[0]
-            return {
-                "success": row.get("success", False),
-                "remainingTokens": row.get("remaining_tokens", 0),
-                "errorMessage": row.get("error_message"),
-            }
-    
-    return {"success": False, "remainingTokens": 0, "errorMessage": "Failed to deduct tokens"}
+        result = (rows[0], rows[1])
+        if cache is not None:
+            cache.set(user_id, result)
+        return result
+
+    return await _account_status_flight.do(user_id, fetch)
 
 
 async def get_token_status(user_id: str) -> Dict[str, Any]:
     """
     Get detailed token status for a user including subscription info.
     """
-    settings = get_settings()
-    
-    async with httpx.AsyncClient(
-        base_url=str(settings.supabase_url),
-        headers=_headers(),
-        timeout=10,
-    ) as client:
-        # Get workspace data
-        workspace_resp = await client.get(
-            "/rest/v1/workspaces",
-            params={
-                "user_id": f"eq.{user_id}",
-                "select": "tokens,tokens_replenished_at,rolled_over_tokens",
-                "limit": 1,
-            },
-        )
-        
-        # Get subscription data
-        sub_resp = await client.get(
-            "/rest/v1/subscriptions",
-            params={
-                "user_id": f"eq.{user_id}",
-                "select": "status,plan,current_period_end",
-                "limit": 1,
-            },
-        )
-    
+    workspace_row, sub_row = await _fetch_account_status(user_id)
+
     result = {
         "tokens": FREE_PLAN_TOKENS,
         "tokensReplenishedAt": None,
@@ -295,24 +814,55 @@ async def get_token_status(user_id: str) -> Dict[str, Any]:
         "baseTokens": FREE_PLAN_TOKENS,
         "maxRollover": FREE_PLAN_TOKENS,
     }
-    
-    if workspace_resp.status_code == 200:
-        data = workspace_resp.json()
-        if isinstance(data, list) and data:
-            row = data[0]
-            result["tokens"] = row.get("tokens", FREE_PLAN_TOKENS)
-            result["tokensReplenishedAt"] = row.get("tokens_replenished_at")
-            result["rolledOverTokens"] = row.get("rolled_over_tokens", 0)
-    
-    if sub_resp.status_code == 200:
-        data = sub_resp.json()
-        if isinstance(data, list) and data:
-            row = data[0]
-            status = row.get("status", "free")
-            result["subscriptionStatus"] = status
-            result["plan"] = row.get("plan", "free")
-            if status == "active":
-                result["baseTokens"] = PAID_PLAN_TOKENS
-                result["maxRollover"] = MAX_ROLLOVER_TOKENS
-    
+
+    if workspace_row is not None:
+        result["tokens"] = workspace_row.get("tokens", FREE_PLAN_TOKENS)
+        result["tokensReplenishedAt"] = workspace_row.get("tokens_replenished_at")
+        result["rolledOverTokens"] = workspace_row.get("rolled_over_tokens", 0)
+
+    if sub_row is not None:
+        status = sub_row.get("status", "free")
+        result["subscriptionStatus"] = status
+        result["plan"] = sub_row.get("plan", "free")
+        if status == "active":
+            result["baseTokens"] = PAID_PLAN_TOKENS
+            result["maxRollover"] = MAX_ROLLOVER_TOKENS
+
     return result
+
+
+async def acquire_token_lease(user_id: str, amount: int, ttl_seconds: int) -> Dict[str, Any]:
+    """
+    Move up to `amount` tokens from the user's balance into a lease.
+
+    Returns dict with leaseId, granted and remainingTokens. `granted` may be
+    lower than requested (or 0) when the balance is insufficient. Not
+    retried once sent: a lost response may still have leased (the lease
+    then expires back to the balance).
+    """
+    row = _first_result(await _rpc(
+        "acquire_token_lease",
+        {"p_user_id": user_id, "p_amount": amount, "p_ttl_seconds": ttl_seconds},
+        idempotent=False,
+    ))
+    if row is None:
+        raise SupabaseError("Failed to acquire token lease: empty result.")
+    if row.get("granted"):
+        invalidate_account_status(user_id)
+    return {
+        "leaseId": row.get("lease_id"),
+        "granted": row.get("granted", 0),
+        "remainingTokens": row.get("remaining_tokens", 0),
+        "expiresAt": row.get("expires_at"),
+    }
+
+
+async def report_token_usage(usages: list) -> None:
+    """
+    Report cumulative consumption for a batch of leases.
+
+    Each item: {"lease_id": str, "consumed": int, "release": bool}. `consumed`
+    is the lease's absolute total, so retrying a batch is idempotent.
+    Released leases refund their unused tokens to the workspace balance.
+    """
+    await _rpc("report_token_usage", {"p_usages": usages}, deadline=15)
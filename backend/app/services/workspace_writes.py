@@ -0,0 +1,434 @@
+"""
+Write-behind buffering of workspace saves.
+
+Saves are acknowledged immediately with a version number and queued per
+user. Everything a user saves within `window_seconds` (or until
+`max_pending` operations pile up) is coalesced into one batch of upstream
+writes: repeated profile saves collapse into one, a document added and
+then removed is never uploaded, and turns in the same chat become one
+append.
+
+GETs served by this instance overlay queued and in-flight operations on
+what Supabase returned, so a client always reads its own writes. A batch
+that keeps failing is held rather than dropped: the queue stops retrying on
+its own until the user's next save or read, and `failure()` reports it so
+the next workspace read can tell the client. Queues are flushed on
+shutdown; an instance that dies (or is scaled down) loses at most one
+window of saves, which the frontend still holds in local storage. Because
+saves are acknowledged before they are durable, write-behind is off by
+default.
+"""
+
+import asyncio
+import logging
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.document_store import document_metadata
+from app.services.supabase import (
+    add_documents,
+    append_chat_messages,
+    fetch_chats_page,
+    fetch_document_entry,
+    fetch_documents_page,
+    fetch_workspace,
+    patch_profile,
+    persist_workspace,
+    remove_chats,
+    remove_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+# Operation kinds accepted by write_workspace()
+SNAPSHOT = "snapshot"  # {"profile", "documentHistory", "careerChatHistory", "tokens"}; None = unchanged
+PROFILE_PATCH = "profile_patch"  # top-level profile fields
+DOCUMENT_ADD = "document_add"  # document entry
+DOCUMENT_REMOVE = "document_remove"  # document id
+CHAT_APPEND = "chat_append"  # {"chatId", "title", "timestamp", "messages"}
+CHAT_REMOVE = "chat_remove"  # chat id
+
+# Stop retrying a batch on a timer after this many consecutive failed flushes
+MAX_FLUSH_ATTEMPTS = 5
+
+Op = Tuple[str, Any]
+
+
+# ==================================================================================
+# Applying operations
+# ==================================================================================
+
+def _upsert_document(documents: list, document: Dict[str, Any]) -> list:
+    """Newest first, like the history tables return them."""
+    return [document] + [doc for doc in documents if doc.get("id") != document["id"]]
+
+
+def _append_chat(chats: list, update: Dict[str, Any]) -> list:
+    """Merge messages into a chat by id and move it to the front."""
+    existing = next((chat for chat in chats if chat.get("id") == update["chatId"]), None)
+    chat = dict(existing) if existing else {"id": update["chatId"], "title": None, "messages": []}
+    if update.get("title") is not None:
+        chat["title"] = update["title"]
+    if update.get("timestamp") is not None or existing is None:
+        chat["timestamp"] = update.get("timestamp")
+
+    messages = list(chat.get("messages") or [])
+    positions = {message.get("id"): i for i, message in enumerate(messages)}
+    for message in update["messages"]:
+        if message["id"] in positions:
+            messages[positions[message["id"]]] = message
+        else:
+            positions[message["id"]] = len(messages)
+            messages.append(message)
+    chat["messages"] = messages
+    return [chat] + [c for c in chats if c.get("id") != update["chatId"]]
+
+
+def apply_ops(workspace: Dict[str, Any], ops: List[Op]) -> Dict[str, Any]:
+    """
+    Return `workspace` as it will look once `ops` are persisted.
+
+    Documents appear as they'll be read back: metadata with body refs.
+    """
+    workspace = dict(workspace)
+    for kind, payload in ops:
+        if kind == SNAPSHOT:
+            for key in ("profile", "careerChatHistory", "tokens"):
+                if payload.get(key) is not None:
+                    workspace[key] = payload[key]
+            if payload.get("documentHistory") is not None:
+                workspace["documentHistory"] = [document_metadata(doc) for doc in payload["documentHistory"]]
+        elif kind == PROFILE_PATCH:
+            workspace["profile"] = {**(workspace.get("profile") or {}), **payload}
+        elif kind == DOCUMENT_ADD:
+            workspace["documentHistory"] = _upsert_document(
+                workspace.get("documentHistory") or [], document_metadata(payload)
+            )
+        elif kind == DOCUMENT_REMOVE:
+            workspace["documentHistory"] = [
+                doc for doc in workspace.get("documentHistory") or [] if doc.get("id") != payload
+            ]
+        elif kind == CHAT_APPEND:
+            chats = _append_chat(workspace.get("careerChatHistory") or [], payload)
+            if chats[0]["title"] is None:
+                chats[0]["title"] = ""
+            workspace["careerChatHistory"] = chats
+        elif kind == CHAT_REMOVE:
+            workspace["careerChatHistory"] = [
+                chat for chat in workspace.get("careerChatHistory") or [] if chat.get("id") != payload
+            ]
+    return workspace
+
+
+class WriteBatch:
+    """The minimal set of upstream writes equivalent to a list of operations."""
+
+    def __init__(self) -> None:
+        self.profile: Optional[dict] = None  # Full replacement
+        self.profile_patch: Dict[str, Any] = {}
+        self.tokens: Optional[int] = None
+        self.documents: Optional[list] = None  # Full snapshot
+        self.document_upserts: Dict[str, Dict[str, Any]] = {}
+        self.document_removals: set = set()
+        self.chats: Optional[list] = None  # Full snapshot
+        self.chat_appends: Dict[str, Dict[str, Any]] = {}
+        self.chat_removals: set = set()
+
+    @classmethod
+    def coalesce(cls, ops: List[Op]) -> "WriteBatch":
+        batch = cls()
+        for kind, payload in ops:
+            batch._add(kind, payload)
+        return batch
+
+    def _add(self, kind: str, payload: Any) -> None:
+        if kind == SNAPSHOT:
+            if payload.get("profile") is not None:
+                self.profile = payload["profile"]
+                self.profile_patch = {}
+            if payload.get("tokens") is not None:
+                self.tokens = payload["tokens"]
+            if payload.get("documentHistory") is not None:
+                self.documents = list(payload["documentHistory"])
+                self.document_upserts.clear()
+                self.document_removals.clear()
+            if payload.get("careerChatHistory") is not None:
+                self.chats = list(payload["careerChatHistory"])
+                self.chat_appends.clear()
+                self.chat_removals.clear()
+        elif kind == PROFILE_PATCH:
+            if self.profile is not None:
+                self.profile = {**self.profile, **payload}
+            else:
+                self.profile_patch.update(payload)
+        elif kind == DOCUMENT_ADD:
+            if self.documents is not None:
+                self.documents = _upsert_document(self.documents, payload)
+            else:
+                self.document_removals.discard(payload["id"])
+                self.document_upserts[payload["id"]] = payload
+        elif kind == DOCUMENT_REMOVE:
+            if self.documents is not None:
+                self.documents = [doc for doc in self.documents if doc.get("id") != payload]
+            else:
+                self.document_upserts.pop(payload, None)
+                self.document_removals.add(payload)
+        elif kind == CHAT_APPEND:
+            if self.chats is not None:
+                self.chats = _append_chat(self.chats, payload)
+            else:
+                # A pending removal of the same chat stays; removals run first
+                pending = self.chat_appends.get(payload["chatId"])
+                self.chat_appends[payload["chatId"]] = _append_chat([pending] if pending else [], payload)[0]
+        elif kind == CHAT_REMOVE:
+            if self.chats is not None:
+                self.chats = [chat for chat in self.chats if chat.get("id") != payload]
+            else:
+                self.chat_appends.pop(payload, None)
+                self.chat_removals.add(payload)
+        else:
+            raise ValueError(f"Unknown workspace operation: {kind}")
+
+    async def execute(self, user_id: str) -> int:
+        """Write the batch to Supabase. Returns the number of upstream requests."""
+        first = []
+        if self.profile is not None or self.tokens is not None or self.documents is not None or self.chats is not None:
+            first.append(persist_workspace(user_id, self.profile, self.documents, self.chats, self.tokens))
+        if self.profile_patch:
+            first.append(patch_profile(user_id, self.profile_patch))
+        if self.document_upserts:
+            first.append(add_documents(user_id, list(self.document_upserts.values())))
+        if self.document_removals:
+            first.append(remove_documents(user_id, self.document_removals))
+        if self.chat_removals:
+            first.append(remove_chats(user_id, self.chat_removals))
+        await asyncio.gather(*first)
+
+        appends = [
+            append_chat_messages(user_id, chat_id, chat.get("title"), chat.get("timestamp"), chat["messages"])
+            for chat_id, chat in self.chat_appends.items()
+        ]
+        await asyncio.gather(*appends)
+        return len(first) + len(appends)
+
+
+# ==================================================================================
+# Buffer
+# ==================================================================================
+
+class _UserQueue:
+    __slots__ = ("pending", "inflight", "attempts", "timer", "flushing", "version", "error")
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.pending: List[Op] = []
+        self.inflight: List[Op] = []
+        self.attempts = 0
+        self.timer: Optional["asyncio.Task[None]"] = None
+        self.flushing = False
+        # Why the queue stopped retrying; cleared by the next successful flush
+        self.error: Optional[str] = None
+
+
+class WorkspaceWriteBuffer:
+    """Per-user write-behind queues of workspace operations."""
+
+    def __init__(self, window_seconds: float, max_pending: int) -> None:
+        self.window_seconds = window_seconds
+        self.max_pending = max_pending
+        self._queues: Dict[str, _UserQueue] = {}
+        self._version = 0
+        self.submitted = 0
+        self.flushes = 0
+        self.upstream_writes = 0
+        self.failures = 0
+        self.stalls = 0
+
+    def submit(self, user_id: str, kind: str, payload: Any) -> int:
+        """Queue an operation and return its version (monotonic per instance)."""
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = _UserQueue()
+        self._version += 1
+        self.submitted += 1
+        queue.version = self._version
+        queue.pending.append((kind, payload))
+
+        if len(queue.pending) >= self.max_pending:
+            self._schedule(user_id, queue, 0)
+        else:
+            self._schedule(user_id, queue, self.window_seconds)
+        return self._version
+
+    def pending_ops(self, user_id: str) -> List[Op]:
+        """In-flight and queued operations for a user, oldest first."""
+        queue = self._queues.get(user_id)
+        if queue is None:
+            return []
+        return queue.inflight + queue.pending
+
+    def version(self, user_id: str) -> Optional[int]:
+        """Version of the user's newest unflushed save, or None if all are flushed."""
+        queue = self._queues.get(user_id)
+        return queue.version if queue is not None else None
+
+    def failure(self, user_id: str) -> Optional[str]:
+        """Why the user's held writes haven't reached Supabase, or None if nothing is held."""
+        queue = self._queues.get(user_id)
+        return queue.error if queue is not None else None
+
+    def _schedule(self, user_id: str, queue: _UserQueue, delay: float) -> None:
+        if queue.timer is not None and not queue.timer.done():
+            # A running flush reschedules itself; a sleeping timer is only pulled forward
+            if queue.flushing or delay > 0:
+                return
+            queue.timer.cancel()
+        queue.timer = asyncio.create_task(self._flush_after(user_id, queue, delay))
+
+    async def _flush_after(self, user_id: str, queue: _UserQueue, delay: float) -> None:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._flush_queue(user_id, queue)
+        queue.timer = None
+        if queue.error is not None:
+            return  # Held until the user's next save or read
+        if queue.pending:
+            full = len(queue.pending) >= self.max_pending and queue.attempts == 0
+            self._schedule(user_id, queue, 0 if full else self.window_seconds)
+        elif self._queues.get(user_id) is queue:
+            del self._queues[user_id]
+
+    async def _flush_queue(self, user_id: str, queue: _UserQueue) -> None:
+        if queue.flushing or not queue.pending:
+            return
+        queue.flushing = True
+        ops, queue.pending = queue.pending, []
+        queue.inflight = ops
+        try:
+            self.upstream_writes += await WriteBatch.coalesce(ops).execute(user_id)
+            self.flushes += 1
+            queue.attempts = 0
+            queue.error = None
+        except Exception as exc:
+            self.failures += 1
+            queue.attempts += 1
+            queue.pending = ops + queue.pending
+            if queue.attempts >= MAX_FLUSH_ATTEMPTS:
+                logger.error("Holding %d workspace writes for %s after %d failed attempts: %s",
+                             len(ops), user_id, queue.attempts, exc)
+                self.stalls += 1
+                queue.attempts = 0
+                queue.error = str(exc)
+            else:
+                logger.warning("Workspace flush for %s failed, will retry: %s", user_id, exc)
+        finally:
+            queue.inflight = []
+            queue.flushing = False
+
+    async def flush_user(self, user_id: str) -> None:
+        """Flush a user's queue now (waiting for a flush already running)."""
+        queue = self._queues.get(user_id)
+        if queue is None:
+            return
+        if queue.flushing and queue.timer is not None:
+            await asyncio.shield(queue.timer)
+        # The finished flush may have scheduled another; run it now instead
+        if queue.timer is not None and not queue.timer.done() and not queue.flushing:
+            queue.timer.cancel()
+            queue.timer = None
+        await self._flush_queue(user_id, queue)
+        if not queue.pending and self._queues.get(user_id) is queue:
+            del self._queues[user_id]
+
+    async def flush(self) -> None:
+        """Flush every queue now."""
+        for user_id in list(self._queues):
+            await self.flush_user(user_id)
+
+    async def close(self) -> None:
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pendingUsers": len(self._queues),
+            "pendingOps": sum(len(q.pending) + len(q.inflight) for q in self._queues.values()),
+            "submitted": self.submitted,
+            "flushes": self.flushes,
+            "upstreamWrites": self.upstream_writes,
+            "failures": self.failures,
+            "stalledUsers": sum(q.error is not None for q in self._queues.values()),
+            "stalls": self.stalls,
+            "writeReduction": round(self.submitted / self.upstream_writes, 2) if self.upstream_writes else None,
+        }
+
+
+_write_buffer: Optional[WorkspaceWriteBuffer] = None
+
+
+def get_workspace_write_buffer() -> Optional[WorkspaceWriteBuffer]:
+    """Get the shared buffer, or None when write-behind is disabled."""
+    global _write_buffer
+    settings = get_settings()
+    if not settings.workspace_write_behind_enabled:
+        return None
+    if _write_buffer is None:
+        _write_buffer = WorkspaceWriteBuffer(
+            window_seconds=settings.workspace_write_window_seconds,
+            max_pending=settings.workspace_write_max_pending,
+        )
+    return _write_buffer
+
+
+async def write_workspace(user_id: str, kind: str, payload: Any) -> Optional[int]:
+    """
+    Save a workspace operation.
+
+    Returns the write version when buffered; writes through (returning None)
+    when write-behind is disabled.
+    """
+    buffer = get_workspace_write_buffer()
+    if buffer is None:
+        await WriteBatch.coalesce([(kind, payload)]).execute(user_id)
+        return None
+    return buffer.submit(user_id, kind, payload)
+
+
+async def read_workspace(user_id: str, fields: Optional[Collection[str]] = None) -> Dict[str, Any]:
+    """Fetch the workspace (or some `fields` of it) with this instance's unflushed writes applied."""
+    buffer = get_workspace_write_buffer()
+    if buffer is None:
+        return await fetch_workspace(user_id, fields=fields)
+
+    # Ops captured before the read cover anything flushed while it runs
+    before = buffer.pending_ops(user_id)
+    workspace = await fetch_workspace(user_id, fields=fields)
+    after = [op for op in buffer.pending_ops(user_id) if not any(op is seen for seen in before)]
+    ops = before + after
+    if not ops:
+        return workspace
+    return {field: value for field, value in apply_ops(workspace, ops).items() if field in workspace}
+
+
+async def read_history_page(
+    user_id: str, history: str, limit: int, cursor: Optional[str]
+) -> Tuple[list, Optional[str]]:
+    """
+    One page of "documentHistory" or "careerChatHistory", newest first.
+
+    Keyset cursors can't be overlaid with queued writes, so the user's
+    pending saves are flushed first (they'd be written within one window
+    anyway).
+    """
+    buffer = get_workspace_write_buffer()
+    if buffer is not None:
+        await buffer.flush_user(user_id)
+    fetch_page = fetch_documents_page if history == "documentHistory" else fetch_chats_page
+    return await fetch_page(user_id, limit, cursor)
+
+
+async def read_document_entry(user_id: str, document_id: str) -> Dict[str, Any]:
+    """A stored history entry (metadata and body refs), after flushing the user's pending saves."""
+    buffer = get_workspace_write_buffer()
+    if buffer is not None:
+        await buffer.flush_user(user_id)
+    return await fetch_document_entry(user_id, document_id)
@@ -0,0 +1,137 @@
+"""
+Benchmark: per-request httpx clients vs the shared pooled client.
+
+Starts a local keep-alive HTTP/1.1 stand-in for Supabase and issues the
+same sequential GETs through (a) a new AsyncClient per call, as the
+services used to, and (b) one long-lived client as in app.services.http.
+Pass --tls to serve HTTPS with a throwaway certificate (requires
+`cryptography`), which is closer to production where setup includes TLS.
+
+Run from backend/:  python -m benchmarks.bench_http_pool [--requests N] [--tls]
+"""
+
+import argparse
+import asyncio
+import datetime
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import httpx
+
+BODY = b'[{"tokens": 42, "tokens_replenished_at": null, "rolled_over_tokens": 0}]'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _self_signed_context(workdir: Path) -> Tuple[ssl.SSLContext, ssl.SSLContext]:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = workdir / "cert.pem", workdir / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(cert_path, key_path)
+    client_ctx = ssl.create_default_context(cafile=str(cert_path))
+    client_ctx.check_hostname = False
+    return server_ctx, client_ctx
+
+
+def _start_server(server_ctx: Optional[ssl.SSLContext]) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    if server_ctx is not None:
+        server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _fresh_clients(url: str, n: int, verify) -> List[float]:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(base_url=url, timeout=10, verify=verify) as client:
+            await client.get("/rest/v1/workspaces")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def _pooled_client(url: str, n: int, verify) -> List[float]:
+    timings = []
+    async with httpx.AsyncClient(base_url=url, timeout=10, verify=verify) as client:
+        await client.get("/rest/v1/workspaces")  # Warm the pool, as after the first request
+        for _ in range(n):
+            start = time.perf_counter()
+            await client.get("/rest/v1/workspaces")
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(label: str, timings: List[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"{label:<22}{statistics.mean(timings):>10.3f}{statistics.median(timings):>10.3f}{p95:>10.3f}"
+
+
+async def main(requests: int, tls: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server_ctx, client_ctx = _self_signed_context(Path(tmpdir)) if tls else (None, True)
+        server = _start_server(server_ctx)
+        url = f"{'https' if tls else 'http'}://127.0.0.1:{server.server_address[1]}"
+        try:
+            fresh = await _fresh_clients(url, requests, client_ctx)
+            pooled = await _pooled_client(url, requests, client_ctx)
+        finally:
+            server.shutdown()
+
+    print(f"{requests} sequential GETs against {url}")
+    print(f"{'mode (ms)':<22}{'mean':>10}{'median':>10}{'p95':>10}")
+    print(_summary("client per request", fresh))
+    print(_summary("shared pooled client", pooled))
+    print(f"Saved per request: {statistics.mean(fresh) - statistics.mean(pooled):.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--tls", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.tls))
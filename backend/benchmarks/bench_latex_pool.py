@@ -0,0 +1,111 @@
+"""
+Benchmark: blocking subprocess.run vs the pooled async Tectonic path.
+
+Fires N concurrent compiles and, alongside them, a 10 ms ticker that
+records how late the event loop wakes it (the stall every other request
+on the instance would see). The blocking mode runs Tectonic with
+subprocess.run on the loop, as the endpoint used to; the pooled mode goes
+through app.services.latex.TectonicPool.
+
+When `tectonic` isn't on PATH (or with --fake), a stand-in script that
+burns CPU for --work seconds and writes a PDF is used instead.
+
+Run from backend/:  python -m benchmarks.bench_latex_pool [--compiles N] [--workers W] [--fake]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from app.services.latex import TectonicPool, _markdown_to_latex
+
+FAKE_TECTONIC = """#!{python}
+import os, sys, time
+deadline = time.process_time() + float(os.environ.get("FAKE_TECTONIC_WORK", "0.2"))
+while time.process_time() < deadline:
+    pass
+with open(os.path.join(sys.argv[2], "resume.pdf"), "wb") as pdf:
+    pdf.write(b"%PDF-1.4 fake")
+"""
+
+MARKDOWN = "# Jane Doe\n\n## Experience\n- Built things\n- Shipped **more** things\n\nPlain paragraph text.\n"
+TICK_SECONDS = 0.01
+
+
+def _blocking_compile(executable: str, latex_source: str) -> bytes:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tex_path = Path(tmpdir) / "resume.tex"
+        tex_path.write_text(latex_source, encoding="utf-8")
+        subprocess.run([executable, "-o", tmpdir, tex_path.name], cwd=tmpdir, capture_output=True, check=True)
+        return (Path(tmpdir) / "resume.pdf").read_bytes()
+
+
+async def _ticker(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - start - TICK_SECONDS) * 1000)
+
+
+async def _measure(compile_one, compiles: int) -> Tuple[float, List[float]]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(compile_one(i) for i in range(compiles)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+async def main(compiles: int, workers: int, executable: str) -> None:
+    latex_source = _markdown_to_latex(MARKDOWN)
+
+    async def blocking(i: int) -> bytes:
+        return _blocking_compile(executable, latex_source)
+
+    # Enough queue for every compile: this measures throughput, not admission
+    pool = TectonicPool(workers=workers, max_queue=compiles, per_user_limit=compiles, timeout_seconds=120, executable=executable)
+
+    async def pooled(i: int) -> bytes:
+        return await pool.compile(latex_source, "bench-user")
+
+    await pooled(0)  # Warm caches (Tectonic bundle, page cache) before timing
+    results = {
+        "blocking subprocess.run": await _measure(blocking, compiles),
+        f"pooled async ({workers} workers)": await _measure(pooled, compiles),
+    }
+
+    print(f"{compiles} concurrent compiles with {executable}")
+    print(f"{'mode':<28}{'wall s':>10}{'per s':>10}{'max stall ms':>14}{'p95 stall ms':>14}")
+    for label, (elapsed, lags) in results.items():
+        lags = sorted(lags) or [0.0]
+        p95 = lags[max(int(len(lags) * 0.95) - 1, 0)]
+        print(f"{label:<28}{elapsed:>10.2f}{compiles / elapsed:>10.2f}{max(lags):>14.1f}{p95:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compiles", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--work", type=float, default=0.2, help="CPU seconds per fake compile")
+    parser.add_argument("--fake", action="store_true", help="use the stand-in even if tectonic is installed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        executable = None if args.fake else shutil.which("tectonic")
+        if executable is None:
+            executable = str(Path(scratch) / "tectonic")
+            Path(executable).write_text(FAKE_TECTONIC.format(python=sys.executable))
+            os.chmod(executable, 0o755)
+            os.environ["FAKE_TECTONIC_WORK"] = str(args.work)
+        asyncio.run(main(args.compiles, args.workers, executable))
@@ -0,0 +1,122 @@
+"""
+Benchmark: the line-by-line markdown-to-LaTeX converter vs the single-pass one.
+
+Converts documents of SAFE_CHAR_LIMIT characters (the most an export
+accepts) with a frozen copy of the previous converter - a per-character
+dict lookup and regex per line and list item - and with
+app.services.latex, which parses each line once via
+app.services.markdown_parser and escapes each span in one regex pass over
+a single table. Two documents: plain text using only what the old
+converter understood, and the same text with inline markup and nested
+lists, which the old converter escapes literally.
+
+Run from backend/:  python -m benchmarks.bench_markdown_latex [--runs N]
+"""
+
+import argparse
+import re
+import statistics
+import time
+from typing import Callable, List
+
+from app.services.latex import SAFE_CHAR_LIMIT, _markdown_to_latex_body
+
+
+def _old_escape_latex(text: str) -> str:
+    replacements = {
+        "\\": r"\textbackslash{}",
+        "&": r"\&",
+        "%": r"\%",
+        "$": r"\$",
+        "#": r"\#",
+        "_": r"\_",
+        "{": r"\{",
+        "}": r"\}",
+        "~": r"\textasciitilde{}",
+        "^": r"\textasciicircum{}",
+    }
+    escaped = "".join(replacements.get(ch, ch) for ch in text)
+    escaped = re.sub(r"\\(write18|input|include)\b", "", escaped, flags=re.IGNORECASE)
+    return escaped
+
+
+def _old_markdown_to_latex_body(markdown: str) -> str:
+    body_parts = []
+    list_buffer = []
+
+    def flush_list():
+        nonlocal list_buffer
+        if list_buffer:
+            items = "\n".join([f"\\item {_old_escape_latex(item)}" for item in list_buffer])
+            body_parts.append("\\begin{itemize}\n" + items + "\n\\end{itemize}")
+            list_buffer = []
+
+    for raw in markdown.splitlines():
+        line = raw.strip()
+        if not line:
+            flush_list()
+            body_parts.append("")
+            continue
+        if line.startswith("# "):
+            flush_list()
+            body_parts.append(f"\\section*{{{_old_escape_latex(line[2:].strip())}}}")
+        elif line.startswith("## "):
+            flush_list()
+            body_parts.append(f"\\subsection*{{{_old_escape_latex(line[3:].strip())}}}")
+        elif line.startswith("- "):
+            list_buffer.append(line[2:].strip())
+        else:
+            flush_list()
+            body_parts.append(_old_escape_latex(line))
+
+    flush_list()
+    return "\n\n".join(body_parts)
+
+
+def _document(markup: bool) -> str:
+    bold, italic = ("**", "*") if markup else ("", "")
+    sections = []
+    role = 0
+    while sum(map(len, sections)) < SAFE_CHAR_LIMIT:
+        lines = [
+            f"## {bold}Senior Engineer{bold}, Company_{role} & Partners",
+            f"Owned reliability for {italic}100% of traffic{italic} -- budgets in $ and #metrics.",
+        ]
+        for i in range(6):
+            lines.append(f"- Delivered {bold}project {i}{bold}: cut p95 latency by {10 + i}% (~{i}ms) for {{team}}")
+            if markup and i % 3 == 0:
+                lines.append(f"  1. Wrote `service_{i}.py` and the [design doc](https://example.com/docs/{i})")
+        sections.append("\n".join(lines) + "\n")
+        role += 1
+    return ("# Jane Doe\n\n" + "\n".join(sections))[:SAFE_CHAR_LIMIT]
+
+
+def _measure(convert: Callable[[str], str], markdown: str, runs: int) -> List[float]:
+    convert(markdown)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        convert(markdown)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def main(runs: int) -> None:
+    print(f"{runs} conversions per row")
+    print(f"{'document':<10}{'converter':<14}{'mean ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    for name, markdown in (("plain", _document(markup=False)), ("markup", _document(markup=True))):
+        baseline = None
+        for label, convert in (("line-by-line", _old_markdown_to_latex_body), ("single-pass", _markdown_to_latex_body)):
+            timings = _measure(convert, markdown, runs)
+            mean = statistics.mean(timings)
+            baseline = baseline or mean
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            print(f"{name:<10}{label:<14}{mean:>10.2f}{p95:>10.2f}{baseline / mean:>9.1f}x")
+        print(f"{'':<10}({len(markdown)} characters)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    main(args.runs)
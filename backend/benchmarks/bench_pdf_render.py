@@ -0,0 +1,93 @@
+"""
+Benchmark: in-process PDF rendering vs a Tectonic compile of the same resume.
+
+Renders a typical resume (headings, bullets, paragraphs; about two pages)
+N times with app.services.pdf_render and, when `tectonic` is on PATH, with
+the Tectonic pool as the endpoint would. Reports latency, CPU time and peak
+memory: Python heap growth for the in-process renderer, the largest child
+RSS for Tectonic.
+
+Run from backend/:  python -m benchmarks.bench_pdf_render [--renders N]
+"""
+
+import argparse
+import asyncio
+import resource
+import shutil
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from app.services.latex import TectonicPool, _markdown_to_latex
+from app.services.pdf_render import render_markdown_pdf, supports
+
+RESUME = "\n".join(
+    ["# Jane Doe", "jane@example.com | +1 555 0100 | Stockholm", ""]
+    + [
+        line
+        for role in range(4)
+        for line in (
+            f"## Senior Engineer, Company {role}",
+            "Owned the platform's reliability and developer experience across several teams.",
+            *(f"- Delivered project {i}: cut latency by {10 + i}% and costs by {5 + i}% -- measured over a quarter" for i in range(6)),
+            "",
+        )
+    ]
+    + ["## Education", "MSc Computer Science, KTH Royal Institute of Technology", ""]
+)
+
+
+def _summary(label: str, timings: List[float], cpu: float, memory: str) -> str:
+    timings = sorted(timings)
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    return f"{label:<14}{statistics.mean(timings):>10.2f}{p95:>10.2f}{cpu:>10.2f}{memory:>14}"
+
+
+def _measure(render: Callable[[], bytes], renders: int) -> Tuple[List[float], float, int]:
+    timings = []
+    cpu_start = time.process_time()
+    size = 0
+    for _ in range(renders):
+        start = time.perf_counter()
+        size = len(render())
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, (time.process_time() - cpu_start) * 1000 / renders, size
+
+
+def main(renders: int) -> None:
+    assert supports(RESUME)
+    print(f"{renders} renders of a {len(RESUME)}-character resume")
+    print(f"{'renderer':<14}{'mean ms':>10}{'p95 ms':>10}{'cpu ms':>10}{'peak memory':>14}")
+
+    render_markdown_pdf(RESUME)  # Warm imports and width tables
+    tracemalloc.start()
+    timings, cpu, size = _measure(lambda: render_markdown_pdf(RESUME), renders)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(_summary("in-process", timings, cpu, f"{peak / 1024:.0f} KiB heap") + f"   ({size} bytes)")
+
+    executable = shutil.which("tectonic")
+    if executable is None:
+        print(f"{'tectonic':<14}  not installed; skipped")
+        return
+
+    pool = TectonicPool(workers=1, max_queue=renders, per_user_limit=renders, timeout_seconds=120, executable=executable)
+    latex_source = _markdown_to_latex(RESUME)
+
+    def compile_once() -> bytes:
+        return asyncio.run(pool.compile(latex_source))
+
+    compile_once()  # Fill Tectonic's cache first, as the warmed image does
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    timings, _, size = _measure(compile_once, renders)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = ((after.ru_utime + after.ru_stime) - (children.ru_utime + children.ru_stime)) * 1000 / renders
+    print(_summary("tectonic", timings, cpu, f"{after.ru_maxrss / 1024:.0f} MiB RSS") + f"   ({size} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=20)
+    args = parser.parse_args()
+    main(args.renders)
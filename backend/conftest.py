@@ -10,3 +10,4 @@ if str(ROOT) not in sys.path:
 # Minimal env defaults for tests
 os.environ.setdefault("SUPABASE_URL", "http://test.supabase.local")
 os.environ.setdefault("SUPABASE_SECRET_KEY", "sb_secret_test_key_for_testing")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret-with-at-least-32-bytes")
@@ -0,0 +1,140 @@
+import os
+import time
+from types import SimpleNamespace
+
+import anyio
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from app.deps import auth
+from app.services import auth_tokens
+from app.deps.auth import get_current_user
+from app.main import app
+from app.services.auth_tokens import JWKSCache, TokenInvalidError, TokenVerifier
+
+SECRET = os.environ["SUPABASE_JWT_SECRET"]
+
+
+def _mint(secret=SECRET, algorithm="HS256", headers=None, **overrides):
+    claims = {
+        "sub": "user-123",
+        "email": "jane@example.com",
+        "aud": "authenticated",
+        "role": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, secret, algorithm=algorithm, headers=headers)
+
+
+def test_valid_token_is_verified_locally():
+    user = anyio.run(get_current_user, f"Bearer {_mint()}")
+    assert user == {"id": "user-123", "email": "jane@example.com"}
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        _mint(exp=int(time.time()) - 3600),
+        _mint(aud="anon"),
+        _mint(secret="some-other-secret-with-at-least-32-bytes"),
+        _mint(sub=""),
+        "not-a-jwt",
+    ],
+)
+def test_invalid_tokens_are_rejected(token):
+    with pytest.raises(HTTPException) as exc_info:
+        anyio.run(get_current_user, f"Bearer {token}")
+    assert exc_info.value.status_code == 401
+
+
+def test_asymmetric_tokens_use_jwks_keys():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    jwks = JWKSCache("/auth/v1/.well-known/jwks.json", refresh_seconds=3600)
+    jwks._keys = {"key-1": private_key.public_key()}
+    jwks._fetched_at = time.monotonic()
+    verifier = TokenVerifier(jwt_secret=None, audience="authenticated", jwks=jwks)
+
+    token = _mint(secret=private_key, algorithm="ES256", headers={"kid": "key-1"})
+    claims = anyio.run(verifier.verify, token)
+    assert claims["id"] == "user-123"
+
+    forged = _mint(secret=ec.generate_private_key(ec.SECP256R1()), algorithm="ES256", headers={"kid": "key-1"})
+    with pytest.raises(TokenInvalidError):
+        anyio.run(verifier.verify, forged)
+
+
+def test_first_jwks_fetch_happens_right_after_boot(monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    jwk = {**jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True), "kid": "key-1"}
+    fetches = []
+
+    def handler(request):
+        fetches.append(request.url.path)
+        return httpx.Response(200, json={"keys": [jwk]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://auth")
+    monkeypatch.setattr(auth_tokens, "get_http_client", lambda name: client)
+    # A freshly booted sandbox: the monotonic clock has barely started
+    monkeypatch.setattr(auth_tokens, "time", SimpleNamespace(monotonic=lambda: 1.0))
+
+    jwks = JWKSCache("/auth/v1/.well-known/jwks.json", refresh_seconds=3600)
+    assert anyio.run(jwks.get_key, "key-1") is not None
+    assert fetches == ["/auth/v1/.well-known/jwks.json"]
+
+
+def test_authenticated_route_without_auth_round_trip():
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = await client.post(
+                "/api/analytics/events",
+                json={"eventName": "page_view"},
+                headers={"Authorization": f"Bearer {_mint()}"},
+            )
+            denied = await client.post(
+                "/api/analytics/events",
+                json={"eventName": "page_view"},
+                headers={"Authorization": f"Bearer {_mint(aud='anon')}"},
+            )
+        assert ok.status_code == 200
+        assert denied.status_code == 401
+
+    anyio.run(_run)
+
+
+def test_remote_validation_is_cached_and_single_flight(monkeypatch):
+    calls = []
+
+    async def fake_remote(token):
+        calls.append(token)
+        await anyio.sleep(0.01)
+        return {"id": "user-123", "email": None}
+
+    monkeypatch.setattr(auth, "_validate_remote", fake_remote)
+    token = _mint()
+
+    async def _run():
+        results = []
+
+        async def validate():
+            results.append(await auth._validate_remote_cached(token))
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(3):
+                tg.start_soon(validate)
+        assert len(calls) == 1 and len(results) == 3
+
+        await auth._validate_remote_cached(token)
+        assert len(calls) == 1
+
+        auth.invalidate_token(f"Bearer {token}")
+        await auth._validate_remote_cached(token)
+        assert len(calls) == 2
+
+    anyio.run(_run)
+    assert auth.auth_cache_stats()["hits"] >= 1
@@ -0,0 +1,83 @@
+import gzip
+
+import anyio
+import brotli
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.middleware.compression import (
+    CompressionMiddleware,
+    PrecompressedStaticFiles,
+    negotiate_encoding,
+    precompress_directory,
+)
+
+BIG = {"careerChatHistory": [{"content": "Tell me about product roles. " * 20}] * 50}
+
+
+def _app(tmp_path=None):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, offload_size=4096)
+
+    @app.get("/big")
+    async def big():
+        return BIG
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    if tmp_path is not None:
+        app.mount("/assets", PrecompressedStaticFiles(directory=str(tmp_path)), name="assets")
+    return app
+
+
+async def _get(app, path, encoding):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # Read raw bytes so httpx doesn't transparently decode
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as resp:
+            return resp, b"".join([chunk async for chunk in resp.aiter_raw()])
+
+
+def test_negotiate_encoding_respects_quality():
+    assert negotiate_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("br;q=0, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("identity", ("br", "gzip")) is None
+
+
+def test_api_responses_are_compressed_above_threshold():
+    async def _run():
+        app = _app()
+        resp, body = await _get(app, "/big", "br, gzip")
+        assert resp.headers["content-encoding"] == "br"
+        assert b"product roles" in brotli.decompress(body)
+
+        resp, body = await _get(app, "/big", "gzip")
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["vary"]
+        assert b"product roles" in gzip.decompress(body)
+
+        resp, _ = await _get(app, "/small", "gzip")
+        assert "content-encoding" not in resp.headers
+
+    anyio.run(_run)
+
+
+def test_static_assets_served_precompressed(tmp_path):
+    (tmp_path / "index.js").write_text("console.log('keju');\n" * 500)
+    assert precompress_directory(tmp_path) == 2
+    assert precompress_directory(tmp_path) == 0
+
+    async def _run():
+        app = _app(tmp_path)
+        resp, body = await _get(app, "/assets/index.js", "gzip")
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "javascript" in resp.headers["content-type"]
+        assert gzip.decompress(body).startswith(b"console.log")
+
+        resp, body = await _get(app, "/assets/index.js", "identity")
+        assert "content-encoding" not in resp.headers
+        assert body.startswith(b"console.log")
+
+    anyio.run(_run)
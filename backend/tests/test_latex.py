@@ -0,0 +1,269 @@
+import io
+import os
+import sys
+import time
+import zipfile
+
+import anyio
+import jwt
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.routers import latex as latex_router
+from app.services import metering
+from app.services.latex import CompileBusyError, CompileLimitError, TectonicPool
+from app.services.latex_templates import get_latex_templates
+from app.services.metering import TokenLedger
+
+FAKE_TECTONIC = """#!{python}
+import os, sys, time
+with open(os.environ["FAKE_TECTONIC_PIDS"], "a") as pids:
+    pids.write(f"{{os.getpid()}}\\n")
+with open(os.environ["FAKE_TECTONIC_PIDS"] + ".calls", "a") as calls:
+    calls.write(" ".join(sys.argv[1:] + [os.environ.get("TECTONIC_CACHE_DIR", "-")]) + "\\n")
+time.sleep(float(os.environ.get("FAKE_TECTONIC_SECONDS", "0")))
+with open(os.path.join(sys.argv[2], "resume.pdf"), "wb") as pdf:
+    pdf.write(b"%PDF-1.4 fake")
+"""
+
+
+@pytest.fixture
+def fake_tectonic(tmp_path, monkeypatch):
+    script = tmp_path / "tectonic"
+    script.write_text(FAKE_TECTONIC.format(python=sys.executable))
+    script.chmod(0o755)
+    pids = tmp_path / "pids"
+    monkeypatch.setenv("FAKE_TECTONIC_PIDS", str(pids))
+    return str(script), pids
+
+
+def _pool(executable, **overrides):
+    options = {"workers": 1, "max_queue": 1, "per_user_limit": 2, "timeout_seconds": 10}
+    options.update(overrides)
+    return TectonicPool(executable=executable, **options)
+
+
+def test_pool_admits_up_to_workers_plus_queue_and_per_user_limit(fake_tectonic, monkeypatch):
+    executable, _ = fake_tectonic
+    monkeypatch.setenv("FAKE_TECTONIC_SECONDS", "0.3")
+    pool = _pool(executable)
+
+    async def _run():
+        results = []
+
+        async def compile_for(user_id):
+            results.append(await pool.compile("\\relax", user_id))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(compile_for, "user-a")
+            tg.start_soon(compile_for, "user-a")
+            await anyio.sleep(0.05)
+            assert pool.stats()["running"] == 1 and pool.stats()["queued"] == 1
+            with pytest.raises(CompileLimitError):
+                await pool.compile("\\relax", "user-a")
+            with pytest.raises(CompileBusyError):
+                await pool.compile("\\relax", "user-b")
+        return results
+
+    assert anyio.run(_run) == [b"%PDF-1.4 fake"] * 2
+    stats = pool.stats()
+    assert stats["completed"] == 2 and stats["rejectedBusy"] == 1 and stats["rejectedUserLimit"] == 1
+    assert pool._per_user == {}
+
+
+def test_cancelled_compile_kills_tectonic_and_frees_its_slot(fake_tectonic, monkeypatch):
+    executable, pids = fake_tectonic
+    monkeypatch.setenv("FAKE_TECTONIC_SECONDS", "30")
+    pool = _pool(executable)
+
+    async def _run():
+        with anyio.move_on_after(0.5):
+            await pool.compile("\\relax", "user-a")
+
+    anyio.run(_run)
+    pid = int(pids.read_text().split()[0])
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+    assert pool.stats()["cancelled"] == 1 and pool.stats()["running"] == 0
+    assert pool._per_user == {}
+
+
+def test_warm_up_fills_the_cache_dir_that_only_cached_compiles_use(fake_tectonic, tmp_path):
+    executable, _ = fake_tectonic
+    cache_dir = tmp_path / "tectonic-cache"
+    pool = _pool(executable, cache_dir=str(cache_dir), bundle="/opt/bundle.zip", only_cached=True)
+
+    anyio.run(pool.warm_up)
+    anyio.run(pool.compile, "\\relax", "user-a")
+
+    *warm, compile_ = [line.split() for line in (tmp_path / "pids.calls").read_text().splitlines()]
+    assert len(warm) == len(get_latex_templates())  # Every template's packages get cached
+    assert all("--only-cached" not in call for call in warm) and "--only-cached" in compile_
+    assert warm[-1][-1] == compile_[-1] == str(cache_dir) and cache_dir.is_dir()
+    assert "/opt/bundle.zip" in compile_
+    assert pool.stats()["warmedUp"] is True
+
+
+def _auth_headers():
+    token = jwt.encode(
+        {"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_batch_streams_a_zip_in_completion_order_or_merges_a_packet(monkeypatch):
+    async def fake_compile(content, user_id, template=None):
+        if content == "busy":
+            raise CompileBusyError("PDF export is busy. Please retry shortly.")
+        if content == "broken":
+            raise RuntimeError("Tectonic failed: boom")
+        await anyio.sleep(0.2 if content == "# Resume" else 0.01)
+        return b"%PDF " + content.encode()
+
+    async def fake_packet(documents, user_id, template=None):
+        return b"%PDF " + b" + ".join(doc.encode() for doc in documents)
+
+    monkeypatch.setattr(latex_router, "compile_markdown_to_pdf", fake_compile)
+    monkeypatch.setattr(latex_router, "compile_packet_to_pdf", fake_packet)
+
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            documents = [
+                {"content": "# Resume", "filename": "resume.pdf"},
+                {"content": "# Letter", "filename": "../resume"},
+                {"content": "broken"},
+            ]
+            response = await client.post("/api/latex/compile-batch", json={"documents": documents})
+            assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+            archive = zipfile.ZipFile(io.BytesIO(response.content))
+            assert archive.namelist() == ["resume-2.pdf", "document-3.error.txt", "resume.pdf"]
+            assert archive.read("resume.pdf") == b"%PDF # Resume"
+            assert archive.read("document-3.error.txt") == b"Tectonic failed: boom"
+
+            packet = await client.post("/api/latex/compile-batch", json={"documents": documents[:2], "merge": True})
+            assert packet.content == b"%PDF # Resume + # Letter"
+            assert "application-packet.pdf" in packet.headers["content-disposition"]
+            named = await client.post(
+                "/api/latex/compile-batch",
+                json={"documents": documents[:2], "merge": True, "filename": '履歴書 "v2"\r\n.pdf'},
+            )
+            assert named.status_code == 200
+            assert named.headers["content-disposition"] == (
+                "attachment; filename=\"___ v2.pdf\"; filename*=UTF-8''%E5%B1%A5%E6%AD%B4%E6%9B%B8%20v2.pdf"
+            )
+
+            busy = await client.post("/api/latex/compile-batch", json={"documents": [{"content": "busy"}]})
+            assert busy.status_code == 503 and busy.headers["retry-after"] == "2"
+            empty = await client.post("/api/latex/compile-batch", json={"documents": [{"content": ""}]})
+            assert empty.status_code == 400
+
+    anyio.run(_run)
+
+
+def test_pdf_downloads_are_metered_per_document_and_refunded_on_failure(monkeypatch):
+    async def fake_compile(content, user_id, template=None):
+        if content == "broken":
+            raise RuntimeError("Tectonic failed: boom")
+        return b"%PDF " + content.encode()
+
+    balance = [3]
+
+    async def fake_lease(user_id, amount, ttl_seconds):
+        granted, balance[0] = balance[0], 0
+        return {"leaseId": "lease-1", "granted": granted, "remainingTokens": 0}
+
+    ledger = TokenLedger(lease_size=3, lease_ttl_seconds=900, flush_interval=3600)
+    monkeypatch.setattr(metering, "get_token_ledger", lambda: ledger)
+    monkeypatch.setattr(metering, "acquire_token_lease", fake_lease)
+    monkeypatch.setattr(latex_router, "compile_markdown_to_pdf", fake_compile)
+
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            assert (await client.post("/api/latex/compile", json={"content": "# Resume"})).status_code == 200
+            assert (await client.post("/api/latex/compile", json={"content": "broken"})).status_code == 500
+            assert ledger.outstanding("user-123") == 2
+            documents = [{"content": "# Resume"}, {"content": "broken"}]
+            batch = await client.post("/api/latex/compile-batch", json={"documents": documents})
+            assert batch.status_code == 200 and ledger.outstanding("user-123") == 1
+            packet = await client.post("/api/latex/compile-batch", json={"documents": documents[:1] * 2, "merge": True})
+            assert packet.status_code == 402 and ledger.outstanding("user-123") == 1
+        ledger._flusher.cancel()
+
+    anyio.run(_run)
+
+
+def test_export_streams_the_history_within_the_per_user_limit(monkeypatch):
+    pages = {
+        None: ([{"id": "a", "generatedAt": "2026-03-02T10:00:00Z", "companyName": "Acme Corp", "jobTitle": "SRE"},
+                {"id": "b", "generatedAt": "2026-03-01T09:00:00Z", "companyName": "Acme Corp", "jobTitle": "SRE"}], "next"),
+        "next": ([{"id": "c"}, {"id": "d", "generatedAt": "2026-02-01T00:00:00Z", "companyName": "株式会社テスト"}], None),
+    }
+    bodies = {
+        "a": {"resumeContent": "# A", "coverLetterContent": "broken"},
+        "b": {"resumeContent": "# B", "coverLetterContent": ""},
+        "c": {"coverLetterContent": "# C"},
+        "d": {"resumeContent": "# D"},
+    }
+    in_flight, peak, calls = [0], [0], []
+
+    async def fake_page(user_id, history, limit, cursor):
+        return pages[cursor] if user_id == "user-123" else ([], None)
+
+    async def fake_bodies(user_id, entry):
+        return {**entry, **bodies[entry["id"]]}
+
+    async def fake_workspace(user_id, fields=None):
+        return {"profile": {"selectedResumeTemplate": "tech", "selectedCoverLetterTemplate": "retired"}}
+
+    async def fake_compile(content, user_id, template=None):
+        calls.append((content, template))
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        try:
+            await anyio.sleep(0.05)
+            if content == "broken":
+                raise RuntimeError("Tectonic failed: boom")
+            return b"%PDF " + content.encode()
+        finally:
+            in_flight[0] -= 1
+
+    async def fake_lease(user_id, amount, ttl_seconds):
+        return {"leaseId": "lease-1", "granted": 10, "remainingTokens": 0}
+
+    ledger = TokenLedger(lease_size=10, lease_ttl_seconds=900, flush_interval=3600)
+    monkeypatch.setattr(metering, "get_token_ledger", lambda: ledger)
+    monkeypatch.setattr(metering, "acquire_token_lease", fake_lease)
+    monkeypatch.setattr(latex_router, "read_history_page", fake_page)
+    monkeypatch.setattr(latex_router, "load_document_bodies", fake_bodies)
+    monkeypatch.setattr(latex_router, "read_workspace", fake_workspace)
+    monkeypatch.setattr(latex_router, "compile_markdown_to_pdf", fake_compile)
+
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            response = await client.get("/api/latex/export", params={"filename": "書類.zip"})
+            assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+            assert response.headers["content-disposition"] == (
+                "attachment; filename=\"__.zip\"; filename*=UTF-8''%E6%9B%B8%E9%A1%9E.zip"
+            )
+            archive = zipfile.ZipFile(io.BytesIO(response.content))
+            assert sorted(archive.namelist()) == [
+                "2026-02-01-株式会社テスト-resume.pdf",
+                "2026-03-01-acme-corp-sre-resume.pdf",
+                "2026-03-02-acme-corp-sre-cover-letter.error.txt",
+                "2026-03-02-acme-corp-sre-resume.pdf",
+                "cover-letter.pdf",
+            ]
+            assert archive.read("cover-letter.pdf") == b"%PDF # C"
+        ledger._flusher.cancel()
+
+    anyio.run(_run)
+    # A token per exported PDF; the failed one is refunded
+    assert ledger.outstanding("user-123") == 6
+    assert peak[0] <= latex_router.get_settings().latex_compile_per_user_limit
+    assert ("# A", "tech") in calls and ("# C", None) in calls
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import anyio
+import pytest
+
+from app.services import latex, latex_templates, pdf_render
+from app.services.latex_templates import LatexTemplate, LatexTemplateError, get_latex_template, get_latex_templates
+
+
+def test_registry_matches_the_frontend_picker_and_wraps_bodies():
+    assert set(get_latex_templates()) == {"classic", "tech", "professional", "finance"}
+    assert get_latex_template(None) is get_latex_template("") is get_latex_templates()["classic"]
+    with pytest.raises(ValueError, match="Unknown template"):
+        get_latex_template("fancy")
+
+    source = latex._markdown_to_latex("# Jane\n## Skills\n### Tools\n- Python", get_latex_template("tech"))
+    assert "\\techname{Jane}\n\n\\techsection{Skills}\n\n\\techsubsection{Tools}" in source
+    assert source.index("\\newcommand{\\techname}") < source.index("\\begin{document}")
+    assert source.endswith("\\end{itemize}\n\\end{document}\n")
+
+
+def test_malformed_templates_fail_validation(monkeypatch):
+    good = get_latex_template()
+
+    def check(**overrides):
+        options = {"name": "broken", "version": "1", "preamble": good.preamble, "headings": dict(good.headings)}
+        options.update(overrides)
+        monkeypatch.setattr(latex_templates, "_TEMPLATES", [good, LatexTemplate(**options)])
+        get_latex_templates.cache_clear()
+        try:
+            with pytest.raises(LatexTemplateError, match="broken"):
+                get_latex_templates()
+        finally:
+            get_latex_templates.cache_clear()
+
+    check(headings={1: r"\fancyname{%s}", 2: r"\subsection*{%s}", 3: r"\subsection*{%s}"})
+    check(headings={1: r"\section*{%s}", 2: r"\subsection*{%s}"})
+    check(headings={1: r"\section*{}", 2: r"\subsection*{%s}", 3: r"\subsection*{%s}"})
+    check(preamble=good.preamble + "\\input{/etc/passwd}\n")
+    check(preamble=good.preamble + "\\newcommand{\\x}{{\n")
+    check(preamble=good.preamble + "\\begin{document}\n")
+    check(preamble=good.preamble.replace("\\usepackage{mathptmx}\n", ""), in_process=True)
+
+
+def test_in_process_templates_use_the_renderers_font_families():
+    # LaTeX font package -> the PostScript family it selects
+    families = {"mathptmx": "Times", "courier": "Courier"}
+    rendered = {name.split("-")[0] for name, _ in pdf_render.FONTS.values()}
+    assert rendered == {families[package] for package in pdf_render.LATEX_FONT_PACKAGES}
+    pdf = pdf_render.render_markdown_pdf("# Jane\n\nPlain `code`")
+    assert b"/BaseFont /Times-Roman" in pdf and b"/BaseFont /Courier" in pdf
+    for template in get_latex_templates().values():
+        if template.in_process:
+            source = latex._markdown_to_latex("# Jane", template)
+            assert all(f"\\usepackage{{{package}}}" in source for package in families)
+
+
+def test_template_picks_the_renderer_and_keys_the_cache(monkeypatch):
+    monkeypatch.setattr(latex, "get_settings", lambda: SimpleNamespace(pdf_simple_renderer_enabled=True))
+    keys = []
+
+    class FakeCache:
+        async def get_or_compile(self, key, compile_pdf):
+            keys.append(key)
+            return await compile_pdf()
+
+    class FakePool:
+        executable = "sh"
+
+        async def compile(self, latex_source, user_id):
+            return b"%PDF-tectonic " + latex_source.encode()
+
+    monkeypatch.setattr(latex, "get_pdf_cache", FakeCache)
+    monkeypatch.setattr(latex, "get_tectonic_pool", FakePool)
+
+    assert anyio.run(latex.compile_markdown_to_pdf, "# Jane", "user-1", "classic").startswith(b"%PDF-1.4")
+    tech = anyio.run(latex.compile_markdown_to_pdf, "# Jane", "user-1", "tech")
+    assert tech.startswith(b"%PDF-tectonic") and b"\\techname{Jane}" in tech
+    anyio.run(latex.compile_markdown_to_pdf, "# Jane", "user-1", "finance")
+    assert len(set(keys)) == 3
+    with pytest.raises(ValueError):
+        anyio.run(latex.compile_markdown_to_pdf, "# Jane", "user-1", "fancy")
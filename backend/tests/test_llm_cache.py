@@ -0,0 +1,51 @@
+import anyio
+
+from app.services.llm_cache import LLMResponseCache
+
+
+def test_equivalent_role_location_queries_share_entry():
+    async def _run():
+        cache = LLMResponseCache(maxsize=100, ttl_seconds=60)
+        answer = {"salaryRange": "$150k-$200k", "tips": "Anchor high."}
+        await cache.set("negotiation", ("Software Engineer", "NYC"), answer)
+
+        hit = await cache.get("negotiation", ("Software Engineer", "NYC"))
+        assert hit == answer and hit is not answer
+        # Each caller gets its own copy; changing one leaves the entry alone
+        hit["tips"] = "Mine now."
+        assert await cache.get("negotiation", ("software  engineer", "nyc")) == answer
+        assert await cache.get("negotiation", ("SWE", "New York, NY")) == answer
+        assert await cache.get("negotiation", ("Product Manager", "NYC")) is None
+
+        stats = cache.stats()
+        assert stats["lookups"] == 4
+        assert stats["misses"] == 1
+        assert {rule: v["hits"] for rule, v in stats["rules"].items()} == {
+            "exact": 1,
+            "fold": 1,
+            "alias": 1,
+            "similarity": 0,
+        }
+
+    anyio.run(_run)
+
+
+def test_similarity_rule_matches_close_embeddings():
+    vectors = {
+        "data scientist | berlin": [1.0, 0.0, 0.1],
+        "data science specialist | berlin": [0.98, 0.0, 0.12],
+    }
+
+    async def embed(text):
+        return vectors.get(text, [0.0, 1.0, 0.0])
+
+    async def _run():
+        cache = LLMResponseCache(maxsize=100, ttl_seconds=60, embedder=embed)
+        await cache.set("negotiation", ("Data Scientist", "Berlin"), {"salaryRange": "x"})
+
+        hit = await cache.get("negotiation", ("Data Science Specialist", "Berlin"))
+        assert hit == {"salaryRange": "x"}
+        assert await cache.get("negotiation", ("Chef", "Berlin")) is None
+        assert cache.stats()["rules"]["similarity"]["hits"] == 1
+
+    anyio.run(_run)
@@ -0,0 +1,56 @@
+from app.services.latex import _markdown_to_latex_body
+from app.services.markdown_parser import parse_inline, parse_markdown
+
+
+def test_inline_styles_links_and_literal_underscores():
+    assert parse_inline("***all*** **bold *both* x** `a*b*` snake_case_name") == [
+        ("all", "bi", None),
+        (" ", "", None),
+        ("bold ", "b", None),
+        ("both", "bi", None),
+        (" x", "b", None),
+        (" ", "", None),
+        ("a*b*", "code", None),
+        (" snake_case_name", "", None),
+    ]
+    assert parse_inline("[site](https://x.io/a_(b)) [bad](javascript:alert(1))") == [
+        ("site", "", "https://x.io/a_(b)"),
+        (" ", "", None),
+        ("bad", "", None),
+    ]
+
+
+def test_lists_nest_by_indentation_and_a_blank_line_ends_them():
+    blocks = parse_markdown("- a\n  1. b\n  2. c\n      - d\n- e\n\n3. f")
+    assert blocks == [
+        ("list", False, 1, [
+            ([("a", "", None)], [("list", True, 1, [
+                ([("b", "", None)], []),
+                ([("c", "", None)], [("list", False, 1, [([("d", "", None)], [])])]),
+            ])]),
+            ([("e", "", None)], []),
+        ]),
+        ("list", True, 3, [([("f", "", None)], [])]),
+    ]
+    # LaTeX lists go four deep; deeper items stay at the fourth level
+    deep = parse_markdown("\n".join("  " * depth + "- x" for depth in range(6)))
+    for _ in range(3):
+        deep = deep[0][3][0][1]
+    assert len(deep[0][3]) == 3 and deep[0][3][-1][1] == []
+
+
+def test_latex_escapes_once_and_keeps_the_command_hardening():
+    body = _markdown_to_latex_body(
+        "## **Skills** & more\n"
+        "- [draft] 100% of `x_y`, see [docs](https://x.io/?a=1&b=~2#top)\n"
+        "  1. \\write18{rm -rf /} \\input{/etc/passwd}"
+    )
+    assert body == (
+        "\\subsection*{\\textbf{Skills} \\& more}\n\n"
+        "\\begin{itemize}\n"
+        "\\item {}[draft] 100\\% of \\texttt{x\\_y}, see \\href{https://x.io/?a=1\\&b=%7E2\\#top}{docs}\n"
+        "\\begin{enumerate}\n"
+        "\\item \\textbackslash{}write18\\{rm -rf /\\} \\textbackslash{}input\\{/etc/passwd\\}\n"
+        "\\end{enumerate}\n"
+        "\\end{itemize}"
+    )
@@ -0,0 +1,71 @@
+import anyio
+import pytest
+
+from app.services import metering
+from app.services.metering import InsufficientTokensError, TokenLedger
+
+
+class FakeSupabase:
+    def __init__(self, balance):
+        self.balance = balance
+        self.leases = {}
+        self.acquire_calls = 0
+        self.reports = []
+
+    async def acquire_token_lease(self, user_id, amount, ttl_seconds):
+        self.acquire_calls += 1
+        granted = min(self.balance, amount)
+        self.balance -= granted
+        lease_id = f"lease-{self.acquire_calls}"
+        self.leases[lease_id] = granted
+        return {"leaseId": lease_id, "granted": granted, "remainingTokens": self.balance}
+
+    async def report_token_usage(self, usages):
+        self.reports.append(usages)
+        for usage in usages:
+            if usage["release"]:
+                self.balance += self.leases[usage["lease_id"]] - usage["consumed"]
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    fake = FakeSupabase(balance=12)
+    monkeypatch.setattr(metering, "acquire_token_lease", fake.acquire_token_lease)
+    monkeypatch.setattr(metering, "report_token_usage", fake.report_token_usage)
+    return fake
+
+
+def test_debits_are_local_until_lease_is_exhausted(fake_supabase):
+    async def _run():
+        ledger = TokenLedger(lease_size=10, lease_ttl_seconds=900, flush_interval=3600)
+        for _ in range(10):
+            await ledger.debit("user-1", 1)
+        assert fake_supabase.acquire_calls == 1
+
+        charges = await ledger.debit("user-1", 2)
+        assert fake_supabase.acquire_calls == 2
+        ledger.refund(charges)
+
+        with pytest.raises(InsufficientTokensError):
+            await ledger.debit("user-1", 5)
+
+        await ledger.close()
+        # 10 tokens were spent; the refunded 2 go back to the balance
+        assert fake_supabase.balance == 2
+        assert len(fake_supabase.reports) == 1
+
+    anyio.run(_run)
+
+
+def test_flush_reports_cumulative_usage(fake_supabase):
+    async def _run():
+        ledger = TokenLedger(lease_size=10, lease_ttl_seconds=900, flush_interval=3600)
+        await ledger.debit("user-1", 3)
+        assert await ledger.flush() == 1
+        assert await ledger.flush() == 0
+        await ledger.debit("user-1", 2)
+        await ledger.flush()
+        assert [u["consumed"] for batch in fake_supabase.reports for u in batch] == [3, 5]
+        await ledger.close()
+
+    anyio.run(_run)
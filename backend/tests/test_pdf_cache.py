@@ -0,0 +1,83 @@
+import os
+
+import anyio
+
+from app.services.pdf_cache import PDFCache, pdf_cache_key
+
+
+def _cache(directory, **overrides):
+    options = {"max_bytes": 250, "memory_max_bytes": 150, "memory_item_max_bytes": 100}
+    options.update(overrides)
+    return PDFCache(str(directory), **options)
+
+
+def test_key_ignores_whitespace_noise_but_not_content_or_template():
+    key = pdf_cache_key("# Jane\n\n- Python\n", "1")
+    assert pdf_cache_key("# Jane  \r\n\r\n\r\n- Python", "1") == key
+    assert pdf_cache_key("# Jane\n\n  - Python\n", "1") != key  # Indentation nests lists
+    assert pdf_cache_key("# Jane\n- Python\n", "1") != key
+    assert pdf_cache_key("# Jane\n\n- Python\n", "2") != key
+
+
+def test_memory_and_disk_tiers_with_lru_eviction_and_restart(tmp_path):
+    async def _run():
+        cache = _cache(tmp_path)
+        await cache.put("aa" * 32, b"a" * 100)
+        await cache.put("bb" * 32, b"b" * 120)  # Too big for the memory tier
+        assert await cache.get("aa" * 32) == b"a" * 100
+        assert await cache.get("bb" * 32) == b"b" * 120
+        assert await cache.get("cc" * 32) is None
+        stats = cache.stats()
+        assert (stats["memoryHits"], stats["diskHits"], stats["misses"]) == (1, 1, 1)
+
+        # Over 250 bytes on disk: the least recently used entry goes
+        os.utime(cache._path("bb" * 32), (1, 1))
+        await cache.put("dd" * 32, b"d" * 100)
+        assert cache.stats()["evictions"] == 1
+        assert not cache._path("aa" * 32).exists()
+
+        # A new process rebuilds the disk index from the directory
+        restarted = _cache(tmp_path)
+        assert await restarted.get("bb" * 32) == b"b" * 120
+        assert await restarted.get("aa" * 32) is None
+        assert restarted.stats()["diskEntries"] == 2
+
+    anyio.run(_run)
+
+
+def test_concurrent_misses_share_one_compile_and_abandoned_compiles_stop(tmp_path):
+    async def _run():
+        cache = _cache(tmp_path)
+        compiles = []
+
+        async def compile_pdf():
+            compiles.append(1)
+            await anyio.sleep(0.1)
+            return b"%PDF"
+
+        results = []
+
+        async def request():
+            results.append(await cache.get_or_compile("ee" * 32, compile_pdf))
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(3):
+                tg.start_soon(request)
+        assert results == [b"%PDF"] * 3 and len(compiles) == 1
+        assert cache.stats()["sharedCompiles"] == 2
+        assert await cache.get_or_compile("ee" * 32, compile_pdf) == b"%PDF"
+        assert len(compiles) == 1
+
+        finished = []
+
+        async def slow_compile():
+            await anyio.sleep(5)
+            finished.append(1)
+            return b"%PDF"
+
+        with anyio.move_on_after(0.1):
+            await cache.get_or_compile("ff" * 32, slow_compile)
+        await anyio.sleep(0.05)
+        assert not finished and not cache._flights._inflight
+
+    anyio.run(_run)
@@ -0,0 +1,86 @@
+import re
+import zlib
+from types import SimpleNamespace
+
+import anyio
+
+from app.services import latex, pdf_render
+
+RESUME = """# Jane Doe
+
+## Experience
+- Led a team of five engineers shipping a payments platform -- on time, under budget, and with ``zero'' incidents
+- Café owner & co-founder (2019–2021)
+
+Summary paragraph. """ + "Reliable, curious and kind. " * 20
+
+
+def _objects(pdf):
+    """Check the xref table points at every object and return the decoded page streams."""
+    xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n", pdf[xref:])
+    for obj_id, offset in enumerate(offsets, start=1):
+        assert pdf[int(offset):].startswith(b"%d 0 obj" % obj_id)
+    streams = re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)
+    return [zlib.decompress(stream).decode("latin-1") for stream in streams]
+
+
+def test_renders_the_markdown_subset_within_the_text_block():
+    pdf = pdf_render.render_markdown_pdf(RESUME + "\n" + "\n".join(f"- Item {i}" for i in range(80)))
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+    pages = _objects(pdf)
+    assert len(pages) == pdf.count(b"/Type /Page ") == 4
+    assert pdf_render.render_markdown_pdf(RESUME) == pdf_render.render_markdown_pdf(RESUME)
+    assert pdf_render.render_documents_pdf(["# Resume", "# Cover letter"]).count(b"/Type /Page ") == 2
+
+    first = pages[0]
+    assert "/F2 14.4 Tf 72 709 Td (Jane Doe) Tj" in first
+    assert "(\x95) Tj" in first and "\x96 on time" in first and "\x93zero\x94" in first
+    assert "(Caf\xe9 owner & co-founder \\(2019\x962021\\)) Tj" in first
+    for page in pages:
+        for font, size, x, y, text in re.findall(r"/(F\d) ([\d.]+) Tf (?:[\d.]+ Tw )?([\d.]+) ([\d.]+) Td \((.*?)\) Tj", page):
+            assert float(y) >= pdf_render.FOOT_BASELINE
+            if float(y) > pdf_render.MARGIN:
+                assert float(x) + pdf_render.text_width(text.replace("\\", ""), font, float(size)) <= 540.01
+
+
+def test_plain_documents_skip_tectonic_and_the_rest_fall_back(monkeypatch):
+    settings = SimpleNamespace(pdf_simple_renderer_enabled=True)
+    monkeypatch.setattr(latex, "get_settings", lambda: settings)
+    monkeypatch.setattr(latex, "get_pdf_cache", lambda: None)
+    assert pdf_render.supports(RESUME) and not pdf_render.supports("# 履歴書")
+
+    tectonic_calls = []
+
+    class FakePool:
+        executable = "sh"
+
+        async def compile(self, latex_source, user_id):
+            tectonic_calls.append(latex_source)
+            return b"%PDF-tectonic"
+
+    monkeypatch.setattr(latex, "get_tectonic_pool", FakePool)
+    assert anyio.run(latex.compile_markdown_to_pdf, RESUME, "user-1").startswith(b"%PDF-1.4")
+    assert tectonic_calls == []
+    assert anyio.run(latex.compile_markdown_to_pdf, "# 履歴書", "user-1") == b"%PDF-tectonic"
+
+    settings.pdf_simple_renderer_enabled = False
+    assert anyio.run(latex.compile_markdown_to_pdf, RESUME, "user-1") == b"%PDF-tectonic"
+    assert len(tectonic_calls) == 2
+
+
+def test_inline_styles_links_and_nested_lists():
+    pdf = pdf_render.render_markdown_pdf(
+        "Made **bold** and *it* with `a--b` at [Rezzy](https://rezzy.ai/a_(b))\n"
+        "- Top\n"
+        "  1. First\n"
+        "  2. Second\n"
+    )
+    page = _objects(pdf)[0]
+    assert "/F2 10.95 Tf 116.67 709 Td (bold) Tj" in page
+    assert "/F3 10.95 Tf" in page and "(a--b) Tj" in page  # No ligatures in code
+    # Numbered labels are right-aligned in \leftmarginii, inside the bullet's item
+    assert re.search(r"/F1 10\.95 Tf ([\d.]+) [\d.]+ Td \(1\.\) Tj", page)
+    items = re.findall(r"/F1 10\.95 Tf ([\d.]+) [\d.]+ Td \((?:First|Second)\) Tj", page)
+    assert items == ["%.2f" % (72 + pdf_render.text_width("•", "F1", 10.95) + 5.5 + 24.2)] * 2
+    assert b"/Annots [" in pdf and b"/URI (https://rezzy.ai/a_\\(b\\))" in pdf
@@ -0,0 +1,52 @@
+import asyncio
+
+import anyio
+
+from app.services.prefetch import VideoPrefetcher
+
+
+class FakeAgent:
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def video_recommendations(self, target_role, milestone):
+        self.calls.append(milestone["milestoneTitle"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [{"title": milestone["milestoneTitle"], "videoId": "abc"}]
+
+
+CAREER_PATH = {
+    "path": [{"milestoneTitle": f"Step {i}"} for i in range(5)],
+}
+
+
+def test_prefetch_serves_scheduled_milestones():
+    async def _run():
+        agent = FakeAgent()
+        prefetcher = VideoPrefetcher(ttl_seconds=60, concurrency=2)
+        assert prefetcher.schedule(agent, "user-1", "Data Scientist", CAREER_PATH) == 5
+
+        videos = await prefetcher.get("user-1", "data scientist", {"milestoneTitle": "Step 3"})
+        assert videos == [{"title": "Step 3", "videoId": "abc"}]
+        assert await prefetcher.get("user-2", "Data Scientist", {"milestoneTitle": "Step 3"}) is None
+
+        await asyncio.sleep(0.1)
+        assert sorted(agent.calls) == [f"Step {i}" for i in range(5)]
+        assert agent.max_in_flight <= 2
+
+    anyio.run(_run)
+
+
+def test_prefetch_discards_expired_entries():
+    async def _run():
+        agent = FakeAgent()
+        prefetcher = VideoPrefetcher(ttl_seconds=0, concurrency=2)
+        prefetcher.schedule(agent, "user-1", "Data Scientist", CAREER_PATH)
+        assert await prefetcher.get("user-1", "Data Scientist", {"milestoneTitle": "Step 0"}) is None
+
+    anyio.run(_run)
@@ -0,0 +1,52 @@
+import anyio
+
+from app.services import replenishment
+from app.services.replenishment import ReplenishmentScheduler
+
+
+def _fake_upstream(monkeypatch, due_users, leader=True):
+    calls = {"pages": [], "leases": 0}
+
+    async def acquire(name, holder, ttl_seconds):
+        calls["leases"] += 1
+        return leader
+
+    async def replenish(limit, after=None):
+        calls["pages"].append(after)
+        page = [user for user in due_users if after is None or user > after][:limit]
+        for user in page:
+            due_users.remove(user)
+        return [{"user_id": user, "new_tokens": 50, "rolled_over_tokens": 0} for user in page]
+
+    invalidated = []
+    monkeypatch.setattr(replenishment, "try_acquire_scheduler_lease", acquire)
+    monkeypatch.setattr(replenishment, "replenish_due_tokens", replenish)
+    monkeypatch.setattr(replenishment, "invalidate_account_status", invalidated.append)
+    return calls, invalidated
+
+
+def test_leader_sweeps_due_users_in_pages(monkeypatch):
+    due = [f"user-{i:02d}" for i in range(5)]
+    calls, invalidated = _fake_upstream(monkeypatch, due)
+    scheduler = ReplenishmentScheduler(interval_seconds=60, batch_size=2, batches_per_second=1000)
+
+    assert anyio.run(scheduler.sweep) == 5
+    assert due == []
+    assert calls["pages"] == [None, "user-01", "user-03"]
+    # Lease taken at the start and renewed between pages
+    assert calls["leases"] == 3
+    assert len(invalidated) == 5
+
+    stats = scheduler.stats()
+    assert stats["batches"] == 3 and stats["lastBatchSize"] == 1 and stats["replenished"] == 5
+    assert stats["leader"] is True and stats["lastSweepSeconds"] is not None
+
+
+def test_non_leader_skips_the_sweep(monkeypatch):
+    due = ["user-1"]
+    calls, _ = _fake_upstream(monkeypatch, due, leader=False)
+    scheduler = ReplenishmentScheduler(interval_seconds=60, batch_size=10, batches_per_second=1)
+
+    assert anyio.run(scheduler.sweep) == 0
+    assert due == ["user-1"] and calls["pages"] == []
+    assert scheduler.stats()["skippedNotLeader"] == 1
@@ -0,0 +1,103 @@
+import anyio
+import httpx
+import pytest
+
+from app.services import supabase
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Scripted Supabase responses; exceptions in the script are raised as transport errors."""
+    script, seen = [], []
+
+    def handler(request):
+        seen.append((request.method, request.url.path))
+        outcome = script.pop(0) if script else httpx.Response(200, json=[])
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://supabase")
+    monkeypatch.setattr(supabase, "get_http_client", lambda name: client)
+    monkeypatch.setattr(supabase, "backoff_delay", lambda attempt, base, cap: 0)
+    monkeypatch.setattr(supabase, "_circuit", CircuitBreaker(failure_threshold=2, reset_seconds=30))
+    supabase.invalidate_account_status("user-1")
+    return script, seen
+
+
+def test_circuit_opens_fails_fast_and_probes_once():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_after() == 10
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_idempotent_reads_retry_transient_failures(upstream):
+    script, seen = upstream
+    script += [
+        httpx.Response(503),
+        httpx.ReadTimeout("slow"),
+        httpx.Response(200, json=[{"status": "active", "plan": "pro", "current_period_end": None}]),
+    ]
+    row = anyio.run(supabase._first_row, "/rest/v1/subscriptions", "user-1", "status,plan")
+    assert row["status"] == "active"
+    assert len(seen) == 3
+
+
+def test_sent_writes_are_not_retried(upstream):
+    script, seen = upstream
+    script += [httpx.ReadTimeout("slow"), httpx.ConnectError("refused")]
+    with pytest.raises(supabase.SupabaseUnavailable):
+        anyio.run(supabase.deduct_tokens, "user-1", 5)
+    assert len(seen) == 1
+
+    # Never sent: safe to retry even though the call isn't idempotent
+    script += [httpx.ConnectError("refused"), httpx.Response(200, json=[{"success": True, "remaining_tokens": 3}])]
+    assert anyio.run(supabase.deduct_tokens, "user-1", 5)["success"] is True
+
+
+def test_failures_raise_instead_of_reading_as_free_and_open_the_circuit(upstream):
+    script, seen = upstream
+    script += [httpx.Response(500)] * 6
+
+    for _ in range(2):
+        with pytest.raises(supabase.SupabaseUnavailable):
+            anyio.run(supabase.fetch_subscription_status, "user-1")
+    calls = len(seen)
+
+    with pytest.raises(supabase.SupabaseUnavailable) as excinfo:
+        anyio.run(supabase.fetch_subscription_status, "user-1")
+    assert len(seen) == calls
+    assert excinfo.value.retry_after > 0
+
+    # A missing row is still a free user, and a 404 is not an outage
+    supabase._circuit.record_success()
+    script.clear()
+    assert anyio.run(supabase.fetch_subscription_status, "user-1")["status"] == "free"
+    script.append(httpx.Response(404, json={"message": "not found"}))
+    with pytest.raises(supabase.SupabaseNotFound):
+        anyio.run(supabase._rpc, "missing_function", {})
+    assert supabase._circuit.state == CLOSED
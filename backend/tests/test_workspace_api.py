@@ -0,0 +1,179 @@
+import os
+import time
+from types import SimpleNamespace
+
+import anyio
+import jwt
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.routers import payments, workspace
+from app.services import workspace_writes
+from app.services.workspace_writes import WorkspaceWriteBuffer
+
+
+def _auth_headers():
+    token = jwt.encode(
+        {"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakeStore:
+    def __init__(self):
+        self.calls = []
+        self.reads = 0
+        self.version = "2026-01-01T00:00:00+00:00"
+
+    async def fetch_workspace_version(self, user_id):
+        return self.version
+
+    async def fetch_workspace(self, user_id, fields=None):
+        self.reads += 1
+        workspace = {"profile": {"name": "Jane"}, "documentHistory": [], "careerChatHistory": [], "tokens": 5}
+        return {key: value for key, value in workspace.items() if fields is None or key in fields}
+
+    def record(self, name):
+        async def _call(*args):
+            self.calls.append((name,) + args)
+        return _call
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fake = FakeStore()
+    monkeypatch.setattr(workspace_writes, "fetch_workspace", fake.fetch_workspace)
+    monkeypatch.setattr(workspace, "fetch_workspace_version", fake.fetch_workspace_version)
+    monkeypatch.setattr(workspace, "replenish_is_due", lambda user_id: False)
+    for name in ("persist_workspace", "patch_profile", "add_documents", "remove_documents",
+                 "remove_chats", "append_chat_messages"):
+        monkeypatch.setattr(workspace_writes, name, fake.record(name))
+    monkeypatch.setattr(workspace_writes, "get_settings", lambda: SimpleNamespace(workspace_write_behind_enabled=True))
+    monkeypatch.setattr(workspace_writes, "_write_buffer", WorkspaceWriteBuffer(window_seconds=60, max_pending=50))
+    return fake
+
+
+def test_saves_are_acknowledged_coalesced_and_readable(store):
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            versions = []
+            for i in range(3):
+                resp = await client.post(
+                    "/api/workspace/chats/chat-1/messages",
+                    json={"title": "Plan", "messages": [{"id": f"m{i}", "role": "user", "content": str(i)}]},
+                )
+                versions.append(resp.json()["version"])
+            await client.post("/api/workspace/documents", json={"id": "doc-1", "jobTitle": "Engineer"})
+            await client.delete("/api/workspace/documents/doc-1")
+            await client.patch("/api/workspace/profile", json={"headline": "Builder"})
+            assert versions == sorted(versions)
+            assert store.calls == []
+
+            workspace = (await client.get("/api/workspace")).json()
+            assert workspace["profile"] == {"name": "Jane", "headline": "Builder"}
+            assert [m["id"] for m in workspace["careerChatHistory"][0]["messages"]] == ["m0", "m1", "m2"]
+            assert workspace["documentHistory"] == []
+
+        await workspace_writes.get_workspace_write_buffer().flush()
+
+    anyio.run(_run)
+    names = sorted(call[0] for call in store.calls)
+    assert names == ["append_chat_messages", "patch_profile", "remove_documents"]
+    append = next(call for call in store.calls if call[0] == "append_chat_messages")
+    assert [m["id"] for m in append[5]] == ["m0", "m1", "m2"]
+    stats = workspace_writes.get_workspace_write_buffer().stats()
+    assert stats["submitted"] == 6 and stats["upstreamWrites"] == 3 and stats["pendingOps"] == 0
+
+
+def test_document_without_id_is_rejected(store):
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            return await client.post("/api/workspace/documents", json={"jobTitle": "No id"})
+
+    assert anyio.run(_run).status_code == 422
+
+
+def test_unchanged_workspace_is_answered_with_304(store):
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            first = await client.get("/api/workspace")
+            etag = first.headers["etag"]
+            again = await client.get("/api/workspace", headers={"If-None-Match": etag})
+            assert again.status_code == 304 and store.reads == 1
+
+            await client.patch("/api/workspace/profile", json={"headline": "Builder"})
+            pending = await client.get("/api/workspace", headers={"If-None-Match": etag})
+            assert pending.status_code == 200 and pending.headers["etag"] != etag
+
+            await workspace_writes.get_workspace_write_buffer().flush()
+            store.version = "2026-01-01T00:00:05+00:00"
+            flushed = await client.get("/api/workspace", headers={"If-None-Match": pending.headers["etag"]})
+            assert flushed.status_code == 200
+
+    anyio.run(_run)
+
+
+def test_payment_status_supports_conditional_get(monkeypatch):
+    async def status(user_id):
+        return {"status": "active", "plan": "pro", "tokens": 200}
+
+    monkeypatch.setattr(payments, "fetch_subscription_status", status)
+
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            first = await client.get("/api/payments/status")
+            again = await client.get("/api/payments/status", headers={"If-None-Match": first.headers["etag"]})
+        assert first.status_code == 200 and first.json()["plan"] == "pro"
+        assert again.status_code == 304 and again.content == b""
+
+    anyio.run(_run)
+
+
+def test_field_projection(store):
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            await client.patch("/api/workspace/profile", json={"headline": "Builder"})
+            narrow = await client.get("/api/workspace", params={"fields": "profile"})
+            bad = await client.get("/api/workspace", params={"fields": "profile,secrets"})
+        assert narrow.json() == {"profile": {"name": "Jane", "headline": "Builder"}}
+        assert bad.status_code == 400
+
+    anyio.run(_run)
+
+
+def test_writes_that_keep_failing_are_held_and_reported(store, monkeypatch):
+    outage = [True]
+
+    async def patch_profile(user_id, patch):
+        if outage[0]:
+            raise RuntimeError("Supabase is down")
+        store.calls.append(("patch_profile", user_id, patch))
+
+    monkeypatch.setattr(workspace_writes, "patch_profile", patch_profile)
+    buffer = workspace_writes._write_buffer
+
+    async def _run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", headers=_auth_headers()) as client:
+            await client.patch("/api/workspace/profile", json={"headline": "Builder"})
+            for _ in range(workspace_writes.MAX_FLUSH_ATTEMPTS):
+                await buffer.flush_user("user-123")
+            assert buffer.failure("user-123") and buffer.stats()["stalledUsers"] == 1
+
+            held = (await client.get("/api/workspace")).json()
+            assert held["saveError"] and held["profile"]["headline"] == "Builder"
+
+            outage[0] = False
+            recovered = (await client.get("/api/workspace")).json()
+            assert "saveError" not in recovered
+            assert store.calls == [("patch_profile", "user-123", {"headline": "Builder"})]
+
+    anyio.run(_run)
@@ -0,0 +1,265 @@
+import base64
+import gzip
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import anyio
+import httpx
+import pytest
+
+from app.services import supabase
+from app.services.serialization import loads
+
+
+@pytest.fixture
+def fake_workspace(monkeypatch):
+    calls = {"select": 0, "replenish": 0}
+    row = {
+        "profile": None,
+        "tokens": 7,
+        "tokens_replenished_at": (datetime.now(timezone.utc) - timedelta(days=3)).isoformat(),
+        "rolled_over_tokens": 0,
+    }
+    replenish_result = {"newTokens": 7, "wasReplenished": False}
+
+    async def select(user_id, columns):
+        calls["select"] += 1
+        return dict(row)
+
+    async def replenish(user_id):
+        calls["replenish"] += 1
+        return dict(replenish_result)
+
+    async def no_items(user_id):
+        return []
+
+    monkeypatch.setattr(supabase, "_select_workspace", select)
+    monkeypatch.setattr(supabase, "_select_documents", no_items)
+    monkeypatch.setattr(supabase, "_select_chats", no_items)
+    monkeypatch.setattr(supabase, "replenish_tokens_if_due", replenish)
+    monkeypatch.setattr(supabase, "get_settings", lambda: SimpleNamespace(token_replenish_scheduler_enabled=False))
+    supabase._replenish_due.clear()
+    return calls, row, replenish_result
+
+
+def test_replenish_rpc_is_skipped_until_due(fake_workspace):
+    calls, _, _ = fake_workspace
+
+    async def _run():
+        for _ in range(3):
+            workspace = await supabase.fetch_workspace("user-1")
+            assert workspace["tokens"] == 7
+
+    anyio.run(_run)
+    assert calls == {"select": 3, "replenish": 1}
+
+
+def test_due_replenishment_overrides_stale_read(fake_workspace):
+    calls, row, replenish_result = fake_workspace
+    row["tokens_replenished_at"] = (datetime.now(timezone.utc) - timedelta(days=31)).isoformat()
+    replenish_result.update(newTokens=57, wasReplenished=True)
+
+    workspace = anyio.run(supabase.fetch_workspace, "user-1")
+    assert workspace["tokens"] == 57
+
+    anyio.run(supabase.fetch_workspace, "user-1")
+    assert calls["replenish"] == 1
+
+
+def test_reads_leave_replenishment_to_the_scheduler_when_it_runs(fake_workspace, monkeypatch):
+    calls, _, _ = fake_workspace
+    monkeypatch.setattr(supabase, "get_settings", lambda: SimpleNamespace(token_replenish_scheduler_enabled=True))
+    anyio.run(supabase.fetch_workspace, "user-1")
+    assert calls == {"select": 1, "replenish": 0}
+
+
+def test_status_reads_share_one_concurrent_fetch(monkeypatch):
+    reads = []
+
+    async def first_row(path, user_id, select):
+        reads.append(path)
+        await anyio.sleep(0.01)
+        if path.endswith("subscriptions"):
+            return {"status": "active", "plan": "pro", "current_period_end": None}
+        return {"tokens": 120, "tokens_replenished_at": None, "rolled_over_tokens": 0}
+
+    monkeypatch.setattr(supabase, "_first_row", first_row)
+    supabase.invalidate_account_status("user-1")
+
+    async def _run():
+        results = {}
+
+        async def load(name, fn):
+            results[name] = await fn("user-1")
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(load, "status", supabase.fetch_subscription_status)
+            tg.start_soon(load, "tokens", supabase.get_token_status)
+        return results
+
+    results = anyio.run(_run)
+    assert sorted(reads) == ["/rest/v1/subscriptions", "/rest/v1/workspaces"]
+    assert results["status"]["tokens"] == supabase.PAID_PLAN_TOKENS
+    assert results["tokens"]["tokens"] == 120
+
+    supabase.invalidate_account_status("user-1")
+    anyio.run(supabase.get_token_status, "user-1")
+    assert len(reads) == 4
+
+
+def test_full_save_reconciles_history_tables(monkeypatch):
+    rpcs, rows = [], []
+
+    async def rpc(name, params, timeout=15):
+        rpcs.append((name, params))
+
+    async def upsert_row(payload):
+        rows.append(payload)
+
+    monkeypatch.setattr(supabase, "_rpc", rpc)
+    monkeypatch.setattr(supabase, "_upsert_workspace_row", upsert_row)
+
+    anyio.run(
+        supabase.persist_workspace,
+        "user-1",
+        {"name": "Jane"},
+        [{"id": "doc-1", "generatedAt": "2026-01-01T00:00:00Z"}],
+        None,
+        None,
+    )
+    assert rows == [{"user_id": "user-1", "profile": {"name": "Jane"}}]
+    assert [name for name, _ in rpcs] == ["replace_workspace_documents"]
+    assert rpcs[0][1]["p_documents"][0]["id"] == "doc-1"
+
+
+def test_snapshot_absorbs_later_deltas():
+    from app.services.workspace_writes import (
+        CHAT_APPEND, DOCUMENT_ADD, DOCUMENT_REMOVE, PROFILE_PATCH, SNAPSHOT, WriteBatch,
+    )
+
+    batch = WriteBatch.coalesce([
+        (SNAPSHOT, {"profile": {"name": "Jane"}, "documentHistory": [{"id": "a"}, {"id": "b"}],
+                    "careerChatHistory": None, "tokens": None}),
+        (PROFILE_PATCH, {"headline": "Builder"}),
+        (DOCUMENT_ADD, {"id": "c"}),
+        (DOCUMENT_REMOVE, "a"),
+        (CHAT_APPEND, {"chatId": "x", "title": None, "timestamp": None,
+                       "messages": [{"id": "m1", "role": "user", "content": "hi"}]}),
+    ])
+    assert batch.profile == {"name": "Jane", "headline": "Builder"}
+    assert [doc["id"] for doc in batch.documents] == ["c", "b"]
+    assert not batch.document_upserts and not batch.document_removals
+    assert list(batch.chat_appends) == ["x"]
+
+
+def test_projected_read_skips_history(monkeypatch):
+    columns_seen = []
+
+    async def select(user_id, columns):
+        columns_seen.append(list(columns))
+        return {"profile": {"name": "Jane"}}
+
+    async def history(user_id):
+        raise AssertionError("history tables should not be read")
+
+    monkeypatch.setattr(supabase, "_select_workspace", select)
+    monkeypatch.setattr(supabase, "_select_documents", history)
+    monkeypatch.setattr(supabase, "_select_chats", history)
+
+    workspace = anyio.run(lambda: supabase.fetch_workspace("user-1", fields={"profile"}))
+    assert workspace == {"profile": {"name": "Jane"}}
+    assert columns_seen == [["profile"]]
+
+
+def test_document_pages_follow_keyset_cursor(monkeypatch):
+    rows = [
+        {"data": {"id": f"doc-{i}"}, "seq": i, "generated_at": f"2026-01-0{i}T00:00:00+00:00"}
+        for i in range(5, 0, -1)
+    ]
+    requests = []
+
+    def handler(request):
+        requests.append(dict(request.url.params))
+        limit = int(request.url.params["limit"])
+        start = 0
+        if "or" in request.url.params:
+            start = next(i for i, row in enumerate(rows) if row["generated_at"] in request.url.params["or"]) + 1
+        return httpx.Response(200, json=rows[start:start + limit])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://supabase")
+    monkeypatch.setattr(supabase, "get_http_client", lambda name: client)
+
+    async def _run():
+        first, cursor = await supabase.fetch_documents_page("user-1", limit=2)
+        second, cursor2 = await supabase.fetch_documents_page("user-1", limit=2, cursor=cursor)
+        third, cursor3 = await supabase.fetch_documents_page("user-1", limit=2, cursor=cursor2)
+        return first, second, third, cursor3
+
+    first, second, third, last_cursor = anyio.run(_run)
+    assert [d["id"] for d in first + second + third] == ["doc-5", "doc-4", "doc-3", "doc-2", "doc-1"]
+    assert last_cursor is None
+    assert requests[0]["order"] == "generated_at.desc,seq.desc"
+
+    for cursor in ("not-a-cursor", supabase.encode_cursor("yesterday", 1), supabase.encode_cursor('2026-01-01")', 1)):
+        with pytest.raises(ValueError):
+            supabase.decode_cursor(cursor)
+
+
+def test_document_bodies_are_deduplicated_and_loaded_lazily(monkeypatch):
+    resume = "# Jane Doe\n\n" + "Shipped things. " * 200
+    stored, saved = {}, []
+
+    async def rpc(name, params, timeout=15):
+        assert name == "put_document_bodies"
+        for body in params["p_bodies"]:
+            stored[body["hash"]] = body
+
+    def handler(request):
+        if request.method == "POST":
+            saved.extend(loads(request.content))
+            return httpx.Response(201)
+        rows = [
+            {"hash": b["hash"], "encoding": b["encoding"], "body": "\\x" + base64.b64decode(b["body"]).hex()}
+            for b in stored.values()
+            if b["hash"] in request.url.params["hash"]
+        ]
+        return httpx.Response(200, json=rows)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://supabase")
+    monkeypatch.setattr(supabase, "_rpc", rpc)
+    monkeypatch.setattr(supabase, "get_http_client", lambda name: client)
+
+    documents = [
+        {"id": "doc-1", "jobTitle": "Engineer", "resumeContent": resume, "coverLetterContent": None},
+        {"id": "doc-2", "jobTitle": "Engineer", "resumeContent": resume, "coverLetterContent": "Dear team"},
+    ]
+    anyio.run(supabase.add_documents, "user-1", documents)
+
+    assert len(stored) == 2
+    resume_body = max(stored.values(), key=lambda b: b["size"])
+    assert resume_body["encoding"] != "identity"
+    assert len(base64.b64decode(resume_body["body"])) < resume_body["size"] // 10
+    assert all("resumeContent" not in row["data"] for row in saved)
+    assert saved[0]["data"]["bodies"]["resumeContent"] == saved[1]["data"]["bodies"]["resumeContent"]
+    assert "coverLetterContent" not in saved[0]["data"]["bodies"]
+
+    document = anyio.run(supabase.load_document_bodies, "user-1", saved[1]["data"])
+    assert document["resumeContent"] == resume
+    assert document["coverLetterContent"] == "Dear team"
+
+
+def test_document_codec_round_trips_and_keeps_refs_for_metadata_entries():
+    from app.services import document_store
+
+    for encoding, data in [
+        document_store.compress_body(b"x" * 1000),
+        (document_store.GZIP, gzip.compress(b"x" * 1000)),
+        document_store.compress_body(b"{}"),
+    ]:
+        assert document_store.decompress_body(encoding, data) in (b"x" * 1000, b"{}")
+    assert document_store.compress_body(b"{}")[0] == document_store.IDENTITY
+
+    entry, bodies = document_store.split_document({"id": "doc-1", "parsedResume": {"name": "Jane"}})
+    assert list(entry) == ["id", "bodies"] and len(bodies) == 1
+    # A metadata-only entry sent back in a snapshot keeps its refs and uploads nothing
+    assert document_store.split_document(entry) == (entry, {})
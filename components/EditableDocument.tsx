@@ -15,6 +15,7 @@ interface EditableDocumentProps {
   structuredContent?: Partial<ProfileData> | ParsedCoverLetter | null;
   tokens: number;
   setTokens: React.Dispatch<React.SetStateAction<number>>;
+  template?: string;
 }
 
 interface HistoryState {
@@ -22,7 +23,7 @@ interface HistoryState {
   sectionOrder: string[];
 }
 
-const EditableDocument: React.FC<EditableDocumentProps> = ({ documentType, initialContent, onSave, structuredContent, tokens, setTokens }) => {
+const EditableDocument: React.FC<EditableDocumentProps> = ({ documentType, initialContent, onSave, structuredContent, tokens, setTokens, template }) => {
   const [editedContent, setEditedContent] = useState(initialContent);
   const [formData, setFormData] = useState<Partial<ProfileData> | ParsedCoverLetter | null | undefined>(structuredContent);
   const [sectionOrder, setSectionOrder] = useState<string[]>([]);
@@ -111,7 +112,7 @@ const EditableDocument: React.FC<EditableDocumentProps> = ({ documentType, initi
     const filename = `keju_${documentType}_${new Date().toISOString().split('T')[0]}.pdf`;
 
     try {
-        await downloadResumePdf(markdown, filename);
+        await downloadResumePdf(markdown, filename, template);
     } catch (err: any) {
         console.error('Failed to download PDF', err);
         setDownloadError(err?.message || 'PDF download failed. Please try again.');
@@ -1,7 +1,16 @@
 import React, { createContext, useState, useEffect, useCallback, useMemo } from 'react';
-import type { ProfileData, DocumentGeneration, BackgroundTask, ApplicationAnalysisResult, ParsedCoverLetter, CareerChatSummary } from '../types';
+import type { ProfileData, DocumentGeneration, BackgroundTask, ApplicationAnalysisResult, ParsedCoverLetter, CareerChatSummary, ChatMessage } from '../types';
 import { importAndParseResume } from '../services/parserService';
-import { fetchWorkspace, persistWorkspace, fetchSubscriptionStatus } from '../services/workspaceService';
+import {
+  fetchWorkspace,
+  persistWorkspace,
+  fetchSubscriptionStatus,
+  patchProfile,
+  saveDocument,
+  deleteDocument,
+  appendChatMessages,
+  deleteChat,
+} from '../services/workspaceService';
 import { supabase } from '../services/supabaseClient';
 
 const createNewProfile = (name: string): ProfileData => {
@@ -73,6 +82,12 @@ export const ProfileContext = createContext<{
 
 const AUTOSAVE_INTERVAL = 120 * 1000; // 2 minutes
 
+// Messages that are new or edited relative to the previously saved chat
+const changedChatMessages = (previous: CareerChatSummary | undefined, messages: ChatMessage[]): ChatMessage[] => {
+  const saved = new Map((previous?.messages ?? []).map(m => [m.id, m.content]));
+  return messages.filter(m => saved.get(m.id) !== m.content);
+};
+
 export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (msg: string) => void }> = ({ children, onToast }) => {
   const [profile, setProfile] = useState<ProfileData | null>(null);
   const [lastSavedProfile, setLastSavedProfile] = useState<ProfileData | null>(null);
@@ -86,6 +101,9 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         if (hasSession) {
           try {
             const workspace = await fetchWorkspace();
+            if (workspace.saveError) {
+              onToast(workspace.saveError);
+            }
             let subTokens: number | undefined;
             try {
               const sub = await fetchSubscriptionStatus();
@@ -179,12 +197,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
           try {
             const session = await supabase?.auth.getSession();
             if (session?.data.session) {
-              await persistWorkspace({
-                profile: profile ?? null,
-                documentHistory,
-                careerChatHistory,
-                tokens: nextValue,
-              });
+              await persistWorkspace({ tokens: nextValue });
             }
           } catch (e) {
             console.warn("Failed to sync tokens", e);
@@ -192,7 +205,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         })();
         return nextValue;
     });
-  }, [profile, documentHistory, careerChatHistory]);
+  }, []);
 
   const [backgroundTasks, setBackgroundTasks] = useState<BackgroundTask[]>(() => {
     try {
@@ -217,12 +230,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
           try {
             const session = await supabase?.auth.getSession();
             if (session?.data.session) {
-              await persistWorkspace({
-                profile,
-                documentHistory,
-                careerChatHistory,
-                tokens,
-              });
+              await patchProfile(profile);
             }
           } catch (e) {
             console.warn("Failed to sync workspace", e);
@@ -234,7 +242,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         console.error("Failed to save profile", error);
         return false;
     }
-  }, [profile, documentHistory, careerChatHistory, tokens]);
+  }, [profile]);
 
   const addDocumentToHistory = useCallback((generation: { jobTitle: string; companyName: string; resumeContent: string | null; coverLetterContent: string | null; analysisResult: ApplicationAnalysisResult | null; parsedResume: Partial<ProfileData> | null; parsedCoverLetter: ParsedCoverLetter | null; }) => {
     setDocumentHistory(prevHistory => {
@@ -243,19 +251,17 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
             id: crypto.randomUUID(),
             generatedAt: new Date().toISOString(),
         };
-        const updatedHistory = [newGeneration, ...prevHistory].slice(0, 20);
+        const nextHistory = [newGeneration, ...prevHistory];
+        const updatedHistory = nextHistory.slice(0, 20);
+        const evicted = nextHistory.slice(20);
         try {
             localStorage.setItem('documentHistory', JSON.stringify(updatedHistory));
             void (async () => {
               try {
                 const session = await supabase?.auth.getSession();
                 if (session?.data.session) {
-                  await persistWorkspace({
-                    profile: profile ?? null,
-                    documentHistory: updatedHistory,
-                    careerChatHistory,
-                    tokens,
-                  });
+                  await saveDocument(newGeneration);
+                  await Promise.all(evicted.map(doc => deleteDocument(doc.id)));
                 }
               } catch (e) {
                 console.warn("Failed to sync document history", e);
@@ -266,7 +272,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         }
         return updatedHistory;
     });
-  }, [profile, careerChatHistory, tokens]);
+  }, []);
 
   const removeDocument = useCallback((documentId: string) => {
     setDocumentHistory(prevHistory => {
@@ -277,12 +283,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
               try {
                 const session = await supabase?.auth.getSession();
                 if (session?.data.session) {
-                  await persistWorkspace({
-                    profile: profile ?? null,
-                    documentHistory: updatedHistory,
-                    careerChatHistory,
-                    tokens,
-                  });
+                  await deleteDocument(documentId);
                 }
               } catch (e) {
                 console.warn("Failed to sync document history", e);
@@ -293,20 +294,24 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         }
         return updatedHistory;
     });
-  }, [profile, careerChatHistory, tokens]);
+  }, []);
   
   const addCareerChatSummary = useCallback((summary: CareerChatSummary) => {
     setCareerChatHistory(prevHistory => {
         // Check if chat with same ID exists - update it instead of adding new
         const existingIndex = prevHistory.findIndex(c => c.id === summary.id);
         let updatedHistory: CareerChatSummary[];
+        let evicted: CareerChatSummary[] = [];
         
         if (existingIndex >= 0) {
             updatedHistory = [...prevHistory];
             updatedHistory[existingIndex] = summary;
         } else {
-            updatedHistory = [summary, ...prevHistory].slice(0, 20);
+            const nextHistory = [summary, ...prevHistory];
+            updatedHistory = nextHistory.slice(0, 20);
+            evicted = nextHistory.slice(20);
         }
+        const changedMessages = changedChatMessages(prevHistory[existingIndex], summary.messages);
         
         try {
             localStorage.setItem('careerChatHistory', JSON.stringify(updatedHistory));
@@ -314,12 +319,12 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
               try {
                 const session = await supabase?.auth.getSession();
                 if (session?.data.session) {
-                  await persistWorkspace({
-                    profile: profile ?? null,
-                    documentHistory,
-                    careerChatHistory: updatedHistory,
-                    tokens,
+                  await appendChatMessages(summary.id, {
+                    title: summary.title,
+                    timestamp: summary.timestamp,
+                    messages: changedMessages,
                   });
+                  await Promise.all(evicted.map(chat => deleteChat(chat.id)));
                 }
               } catch (e) {
                 console.warn("Failed to sync chat history", e);
@@ -330,7 +335,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         }
         return updatedHistory;
     });
-  }, [profile, documentHistory, tokens]);
+  }, []);
 
   const updateCareerChat = useCallback((chatId: string, messages: CareerChatSummary['messages']) => {
     setCareerChatHistory(prevHistory => {
@@ -338,11 +343,13 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         if (chatIndex < 0) return prevHistory;
         
         const updatedHistory = [...prevHistory];
+        const timestamp = new Date().toISOString();
         updatedHistory[chatIndex] = {
             ...updatedHistory[chatIndex],
             messages,
-            timestamp: new Date().toISOString(),
+            timestamp,
         };
+        const changedMessages = changedChatMessages(prevHistory[chatIndex], messages);
         
         try {
             localStorage.setItem('careerChatHistory', JSON.stringify(updatedHistory));
@@ -350,12 +357,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
               try {
                 const session = await supabase?.auth.getSession();
                 if (session?.data.session) {
-                  await persistWorkspace({
-                    profile: profile ?? null,
-                    documentHistory,
-                    careerChatHistory: updatedHistory,
-                    tokens,
-                  });
+                  await appendChatMessages(chatId, { timestamp, messages: changedMessages });
                 }
               } catch (e) {
                 console.warn("Failed to sync chat history", e);
@@ -366,7 +368,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         }
         return updatedHistory;
     });
-  }, [profile, documentHistory, tokens]);
+  }, []);
 
   const getChatById = useCallback((chatId: string): CareerChatSummary | undefined => {
     return careerChatHistory.find(c => c.id === chatId);
@@ -381,12 +383,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
               try {
                 const session = await supabase?.auth.getSession();
                 if (session?.data.session) {
-                  await persistWorkspace({
-                    profile: profile ?? null,
-                    documentHistory,
-                    careerChatHistory: updatedHistory,
-                    tokens,
-                  });
+                  await deleteChat(chatId);
                 }
               } catch (e) {
                 console.warn("Failed to sync chat history", e);
@@ -397,7 +394,7 @@ export const ProfileProvider: React.FC<{ children: React.ReactNode; onToast: (ms
         }
         return updatedHistory;
     });
-  }, [profile, documentHistory, tokens]);
+  }, []);
 
   const parseResumeInBackground = useCallback((file: File) => {
     if (!file || !profile) return;
@@ -0,0 +1,96 @@
+-- Compressed, content-addressed document bodies (backend/app/services/document_store.py)
+--
+-- Document history entries in workspace_documents.data keep only metadata plus
+-- a "bodies" map of {field: sha256}. The resume/cover letter markdown, analysis
+-- and parsed copies live here once per user and distinct value, compressed by
+-- the backend (zstd, or gzip without it). Run after WorkspaceHistory.sql.
+
+create table if not exists public.document_bodies (
+  user_id uuid not null references auth.users (id) on delete cascade,
+  hash text not null,
+  encoding text not null check (encoding in ('identity', 'gzip', 'zstd')),
+  size integer not null,
+  body bytea not null,
+  last_used_at timestamptz not null default timezone('utc', now()),
+  primary key (user_id, hash)
+);
+
+alter table public.document_bodies enable row level security;
+
+create policy "document body owner read" on public.document_bodies
+  for select using (auth.uid() = user_id);
+create policy "service role document bodies" on public.document_bodies
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+-- Store bodies that aren't there yet; existing ones are only marked as used.
+-- p_bodies: [{"hash", "encoding", "size", "body" (base64)}, ...]
+create or replace function public.put_document_bodies(p_user_id uuid, p_bodies jsonb)
+returns void
+language sql
+security definer
+as $$
+  insert into public.document_bodies as b (user_id, hash, encoding, size, body)
+  select p_user_id, e->>'hash', e->>'encoding', (e->>'size')::integer, decode(e->>'body', 'base64')
+    from jsonb_array_elements(coalesce(p_bodies, '[]'::jsonb)) e
+   where e->>'hash' is not null
+  on conflict (user_id, hash) do update
+     set last_used_at = timezone('utc', now());
+$$;
+
+-- Delete bodies no history entry references. The grace period covers bodies
+-- uploaded just before the entry that references them is saved.
+create or replace function public.prune_document_bodies(p_grace interval default interval '1 day')
+returns integer
+language plpgsql
+security definer
+as $$
+declare
+  pruned integer;
+begin
+  delete from public.document_bodies b
+   where b.last_used_at < timezone('utc', now()) - p_grace
+     and not exists (
+       select 1
+         from public.workspace_documents d,
+              jsonb_each_text(coalesce(d.data->'bodies', '{}'::jsonb)) r
+        where d.user_id = b.user_id
+          and r.value = b.hash
+     );
+  get diagnostics pruned = row_count;
+  return pruned;
+end;
+$$;
+
+-- Nightly, with pg_cron enabled:
+-- select cron.schedule('prune-document-bodies', '17 3 * * *', 'select public.prune_document_bodies()');
+
+-- One-time backfill: move inline bodies out of existing entries. They're stored
+-- uncompressed ('identity') and hashed over Postgres' JSON text, so they may not
+-- deduplicate against later uploads of the same content; reads are unaffected.
+insert into public.document_bodies (user_id, hash, encoding, size, body)
+select distinct on (d.user_id, encode(sha256(convert_to(f.value::text, 'UTF8')), 'hex'))
+       d.user_id,
+       encode(sha256(convert_to(f.value::text, 'UTF8')), 'hex'),
+       'identity',
+       octet_length(convert_to(f.value::text, 'UTF8')),
+       convert_to(f.value::text, 'UTF8')
+  from public.workspace_documents d
+  cross join lateral jsonb_each(d.data) f
+ where f.key in ('resumeContent', 'coverLetterContent', 'analysisResult', 'parsedResume', 'parsedCoverLetter')
+   and jsonb_typeof(f.value) <> 'null'
+on conflict (user_id, hash) do nothing;
+
+update public.workspace_documents d
+   set data = (d.data - array['resumeContent', 'coverLetterContent', 'analysisResult', 'parsedResume', 'parsedCoverLetter'])
+              || jsonb_build_object('bodies', coalesce(d.data->'bodies', '{}'::jsonb) || refs.bodies)
+  from (
+    select i.user_id, i.id,
+           jsonb_object_agg(f.key, encode(sha256(convert_to(f.value::text, 'UTF8')), 'hex')) as bodies
+      from public.workspace_documents i
+      cross join lateral jsonb_each(i.data) f
+     where f.key in ('resumeContent', 'coverLetterContent', 'analysisResult', 'parsedResume', 'parsedCoverLetter')
+       and jsonb_typeof(f.value) <> 'null'
+     group by i.user_id, i.id
+  ) refs
+ where d.user_id = refs.user_id
+   and d.id = refs.id;
@@ -0,0 +1,132 @@
+-- Server-side token metering with leased balances (backend/app/services/metering.py)
+--
+-- The backend leases a block of a user's tokens, debits locally, and reports
+-- cumulative usage per lease in batches. Leased tokens are removed from
+-- workspaces.tokens up front, so instances can never overspend a balance.
+--
+-- Metering is off by default; apply this file before setting
+-- TOKEN_METERING_ENABLED=true, or every paid endpoint fails.
+
+create table if not exists public.token_leases (
+  id uuid primary key default gen_random_uuid(),
+  user_id uuid not null references auth.users (id) on delete cascade,
+  granted integer not null check (granted >= 0),
+  consumed integer not null default 0 check (consumed >= 0),
+  released boolean not null default false,
+  expires_at timestamptz not null,
+  created_at timestamptz not null default timezone('utc', now())
+);
+
+create index if not exists token_leases_open_idx
+  on public.token_leases (expires_at) where not released;
+
+alter table public.token_leases enable row level security;
+
+create policy "service role leases" on public.token_leases
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+-- Refund unused tokens of expired leases (instances that died without releasing).
+create or replace function public.settle_expired_token_leases(p_user_id uuid default null)
+returns integer
+language plpgsql
+security definer
+as $$
+declare
+  settled integer;
+begin
+  with expired as (
+    update public.token_leases
+       set released = true
+     where not released
+       and expires_at <= now()
+       and (p_user_id is null or user_id = p_user_id)
+    returning user_id, greatest(granted - consumed, 0) as unused
+  ), refunds as (
+    select user_id, sum(unused) as unused from expired group by user_id
+  )
+  update public.workspaces w
+     set tokens = w.tokens + r.unused
+    from refunds r
+   where w.user_id = r.user_id;
+  get diagnostics settled = row_count;
+  return settled;
+end;
+$$;
+
+create or replace function public.acquire_token_lease(
+  p_user_id uuid,
+  p_amount integer,
+  p_ttl_seconds integer
+)
+returns table (lease_id uuid, granted integer, remaining_tokens integer, expires_at timestamptz)
+language plpgsql
+security definer
+as $$
+declare
+  v_balance integer;
+  v_granted integer;
+  v_lease_id uuid;
+  v_expires_at timestamptz := now() + make_interval(secs => p_ttl_seconds);
+begin
+  perform public.settle_expired_token_leases(p_user_id);
+
+  select tokens into v_balance
+    from public.workspaces
+   where user_id = p_user_id
+   for update;
+
+  v_granted := greatest(least(coalesce(v_balance, 0), p_amount), 0);
+  if v_granted = 0 then
+    return query select null::uuid, 0, coalesce(v_balance, 0), null::timestamptz;
+    return;
+  end if;
+
+  update public.workspaces
+     set tokens = tokens - v_granted
+   where user_id = p_user_id;
+
+  insert into public.token_leases (user_id, granted, expires_at)
+  values (p_user_id, v_granted, v_expires_at)
+  returning id into v_lease_id;
+
+  return query select v_lease_id, v_granted, v_balance - v_granted, v_expires_at;
+end;
+$$;
+
+-- p_usages: [{"lease_id": uuid, "consumed": int, "release": bool}, ...]
+-- `consumed` is the lease's absolute total, so replaying a batch is idempotent.
+create or replace function public.report_token_usage(p_usages jsonb)
+returns void
+language plpgsql
+security definer
+as $$
+declare
+  item jsonb;
+  v_lease public.token_leases%rowtype;
+  v_consumed integer;
+begin
+  for item in select * from jsonb_array_elements(p_usages) loop
+    select * into v_lease
+      from public.token_leases
+     where id = (item->>'lease_id')::uuid
+     for update;
+
+    if not found or v_lease.released then
+      continue;
+    end if;
+
+    v_consumed := least(greatest((item->>'consumed')::integer, 0), v_lease.granted);
+
+    update public.token_leases
+       set consumed = v_consumed,
+           released = coalesce((item->>'release')::boolean, false)
+     where id = v_lease.id;
+
+    if coalesce((item->>'release')::boolean, false) then
+      update public.workspaces
+         set tokens = tokens + (v_lease.granted - v_consumed)
+       where user_id = v_lease.user_id;
+    end if;
+  end loop;
+end;
+$$;
@@ -0,0 +1,87 @@
+-- Batched token replenishment and scheduler leases (backend/app/services/replenishment.py)
+--
+-- Replaces the per-user replenish_user_tokens RPC on workspace reads. One
+-- backend instance at a time (holding the 'token_replenishment' lease) pages
+-- through due users with replenish_due_tokens. Amounts match get_token_status:
+-- 200 base / 200 max rollover for active subscriptions, 50 / 50 otherwise.
+--
+-- The scheduler is off by default and workspace reads keep replenishing.
+-- Apply this file, on instances with always-on CPU (or schedule the pg_cron
+-- job below), before setting TOKEN_REPLENISH_SCHEDULER_ENABLED=true.
+
+create index if not exists workspaces_replenish_due_idx
+  on public.workspaces (tokens_replenished_at);
+
+-- Replenish up to p_limit due users with user_id > p_after, in user_id order.
+-- Rows locked by a concurrent sweep are skipped rather than waited for.
+create or replace function public.replenish_due_tokens(p_limit integer, p_after uuid default null)
+returns table (user_id uuid, new_tokens integer, rolled_over_tokens integer)
+language sql
+security definer
+as $$
+  with due as (
+    select w.user_id
+      from public.workspaces w
+     where (w.tokens_replenished_at is null
+            or w.tokens_replenished_at <= timezone('utc', now()) - interval '30 days')
+       and (p_after is null or w.user_id > p_after)
+     order by w.user_id
+     limit p_limit
+       for update skip locked
+  ), plans as (
+    select d.user_id,
+           case when s.status = 'active' then 200 else 50 end as base_tokens,
+           case when s.status = 'active' then 200 else 50 end as max_rollover
+      from due d
+      left join public.subscriptions s on s.user_id = d.user_id
+  )
+  update public.workspaces w
+     set rolled_over_tokens = least(greatest(coalesce(w.tokens, 0), 0), p.max_rollover),
+         tokens = p.base_tokens + least(greatest(coalesce(w.tokens, 0), 0), p.max_rollover),
+         tokens_replenished_at = timezone('utc', now())
+    from plans p
+   where w.user_id = p.user_id
+  returning w.user_id, w.tokens, w.rolled_over_tokens;
+$$;
+
+-- Named leader leases for background jobs.
+create table if not exists public.scheduler_leases (
+  name text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+alter table public.scheduler_leases enable row level security;
+
+create policy "service role scheduler leases" on public.scheduler_leases
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+-- Take the lease if it's free or expired, or extend it if p_holder already has it.
+create or replace function public.try_acquire_scheduler_lease(p_name text, p_holder text, p_ttl_seconds integer)
+returns boolean
+language sql
+security definer
+as $$
+  with acquired as (
+    insert into public.scheduler_leases as l (name, holder, expires_at)
+    values (p_name, p_holder, now() + make_interval(secs => p_ttl_seconds))
+    on conflict (name) do update
+       set holder = excluded.holder,
+           expires_at = excluded.expires_at
+     where l.holder = excluded.holder
+        or l.expires_at <= now()
+    returning 1
+  )
+  select exists (select 1 from acquired);
+$$;
+
+create or replace function public.release_scheduler_lease(p_name text, p_holder text)
+returns void
+language sql
+security definer
+as $$
+  delete from public.scheduler_leases where name = p_name and holder = p_holder;
+$$;
+
+-- Without an always-on backend instance, sweep from the database instead:
+-- select cron.schedule('replenish-due-tokens', '*/5 * * * *', 'select count(*) from public.replenish_due_tokens(100000)');
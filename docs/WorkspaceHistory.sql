@@ -0,0 +1,250 @@
+-- Row-per-item workspace histories (backend/app/services/supabase.py)
+--
+-- Document and career-chat history used to live in the workspaces.document_history
+-- and workspaces.career_chat_history JSON columns, rewritten in full on every save.
+-- Each document, chat and chat message is now its own row, so appending a chat turn
+-- or adding/removing a document touches only that item. Run the backfill at the end
+-- once; the legacy columns are no longer read or written afterwards.
+
+create table if not exists public.workspace_documents (
+  user_id uuid not null references auth.users (id) on delete cascade,
+  id text not null,
+  seq bigint generated always as identity,
+  generated_at timestamptz not null default timezone('utc', now()),
+  data jsonb not null,
+  primary key (user_id, id)
+);
+
+create index if not exists workspace_documents_order_idx
+  on public.workspace_documents (user_id, generated_at desc, seq desc);
+
+create table if not exists public.workspace_chats (
+  user_id uuid not null references auth.users (id) on delete cascade,
+  id text not null,
+  seq bigint generated always as identity,
+  title text not null default '',
+  updated_at timestamptz not null default timezone('utc', now()),
+  primary key (user_id, id)
+);
+
+create index if not exists workspace_chats_order_idx
+  on public.workspace_chats (user_id, updated_at desc, seq desc);
+
+create table if not exists public.workspace_chat_messages (
+  user_id uuid not null,
+  chat_id text not null,
+  id text not null,
+  seq bigint generated always as identity,
+  role text not null,
+  content text not null default '',
+  "timestamp" text,
+  primary key (user_id, chat_id, id),
+  foreign key (user_id, chat_id)
+    references public.workspace_chats (user_id, id) on delete cascade
+);
+
+create index if not exists workspace_chat_messages_order_idx
+  on public.workspace_chat_messages (user_id, chat_id, seq);
+
+alter table public.workspace_documents enable row level security;
+alter table public.workspace_chats enable row level security;
+alter table public.workspace_chat_messages enable row level security;
+
+create policy "document owner read" on public.workspace_documents
+  for select using (auth.uid() = user_id);
+create policy "service role documents" on public.workspace_documents
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+create policy "chat owner read" on public.workspace_chats
+  for select using (auth.uid() = user_id);
+create policy "service role chats" on public.workspace_chats
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+create policy "chat message owner read" on public.workspace_chat_messages
+  for select using (auth.uid() = user_id);
+create policy "service role chat messages" on public.workspace_chat_messages
+  for all using (auth.role() = 'service_role') with check (auth.role() = 'service_role');
+
+-- Create/rename a chat and upsert messages by id, in the order given.
+-- p_messages: [{"id", "role", "content", "timestamp"}, ...]
+create or replace function public.append_chat_messages(
+  p_user_id uuid,
+  p_chat_id text,
+  p_title text,
+  p_updated_at timestamptz,
+  p_messages jsonb
+)
+returns integer
+language plpgsql
+security definer
+as $$
+declare
+  written integer;
+begin
+  insert into public.workspace_chats (user_id, id, title, updated_at)
+  values (p_user_id, p_chat_id, coalesce(p_title, ''), coalesce(p_updated_at, timezone('utc', now())))
+  on conflict (user_id, id) do update
+     set title = coalesce(p_title, public.workspace_chats.title),
+         updated_at = coalesce(p_updated_at, timezone('utc', now()));
+
+  insert into public.workspace_chat_messages as m (user_id, chat_id, id, role, content, "timestamp")
+  select p_user_id, p_chat_id, e->>'id', e->>'role', coalesce(e->>'content', ''), e->>'timestamp'
+    from jsonb_array_elements(coalesce(p_messages, '[]'::jsonb)) with ordinality as t(e, ord)
+   where e->>'id' is not null
+   order by ord
+  on conflict (user_id, chat_id, id) do update
+     set role = excluded.role,
+         content = excluded.content,
+         "timestamp" = excluded."timestamp"
+   where (m.role, m.content, m."timestamp") is distinct from
+         (excluded.role, excluded.content, excluded."timestamp");
+  get diagnostics written = row_count;
+  return written;
+end;
+$$;
+
+-- Reconcile documents with a full client snapshot (newest first): unchanged rows
+-- are untouched, new ones inserted, changed ones updated, missing ones deleted.
+create or replace function public.replace_workspace_documents(p_user_id uuid, p_documents jsonb)
+returns void
+language plpgsql
+security definer
+as $$
+begin
+  delete from public.workspace_documents d
+   where d.user_id = p_user_id
+     and not exists (
+       select 1 from jsonb_array_elements(coalesce(p_documents, '[]'::jsonb)) e
+        where e->>'id' = d.id
+     );
+
+  insert into public.workspace_documents as d (user_id, id, generated_at, data)
+  select p_user_id, e->>'id', coalesce((e->>'generatedAt')::timestamptz, timezone('utc', now())), e
+    from jsonb_array_elements(coalesce(p_documents, '[]'::jsonb)) with ordinality as t(e, ord)
+   where e->>'id' is not null
+   order by ord desc
+  on conflict (user_id, id) do update
+     set data = excluded.data,
+         generated_at = excluded.generated_at
+   where d.data is distinct from excluded.data;
+end;
+$$;
+
+-- Reconcile chats and their messages with a full client snapshot.
+create or replace function public.replace_workspace_chats(p_user_id uuid, p_chats jsonb)
+returns void
+language plpgsql
+security definer
+as $$
+declare
+  chat jsonb;
+begin
+  delete from public.workspace_chats c
+   where c.user_id = p_user_id
+     and not exists (
+       select 1 from jsonb_array_elements(coalesce(p_chats, '[]'::jsonb)) e
+        where e->>'id' = c.id
+     );
+
+  for chat in
+    select e from jsonb_array_elements(coalesce(p_chats, '[]'::jsonb)) with ordinality as t(e, ord)
+     where e->>'id' is not null
+     order by ord desc
+  loop
+    perform public.append_chat_messages(
+      p_user_id,
+      chat->>'id',
+      chat->>'title',
+      (chat->>'timestamp')::timestamptz,
+      chat->'messages'
+    );
+
+    delete from public.workspace_chat_messages m
+     where m.user_id = p_user_id
+       and m.chat_id = chat->>'id'
+       and not exists (
+         select 1 from jsonb_array_elements(coalesce(chat->'messages', '[]'::jsonb)) e
+          where e->>'id' = m.id
+       );
+  end loop;
+end;
+$$;
+
+-- Shallow-merge top-level profile fields.
+create or replace function public.patch_workspace_profile(p_user_id uuid, p_patch jsonb)
+returns void
+language sql
+security definer
+as $$
+  insert into public.workspaces (user_id, profile)
+  values (p_user_id, p_patch)
+  on conflict (user_id) do update
+     set profile = coalesce(public.workspaces.profile, '{}'::jsonb) || excluded.profile;
+$$;
+
+-- One-time backfill from the legacy JSON columns.
+select public.replace_workspace_documents(user_id, document_history)
+  from public.workspaces
+ where jsonb_typeof(document_history) = 'array'
+   and jsonb_array_length(document_history) > 0;
+
+select public.replace_workspace_chats(user_id, career_chat_history)
+  from public.workspaces
+ where jsonb_typeof(career_chat_history) = 'array'
+   and jsonb_array_length(career_chat_history) > 0;
+
+-- Workspace version for conditional GETs (ETag / If-None-Match).
+-- workspaces.updated_at moves on any change to the row or its history items, so
+-- the backend can answer 304 Not Modified after selecting only this column.
+alter table public.workspaces
+  add column if not exists updated_at timestamptz not null default timezone('utc', now());
+
+create or replace function public.touch_workspace_row()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := clock_timestamp();
+  return new;
+end;
+$$;
+
+drop trigger if exists workspaces_touch on public.workspaces;
+create trigger workspaces_touch
+  before update on public.workspaces
+  for each row execute function public.touch_workspace_row();
+
+create or replace function public.touch_workspace_from_item()
+returns trigger
+language plpgsql
+security definer
+as $$
+declare
+  v_user_id uuid := coalesce(new.user_id, old.user_id);
+begin
+  update public.workspaces set updated_at = clock_timestamp() where user_id = v_user_id;
+  -- History can exist before the workspace row; create it so the version moves.
+  -- (Skipped while the user itself is being deleted.)
+  if not found and exists (select 1 from auth.users where id = v_user_id) then
+    insert into public.workspaces (user_id, updated_at)
+    values (v_user_id, clock_timestamp())
+    on conflict (user_id) do update set updated_at = clock_timestamp();
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists workspace_documents_touch on public.workspace_documents;
+create trigger workspace_documents_touch
+  after insert or update or delete on public.workspace_documents
+  for each row execute function public.touch_workspace_from_item();
+
+drop trigger if exists workspace_chats_touch on public.workspace_chats;
+create trigger workspace_chats_touch
+  after insert or update or delete on public.workspace_chats
+  for each row execute function public.touch_workspace_from_item();
+
+drop trigger if exists workspace_chat_messages_touch on public.workspace_chat_messages;
+create trigger workspace_chat_messages_touch
+  after insert or update or delete on public.workspace_chat_messages
+  for each row execute function public.touch_workspace_from_item();
@@ -1,5 +1,5 @@
 import React, { useContext, useState } from 'react';
-import { Link } from 'react-router-dom';
+import { useNavigate } from 'react-router-dom';
 import { ProfileContext } from '../App';
 import { CreateDocIcon } from '../components/Icons';
 import { DocumentGeneration } from '../types';
@@ -7,6 +7,8 @@ import Container from '../components/Container';
 import PageHeader from '../components/PageHeader';
 import Card from '../components/Card';
 import Button from '../components/Button';
+import { fetchDocument } from '../services/workspaceService';
+import { downloadDocumentHistoryZip } from '../services/latexService';
 
 const TrashIcon = () => (
     <svg className="w-4 h-4" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth={2}>
@@ -58,6 +60,10 @@ const ConfirmDialog: React.FC<{
 
 const GeneratedDocumentsPage: React.FC = () => {
     const profileContext = useContext(ProfileContext);
+    const navigate = useNavigate();
+    const [openingId, setOpeningId] = useState<string | null>(null);
+    const [isExporting, setIsExporting] = useState(false);
+    const [exportError, setExportError] = useState<string | null>(null);
     const [deleteConfirm, setDeleteConfirm] = useState<{ isOpen: boolean; documentId: string | null; title: string }>({
         isOpen: false,
         documentId: null,
@@ -68,7 +74,7 @@ const GeneratedDocumentsPage: React.FC = () => {
         return <div className="flex items-center justify-center min-h-screen">Loading...</div>;
     }
 
-    const { documentHistory, removeDocument } = profileContext;
+    const { documentHistory, removeDocument, tokens, setTokens } = profileContext;
 
     const getDocumentTitle = (doc: DocumentGeneration) => {
         if (doc.companyName && doc.jobTitle) {
@@ -77,6 +83,56 @@ const GeneratedDocumentsPage: React.FC = () => {
         return doc.jobTitle || doc.companyName || 'Untitled Application';
     };
 
+    const hasBody = (doc: DocumentGeneration, field: 'resumeContent' | 'coverLetterContent') =>
+        !!(doc[field] || doc.bodies?.[field]);
+
+    // Listed entries only carry metadata; load the bodies when a document is opened
+    const handleOpen = async (doc: DocumentGeneration) => {
+        setOpeningId(doc.id);
+        try {
+            const full: DocumentGeneration = doc.bodies && doc.resumeContent === undefined
+                ? { ...doc, ...(await fetchDocument(doc.id)) }
+                : doc;
+            navigate('/generate/results', {
+                state: {
+                    generatedContent: {
+                        resume: full.resumeContent ?? null,
+                        coverLetter: full.coverLetterContent ?? null,
+                    },
+                    analysisResult: full.analysisResult ?? null,
+                    parsedResume: full.parsedResume ?? null,
+                    parsedCoverLetter: full.parsedCoverLetter ?? null,
+                },
+            });
+        } catch (err) {
+            console.error('Failed to open document', err);
+        } finally {
+            setOpeningId(null);
+        }
+    };
+
+    // One token per PDF, like single downloads
+    const exportCost = documentHistory.reduce(
+        (total, doc) => total + Number(hasBody(doc, 'resumeContent')) + Number(hasBody(doc, 'coverLetterContent')),
+        0,
+    );
+
+    const handleExportAll = async () => {
+        if (tokens < exportCost) return;
+        setExportError(null);
+        setIsExporting(true);
+        setTokens(prev => prev - exportCost);
+        try {
+            await downloadDocumentHistoryZip(`keju_documents_${new Date().toISOString().slice(0, 10)}.zip`);
+        } catch (err: any) {
+            console.error('Failed to export documents', err);
+            setExportError(err?.message || 'Export failed. Please try again.');
+            setTokens(prev => prev + exportCost); // Refund
+        } finally {
+            setIsExporting(false);
+        }
+    };
+
     const handleDeleteClick = (doc: DocumentGeneration) => {
         setDeleteConfirm({
             isOpen: true,
@@ -102,6 +158,21 @@ const GeneratedDocumentsPage: React.FC = () => {
                 <PageHeader
                     title="Generated Documents"
                     description="Your resumes and cover letters in one place."
+                    actions={exportCost > 0 && (
+                        <div className="flex flex-col items-end gap-2">
+                            <Button
+                                variant="outline"
+                                onClick={handleExportAll}
+                                isLoading={isExporting}
+                                disabled={tokens < exportCost}
+                            >
+                                Export all as PDF ({exportCost} {exportCost === 1 ? 'token' : 'tokens'})
+                            </Button>
+                            {exportError && (
+                                <p className="text-sm text-red-600" role="alert">{exportError}</p>
+                            )}
+                        </div>
+                    )}
                 />
 
                 {documentHistory.length > 0 ? (
@@ -110,21 +181,14 @@ const GeneratedDocumentsPage: React.FC = () => {
                             {documentHistory.map((doc) => (
                                 <li key={doc.id} className="flex flex-wrap items-center justify-between gap-x-6 gap-y-3 py-4 sm:flex-nowrap group">
                                     <div className="min-w-0 flex-1">
-                                        <Link
-                                            to="/generate/results"
-                                            state={{
-                                                generatedContent: {
-                                                    resume: doc.resumeContent,
-                                                    coverLetter: doc.coverLetterContent,
-                                                },
-                                                analysisResult: doc.analysisResult,
-                                                parsedResume: doc.parsedResume,
-                                                parsedCoverLetter: doc.parsedCoverLetter,
-                                            }}
-                                            className="text-sm font-medium text-gray-900 hover:text-primary transition-colors"
+                                        <button
+                                            type="button"
+                                            onClick={() => handleOpen(doc)}
+                                            disabled={openingId === doc.id}
+                                            className="text-left text-sm font-medium text-gray-900 hover:text-primary transition-colors disabled:opacity-60"
                                         >
                                             {getDocumentTitle(doc)}
-                                        </Link>
+                                        </button>
                                         <p className="mt-1 text-xs text-gray-500">
                                             {new Date(doc.generatedAt).toLocaleDateString('en-US', {
                                                 month: 'short',
@@ -137,12 +201,12 @@ const GeneratedDocumentsPage: React.FC = () => {
                                     </div>
                                     <div className="flex items-center gap-3">
                                         <div className="flex gap-2">
-                                            {doc.resumeContent && (
+                                            {hasBody(doc, 'resumeContent') && (
                                                 <span className="inline-flex items-center rounded-md px-2 py-1 text-xs font-medium bg-blue-50 text-blue-700 ring-1 ring-inset ring-blue-600/20">
                                                     Resume
                                                 </span>
                                             )}
-                                            {doc.coverLetterContent && (
+                                            {hasBody(doc, 'coverLetterContent') && (
                                                 <span className="inline-flex items-center rounded-md px-2 py-1 text-xs font-medium bg-green-50 text-green-700 ring-1 ring-inset ring-green-600/20">
                                                     Cover Letter
                                                 </span>
@@ -11,6 +11,7 @@ import Card from '../components/Card';
 import Button from '../components/Button';
 import { TubelightNavbar, NavItem } from '../components/ui/tubelight-navbar';
 import { FileText, Mail } from 'lucide-react';
+import { downloadPdfBatch } from '../services/latexService';
 
 const GenerationResultPage: React.FC = () => {
     const location = useLocation();
@@ -46,12 +47,14 @@ const GenerationResultPage: React.FC = () => {
         parsedCoverLetter: ParsedCoverLetter | null;
     };
 
-    const { tokens, setTokens } = profileContext!;
+    const { tokens, setTokens, profile } = profileContext!;
 
     const [editableDocs, setEditableDocs] = useState<GeneratedContent>(generatedContent);
     const [parsedResume, setParsedResume] = useState<Partial<ProfileData> | null>(initialParsedResume);
     const [parsedCoverLetter, setParsedCoverLetter] = useState<ParsedCoverLetter | null>(initialParsedCoverLetter);
     const [activeView, setActiveView] = useState<'resume' | 'coverLetter' | null>(null);
+    const [isDownloadingBoth, setIsDownloadingBoth] = useState(false);
+    const [downloadBothError, setDownloadBothError] = useState<string | null>(null);
 
     useEffect(() => {
         if (generatedContent.resume) {
@@ -78,6 +81,31 @@ const GenerationResultPage: React.FC = () => {
     const hasResume = !!editableDocs.resume;
     const hasCoverLetter = !!editableDocs.coverLetter;
 
+    // One request for both documents; costs one token per document, like separate downloads
+    const handleDownloadBoth = async (merge: boolean) => {
+        if (tokens < 2 || !editableDocs.resume || !editableDocs.coverLetter) return;
+        const date = new Date().toISOString().split('T')[0];
+        setDownloadBothError(null);
+        setIsDownloadingBoth(true);
+        setTokens(prev => prev - 2);
+        try {
+            await downloadPdfBatch(
+                [
+                    { content: editableDocs.resume, filename: `keju_resume_${date}.pdf`, template: profile?.selectedResumeTemplate || undefined },
+                    { content: editableDocs.coverLetter, filename: `keju_cover-letter_${date}.pdf`, template: profile?.selectedCoverLetterTemplate || undefined },
+                ],
+                merge ? `keju_application_${date}.pdf` : `keju_documents_${date}.zip`,
+                merge,
+            );
+        } catch (err: any) {
+            console.error('Failed to download documents', err);
+            setDownloadBothError(err?.message || 'Download failed. Please try again.');
+            setTokens(prev => prev + 2); // Refund
+        } finally {
+            setIsDownloadingBoth(false);
+        }
+    };
+
     const navItems: NavItem[] = [
         { name: 'resume', displayName: 'Resume', icon: FileText },
         { name: 'coverLetter', displayName: 'Cover Letter', icon: Mail },
@@ -102,6 +130,31 @@ const GenerationResultPage: React.FC = () => {
                             />
                         )}
 
+                        {hasResume && hasCoverLetter && (
+                            <div className="flex flex-wrap items-center justify-end gap-3">
+                                {downloadBothError && (
+                                    <p className="text-sm text-red-600 mr-auto" role="alert">{downloadBothError}</p>
+                                )}
+                                <Button
+                                    onClick={() => handleDownloadBoth(true)}
+                                    variant="primary"
+                                    size="sm"
+                                    isLoading={isDownloadingBoth}
+                                    disabled={isDownloadingBoth || tokens < 2}
+                                >
+                                    Download application PDF (2 tokens)
+                                </Button>
+                                <Button
+                                    onClick={() => handleDownloadBoth(false)}
+                                    variant="outline"
+                                    size="sm"
+                                    disabled={isDownloadingBoth || tokens < 2}
+                                >
+                                    Download both as ZIP
+                                </Button>
+                            </div>
+                        )}
+
                         <div className="w-full">
                             {activeView === 'resume' && hasResume && (
                                 <div className="space-y-4">
@@ -112,6 +165,7 @@ const GenerationResultPage: React.FC = () => {
                                         structuredContent={parsedResume}
                                         tokens={tokens}
                                         setTokens={setTokens}
+                                        template={profile?.selectedResumeTemplate}
                                     />
                                 </div>
                             )}
@@ -124,6 +178,7 @@ const GenerationResultPage: React.FC = () => {
                                         structuredContent={parsedCoverLetter}
                                         tokens={tokens}
                                         setTokens={setTokens}
+                                        template={profile?.selectedCoverLetterTemplate}
                                     />
                                 </div>
                             )}
@@ -95,14 +95,18 @@ const buildHeaders = async (): Promise<Record<string, string>> => {
   return headers;
 };
 
-export const postJson = async <TResponse>(path: string, body: any): Promise<TResponse> => {
+export const requestJson = async <TResponse>(
+  method: 'GET' | 'POST' | 'PATCH' | 'DELETE',
+  path: string,
+  body?: any,
+): Promise<TResponse> => {
   const base = requireApiBaseUrl();
   const url = `${base}${path}`;
   const headers = await buildHeaders();
   const res = await fetch(url, {
-    method: 'POST',
+    method,
     headers,
-    body: JSON.stringify(body),
+    body: body === undefined ? undefined : JSON.stringify(body),
   });
   if (!res.ok) {
     const text = await res.text();
@@ -110,3 +114,6 @@ export const postJson = async <TResponse>(path: string, body: any): Promise<TRes
   }
   return res.json() as Promise<TResponse>;
 };
+
+export const postJson = async <TResponse>(path: string, body: any): Promise<TResponse> =>
+  requestJson<TResponse>('POST', path, body);
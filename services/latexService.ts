@@ -13,22 +13,7 @@ const buildHeaders = async (): Promise<Record<string, string>> => {
   return headers;
 };
 
-export const downloadResumePdf = async (markdown: string, filename: string) => {
-  const baseUrl = requireApiBaseUrl();
-  const headers = await buildHeaders();
-  const url = `${baseUrl}/api/latex/compile`;
-  const response = await fetch(url, {
-    method: 'POST',
-    headers,
-    body: JSON.stringify({ content: markdown, filename }),
-  });
-
-  if (!response.ok) {
-    const text = await response.text();
-    throw new Error(text || `PDF generation failed with status ${response.status}`);
-  }
-
-  const blob = await response.blob();
+const saveBlob = (blob: Blob, filename: string) => {
   const blobUrl = window.URL.createObjectURL(blob);
   const link = document.createElement('a');
   link.href = blobUrl;
@@ -38,3 +23,47 @@ export const downloadResumePdf = async (markdown: string, filename: string) => {
   document.body.removeChild(link);
   window.URL.revokeObjectURL(blobUrl);
 };
+
+const fetchBlob = async (path: string, body?: unknown): Promise<Blob> => {
+  const baseUrl = requireApiBaseUrl();
+  const headers = await buildHeaders();
+  const response = await fetch(`${baseUrl}${path}`, body === undefined
+    ? { method: 'GET', headers }
+    : { method: 'POST', headers, body: JSON.stringify(body) });
+
+  if (!response.ok) {
+    const text = await response.text();
+    throw new Error(text || `PDF generation failed with status ${response.status}`);
+  }
+  return response.blob();
+};
+
+/**
+ * `template` is a template ID from the template picker (e.g. the profile's
+ * `selectedResumeTemplate`); the server's default is used when it is empty.
+ */
+export const downloadResumePdf = async (markdown: string, filename: string, template?: string) => {
+  const blob = await fetchBlob('/api/latex/compile', { content: markdown, filename, template: template || undefined });
+  saveBlob(blob, filename);
+};
+
+export interface PdfBatchDocument {
+  content: string;
+  filename: string;
+  template?: string;
+}
+
+/**
+ * Compile several documents in one request: a ZIP of PDFs, or with `merge`
+ * a single PDF with each document starting on a new page.
+ */
+export const downloadPdfBatch = async (documents: PdfBatchDocument[], filename: string, merge = false) => {
+  const blob = await fetchBlob('/api/latex/compile-batch', { documents, merge, filename });
+  saveBlob(blob, filename);
+};
+
+/** Download every document in the history as a ZIP of PDFs, in the profile's templates. */
+export const downloadDocumentHistoryZip = async (filename = 'documents.zip') => {
+  const blob = await fetchBlob(`/api/latex/export?filename=${encodeURIComponent(filename)}`);
+  saveBlob(blob, filename);
+};
@@ -1,5 +1,5 @@
 import { supabase } from './supabaseClient';
-import { postJson, requireApiBaseUrl } from './apiClient';
+import { postJson, requestJson, requireApiBaseUrl } from './apiClient';
 
 export type WorkspacePayload = {
   profile: any;
@@ -8,6 +8,8 @@ export type WorkspacePayload = {
   tokens: number;
   tokensReplenishedAt?: string;
   rolledOverTokens?: number;
+  // Set while earlier saves are held on the server after repeated failures
+  saveError?: string;
 };
 
 export type TokenStatus = {
@@ -41,10 +43,38 @@ export const fetchWorkspace = async (): Promise<WorkspacePayload> => {
   return res.json();
 };
 
-export const persistWorkspace = async (payload: WorkspacePayload) => {
+export const persistWorkspace = async (payload: Partial<WorkspacePayload>) => {
   await postJson('/api/workspace', payload);
 };
 
+// Incremental saves: each touches only the changed item instead of the whole workspace.
+export const patchProfile = async (profile: Record<string, any>) => {
+  await requestJson('PATCH', '/api/workspace/profile', profile);
+};
+
+export const saveDocument = async (document: { id: string; generatedAt?: string } & Record<string, any>) => {
+  await postJson('/api/workspace/documents', document);
+};
+
+// History entries carry metadata only; bodies (resume, cover letter, analysis) are loaded on open.
+export const fetchDocument = async (documentId: string) =>
+  requestJson<Record<string, any>>('GET', `/api/workspace/documents/${encodeURIComponent(documentId)}`);
+
+export const deleteDocument = async (documentId: string) => {
+  await requestJson('DELETE', `/api/workspace/documents/${encodeURIComponent(documentId)}`);
+};
+
+export const appendChatMessages = async (
+  chatId: string,
+  update: { title?: string; timestamp?: string; messages: any[] },
+) => {
+  await postJson(`/api/workspace/chats/${encodeURIComponent(chatId)}/messages`, update);
+};
+
+export const deleteChat = async (chatId: string) => {
+  await requestJson('DELETE', `/api/workspace/chats/${encodeURIComponent(chatId)}`);
+};
+
 export const fetchSubscriptionStatus = async () => {
   const baseUrl = requireApiBaseUrl();
   const headers = await (async () => {
@@ -144,6 +144,8 @@ export interface DocumentGeneration {
   analysisResult: ApplicationAnalysisResult | null;
   parsedResume: Partial<ProfileData> | null;
   parsedCoverLetter: ParsedCoverLetter | null;
+  // Body field -> content hash; entries read from the workspace omit the bodies themselves
+  bodies?: Partial<Record<'resumeContent' | 'coverLetterContent' | 'analysisResult' | 'parsedResume' | 'parsedCoverLetter', string>>;
 }
 
 export interface IncludedProfileSelections {